@@ -0,0 +1,260 @@
+# SISTEMA TOMATE FUND - AGREGAÇÃO PARALELA DOS RELATÓRIOS
+# Os livros (compromissos, recebimentos, subscrições) viram colunas numpy agrupadas por
+# fundo: valor em centavos, posição original da linha e o início do trecho de cada fundo.
+# Os fundos selecionados são divididos em fatias com volume de linhas parecido e cada
+# processo do pool calcula total, quantidade, mínimo e máximo por fundo da sua fatia,
+# lendo as colunas de arquivos .npy mapeados em memória (mmap): nenhuma linha é copiada
+# ou serializada para os processos. As parciais (inteiras, exatas) são combinadas no
+# processo da requisição. Poucas linhas selecionadas são agregadas ali mesmo, sem pool.
+# Sob gevent os processos só podem ser criados pela thread do laço de eventos: chamadas
+# vindas de threads nativas (atualização das visões, visoes.py) agregam no próprio processo.
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter
+
+import numpy as np
+
+try:
+    from gevent.monkey import get_original, is_module_patched
+except ImportError:
+    is_module_patched = None
+
+COLUNAS = ("valores", "ordem", "inicios")
+
+WORKERS_PADRAO = int(os.environ.get("TOMATE_RELATORIO_WORKERS", 0)) or os.cpu_count() or 1
+# Abaixo disso o custo de distribuir as fatias supera o ganho do paralelismo
+LINHAS_MINIMAS_PARALELO = int(os.environ.get("TOMATE_RELATORIO_LINHAS_PARALELO", 200_000))
+# tmpfs (/dev/shm) quando disponível: os arquivos das colunas ficam só em memória
+PASTA_COLUNAS = os.environ.get(
+    "TOMATE_RELATORIO_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+
+
+class ColunasLivros:
+    """Instantâneo colunar dos livros, agrupado por fundo"""
+
+    def __init__(self, livros):
+        """livros: {nome: (linhas, atributo do valor em centavos)}"""
+        self.codigos = {}
+        self.fontes = {nome: (id(linhas), len(linhas)) for nome, (linhas, _) in livros.items()}
+        self.colunas = {}
+        self.pasta = None
+        self._lock = threading.Lock()
+
+        codigo = self.codigos.setdefault
+        ordenados = {}
+        for nome, (linhas, atributo) in livros.items():
+            n = len(linhas)
+            codigos = np.fromiter(
+                (codigo(fid, len(self.codigos)) for fid in map(attrgetter("fundo_id"), linhas)), np.int64, n
+            )
+            ordem = np.argsort(codigos, kind="stable")
+            valores = np.fromiter(map(attrgetter(atributo), linhas), np.int64, n)[ordem]
+            ordenados[nome] = (codigos[ordem], valores, ordem)
+        todos = np.arange(len(self.codigos) + 1)
+        for nome, (codigos, valores, ordem) in ordenados.items():
+            self.colunas[nome] = (valores, ordem, np.searchsorted(codigos, todos))
+
+    def atual(self, livros):
+        """Indica se o instantâneo ainda corresponde às listas dos livros"""
+        return all(self.fontes.get(nome) == (id(linhas), len(linhas)) for nome, (linhas, _) in livros.items())
+
+    def quantidades(self, nomes, codigos):
+        """Linhas de cada fundo somadas nos livros pedidos"""
+        return sum(self.colunas[n][2][codigos + 1] - self.colunas[n][2][codigos] for n in nomes)
+
+    def gravar(self, pasta):
+        """Grava as colunas em .npy (uma vez) e retorna a pasta, para os processos mapearem"""
+        with self._lock:
+            if self.pasta is None:
+                destino = tempfile.mkdtemp(prefix="tomate_colunas_", dir=pasta)
+                for nome, colunas in self.colunas.items():
+                    for coluna, array in zip(COLUNAS, colunas):
+                        np.save(os.path.join(destino, f"{nome}.{coluna}.npy"), array)
+                self.pasta = destino
+            return self.pasta
+
+    def descartar(self):
+        if self.pasta is not None:
+            shutil.rmtree(self.pasta, ignore_errors=True)
+
+
+def agregar_fatia(colunas, codigos):
+    """Estatísticas por fundo de uma fatia de fundos (códigos), em cada livro
+
+    Retorna {livro: (códigos com linhas, totais, quantidades, mínimos, máximos, posições)}
+    """
+    resultado = {}
+    for nome, (valores, ordem, inicios) in colunas.items():
+        a, b = inicios[codigos], inicios[codigos + 1]
+        com_linhas = b > a
+        a, b, presentes = a[com_linhas], b[com_linhas], codigos[com_linhas]
+        tamanhos = b - a
+        if not len(tamanhos):
+            vazio = np.empty(0, np.int64)
+            resultado[nome] = (presentes, vazio, vazio, vazio, vazio, vazio)
+            continue
+        # Índices de todos os trechos concatenados, sem laço em Python
+        inicio_trechos = np.zeros(len(tamanhos), np.int64)
+        np.cumsum(tamanhos[:-1], out=inicio_trechos[1:])
+        indices = np.repeat(a - inicio_trechos, tamanhos) + np.arange(int(tamanhos.sum()))
+        selecionados = valores[indices]
+        resultado[nome] = (
+            presentes,
+            np.add.reduceat(selecionados, inicio_trechos),
+            tamanhos,
+            np.minimum.reduceat(selecionados, inicio_trechos),
+            np.maximum.reduceat(selecionados, inicio_trechos),
+            ordem[indices]
+        )
+    return resultado
+
+
+# Colunas já mapeadas em cada processo do pool: pasta -> {livro: colunas}
+_MAPEADAS = {}
+MAXIMO_MAPEADAS = 2
+
+
+def _agregar_fatia_mmap(pasta, livros, codigos):
+    colunas = _MAPEADAS.get(pasta)
+    if colunas is None:
+        colunas = {
+            nome: tuple(np.load(os.path.join(pasta, f"{nome}.{coluna}.npy"), mmap_mode="r") for coluna in COLUNAS)
+            for nome in livros
+        }
+        while len(_MAPEADAS) >= MAXIMO_MAPEADAS:
+            _MAPEADAS.pop(next(iter(_MAPEADAS)))
+        _MAPEADAS[pasta] = colunas
+    return agregar_fatia({nome: colunas[nome] for nome in livros}, codigos)
+
+
+def dividir_fatias(pesos, quantidade):
+    """Pontos de corte que dividem a sequência em 'quantidade' fatias de peso parecido"""
+    acumulado = np.cumsum(pesos)
+    alvos = acumulado[-1] * np.arange(1, quantidade) / quantidade
+    return np.unique(np.searchsorted(acumulado, alvos, side="right"))
+
+
+def _thread_nativa():
+    return get_original("_thread", "get_ident")()
+
+
+# Thread do laço de eventos do gevent (a que importa a aplicação)
+_THREAD_LACO = _thread_nativa() if is_module_patched is not None else None
+
+
+def _pool_permitido():
+    """Fora do gevent, sempre; sob gevent, só na thread do laço de eventos"""
+    if is_module_patched is None or not is_module_patched("threading"):
+        return True
+    return _thread_nativa() == _THREAD_LACO
+
+
+class AgregadorRelatorios:
+    """Agrega os livros por fundo em um pool de processos sobre colunas mapeadas em memória"""
+
+    def __init__(self, workers=WORKERS_PADRAO, pasta=PASTA_COLUNAS, linhas_minimas=LINHAS_MINIMAS_PARALELO):
+        self.workers = workers
+        self.pasta = pasta
+        self.linhas_minimas = linhas_minimas
+        self._instantaneo = None
+        self._em_uso = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        atexit.register(self.invalidar)
+
+    def invalidar(self):
+        """Descarta o instantâneo atual (os livros mudaram); o próximo relatório reconstrói"""
+        with self._lock:
+            antigo, self._instantaneo = self._instantaneo, None
+            if antigo is not None and not self._em_uso.get(antigo):
+                antigo.descartar()
+
+    def _adquirir(self, livros):
+        """Instantâneo atual (reconstruído se os livros mudaram), protegido de descarte até _liberar"""
+        with self._lock:
+            instantaneo = self._instantaneo
+            if instantaneo is not None and instantaneo.atual(livros):
+                self._em_uso[instantaneo] = self._em_uso.get(instantaneo, 0) + 1
+                return instantaneo
+        # Construído fora do lock: com milhões de linhas leva alguns segundos
+        novo = ColunasLivros(livros)
+        with self._lock:
+            antigo, self._instantaneo = self._instantaneo, novo
+            if antigo is not None and not self._em_uso.get(antigo):
+                antigo.descartar()
+            self._em_uso[novo] = 1
+        return novo
+
+    def _liberar(self, instantaneo):
+        with self._lock:
+            self._em_uso[instantaneo] -= 1
+            if not self._em_uso[instantaneo]:
+                del self._em_uso[instantaneo]
+                if instantaneo is not self._instantaneo:
+                    instantaneo.descartar()
+
+    def _executor(self):
+        if self._pid != os.getpid():
+            # Um pool por processo (workers do gunicorn são criados por fork), mantido entre
+            # requisições: os processos só leem as colunas dos arquivos, não herdam os livros
+            self._pid = os.getpid()
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def agregar(self, livros, fundo_ids, nomes=None, workers=None, com_linhas=True):
+        """Estatísticas por fundo e totais dos livros 'nomes' para os fundos selecionados
+
+        livros: {nome: (linhas, atributo do valor em centavos)}, sempre todos os livros
+        (o instantâneo é compartilhado entre relatórios de tipos diferentes)
+        Retorna {livro: {"linhas", "total", "quantidade", "por_fundo": {fundo_id: {...}}}},
+        com as linhas na ordem original e os valores em centavos; com_linhas=False
+        retorna só as estatísticas ("linhas": None).
+        """
+        nomes = list(nomes or livros)
+        instantaneo = self._adquirir(livros)
+        try:
+            codigos = np.array(sorted({instantaneo.codigos[f] for f in fundo_ids if f in instantaneo.codigos}), np.int64)
+            workers = min(int(workers or self.workers), len(codigos))
+            quantidades = instantaneo.quantidades(nomes, codigos)
+            linhas_selecionadas = int(quantidades.sum()) if len(codigos) else 0
+            if workers <= 1 or linhas_selecionadas < self.linhas_minimas or not _pool_permitido():
+                parciais = [agregar_fatia({n: instantaneo.colunas[n] for n in nomes}, codigos)]
+            else:
+                pasta = instantaneo.gravar(self.pasta)
+                fatias = np.split(codigos, dividir_fatias(quantidades, workers))
+                futuros = [self._executor().submit(_agregar_fatia_mmap, pasta, nomes, fatia)
+                           for fatia in fatias if len(fatia)]
+                parciais = [f.result() for f in futuros]
+            return self._combinar(instantaneo, {n: livros[n][0] for n in nomes}, parciais, com_linhas)
+        finally:
+            self._liberar(instantaneo)
+
+    def _combinar(self, instantaneo, livros, parciais, com_linhas=True):
+        ids = list(instantaneo.codigos)
+        resultado = {}
+        for nome, linhas in livros.items():
+            marcadas = np.zeros(len(linhas) if com_linhas else 0, bool)
+            por_fundo = {}
+            total = 0
+            for parcial in parciais:
+                presentes, totais, quantidades, minimos, maximos, posicoes = parcial[nome]
+                if com_linhas:
+                    marcadas[posicoes] = True
+                total += int(totais.sum())
+                for codigo, soma, qtd, minimo, maximo in zip(
+                        presentes.tolist(), totais.tolist(), quantidades.tolist(), minimos.tolist(), maximos.tolist()):
+                    por_fundo[ids[codigo]] = {"total": soma, "quantidade": qtd, "minimo": minimo, "maximo": maximo}
+            # Marcar e varrer a máscara devolve as posições já na ordem original dos livros
+            resultado[nome] = {
+                "linhas": [linhas[i] for i in np.flatnonzero(marcadas).tolist()] if com_linhas else None,
+                "total": total,
+                "quantidade": sum(e["quantidade"] for e in por_fundo.values()),
+                "por_fundo": por_fundo
+            }
+        return resultado
@@ -0,0 +1,181 @@
+# SISTEMA TOMATE FUND - MOTOR DE ALERTAS
+# Regras declarativas de liquidez reavaliadas incrementalmente, apenas para o
+# fundo alterado; os alertas ativos ficam em um dicionário único para leitura rápida
+import threading
+from datetime import datetime, timedelta
+
+# Regras padrão do sistema
+REGRAS_PADRAO = [
+    {
+        "id": "liquidez_minima",
+        "tipo": "indice_liquidez_minimo",
+        "descricao": "Liquidez / patrimônio abaixo do mínimo da política de liquidez",
+        "severidade": "ALTA",
+        "minimos": {"Ativos de Risco": 0.05, "Livre de Risco": 0.10, "Misto": 0.08, "Específico": 0.05}
+    },
+    {
+        "id": "concentracao_vencimentos",
+        "tipo": "concentracao_vencimentos",
+        "descricao": "Compromissos concentrados em uma janela curta",
+        "severidade": "MEDIA",
+        "janela_dias": 7,
+        "limite_percentual": 0.6,
+        "minimo_compromissos": 3
+    },
+    {
+        "id": "compromissos_vencidos",
+        "tipo": "compromissos_vencidos",
+        "descricao": "Compromissos pendentes com vencimento já passado",
+        "severidade": "ALTA"
+    },
+    {
+        "id": "saldo_negativo_d15",
+        "tipo": "saldo_negativo",
+        "descricao": "Saldo projetado negativo em D+15",
+        "severidade": "ALTA",
+        "dias": 15
+    },
+    {
+        "id": "saldo_negativo_d30",
+        "tipo": "saldo_negativo",
+        "descricao": "Saldo projetado negativo em D+30",
+        "severidade": "MEDIA",
+        "dias": 30
+    }
+]
+
+
+def _indice_liquidez_minimo(regra, contexto):
+    fundo = contexto["fundo"]
+    minimo = regra["minimos"].get(fundo["politica_liquidez"])
+    if minimo is None or not fundo["patrimonio"]:
+        return None
+    indice = fundo["liquidez"] / fundo["patrimonio"]
+    if indice < minimo:
+        return f"Índice de liquidez de {indice:.1%} abaixo do mínimo de {minimo:.0%} ({fundo['politica_liquidez']})"
+    return None
+
+
+def _concentracao_vencimentos(regra, contexto):
+    # Só o que ainda vai vencer; os já vencidos têm regra própria (compromissos_vencidos)
+    saidas = sorted(s for s in contexto["saidas"] if s[0] >= contexto["hoje"])
+    total = sum(valor for _, valor in saidas)
+    if len(saidas) < regra.get("minimo_compromissos", 1) or not total:
+        return None
+    # Janela deslizante sobre os vencimentos ordenados
+    janela = timedelta(days=regra["janela_dias"])
+    maior, inicio_maior = 0.0, None
+    soma, esquerda = 0.0, 0
+    for vencimento, valor in saidas:
+        soma += valor
+        while saidas[esquerda][0] < vencimento - janela:
+            soma -= saidas[esquerda][1]
+            esquerda += 1
+        if soma > maior:
+            maior, inicio_maior = soma, saidas[esquerda][0]
+    if maior / total > regra["limite_percentual"]:
+        return (f"{maior / total:.0%} dos compromissos a vencer se concentram em {regra['janela_dias']} dias "
+                f"a partir de {inicio_maior.strftime('%d/%m/%Y')}")
+    return None
+
+
+def _compromissos_vencidos(regra, contexto):
+    vencidos = [(vencimento, valor) for vencimento, valor in contexto["saidas"] if vencimento < contexto["hoje"]]
+    if not vencidos:
+        return None
+    total = sum(valor for _, valor in vencidos)
+    return (f"{len(vencidos)} compromisso(s) pendente(s) já vencido(s), total {total:,.2f}; "
+            f"o mais antigo em {min(vencidos)[0].strftime('%d/%m/%Y')}")
+
+
+def _saldo_negativo(regra, contexto):
+    limite = contexto["hoje"] + timedelta(days=regra["dias"])
+    entradas = sum(valor for vencimento, valor in contexto["entradas"] if vencimento <= limite)
+    saidas = sum(valor for vencimento, valor in contexto["saidas"] if vencimento <= limite)
+    saldo = contexto["fundo"]["liquidez"] + entradas - saidas
+    if saldo < 0:
+        return f"Necessidade de liquidez para compromissos em D+{regra['dias']} (saldo projetado {saldo:,.2f})"
+    return None
+
+
+AVALIADORES = {
+    "indice_liquidez_minimo": _indice_liquidez_minimo,
+    "concentracao_vencimentos": _concentracao_vencimentos,
+    "compromissos_vencidos": _compromissos_vencidos,
+    "saldo_negativo": _saldo_negativo
+}
+
+
+class MotorAlertas:
+    """Avalia as regras por fundo e mantém o conjunto de alertas ativos"""
+
+    def __init__(self, contexto_fundo, regras=None):
+        # contexto_fundo(fundo_id) -> {"fundo", "hoje", "entradas": [(data, valor)], "saidas": [...]} ou None
+        for regra in regras or REGRAS_PADRAO:
+            if regra["tipo"] not in AVALIADORES:
+                raise ValueError(f"Tipo de regra desconhecido: '{regra['tipo']}'")
+        self.regras = list(regras or REGRAS_PADRAO)
+        self._contexto_fundo = contexto_fundo
+        self._lock = threading.RLock()
+        self._ativos = {}           # (fundo_id, regra_id) -> alerta
+        self._por_fundo = {}        # fundo_id -> {regra_id}
+        self._data_avaliacao = {}   # fundo_id -> data da última avaliação
+        self._dia_referencia = None
+
+    def avaliar_fundo(self, fundo_id):
+        """Reavalia as regras de um único fundo"""
+        contexto = self._contexto_fundo(fundo_id)
+        if contexto is None:
+            self.remover_fundo(fundo_id)
+            return []
+
+        agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            disparadas = set()
+            for regra in self.regras:
+                mensagem = AVALIADORES[regra["tipo"]](regra, contexto)
+                chave = (fundo_id, regra["id"])
+                if mensagem is None:
+                    self._ativos.pop(chave, None)
+                    continue
+                disparadas.add(regra["id"])
+                anterior = self._ativos.get(chave)
+                self._ativos[chave] = {
+                    "fundo_id": fundo_id,
+                    "regra": regra["id"],
+                    "severidade": regra["severidade"],
+                    "mensagem": mensagem,
+                    "disparado_em": anterior["disparado_em"] if anterior else agora,
+                    "avaliado_em": agora
+                }
+            self._por_fundo[fundo_id] = disparadas
+            self._data_avaliacao[fundo_id] = contexto["hoje"]
+            return [self._ativos[(fundo_id, r["id"])] for r in self.regras if r["id"] in disparadas]
+
+    def remover_fundo(self, fundo_id):
+        """Remove os alertas de um fundo excluído"""
+        with self._lock:
+            for regra_id in self._por_fundo.pop(fundo_id, set()):
+                self._ativos.pop((fundo_id, regra_id), None)
+            self._data_avaliacao.pop(fundo_id, None)
+
+    def alertas_fundo(self, fundo_id):
+        """Alertas ativos de um fundo"""
+        # As regras dependem da data de hoje: reavalia se a última avaliação foi em outro dia
+        if self._data_avaliacao.get(fundo_id) != datetime.now().date():
+            self.avaliar_fundo(fundo_id)
+        with self._lock:
+            disparadas = self._por_fundo.get(fundo_id, set())
+            return [self._ativos[(fundo_id, r["id"])] for r in self.regras if r["id"] in disparadas]
+
+    def alertas(self):
+        """Todos os alertas ativos (custo proporcional ao número de alertas ativos)"""
+        hoje = datetime.now().date()
+        if self._dia_referencia != hoje:
+            # Virada de dia: uma única reavaliação completa
+            for fundo_id in list(self._data_avaliacao):
+                if self._data_avaliacao.get(fundo_id) != hoje:
+                    self.avaliar_fundo(fundo_id)
+            self._dia_referencia = hoje
+        with self._lock:
+            return list(self._ativos.values())
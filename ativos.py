@@ -0,0 +1,108 @@
+# SISTEMA TOMATE FUND - REGISTRO DE ATIVOS
+# Guarda os ativos cadastrados e os fluxos de caixa esperados de cada vencimento
+# (registros FluxoAtivo, com valores e totais em centavos inteiros)
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from registros import FluxoAtivo
+
+
+class RegistroAtivos:
+    """Ativos cadastrados com fluxos indexados por fundo e por data"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ativos = {}              # ativo_id -> ativo
+        self._fluxos_ativo = {}       # ativo_id -> [fluxos]
+        self._por_fundo = {}          # fundo_id -> [(vencimento, id_fluxo, fluxo)] ordenado
+        self._por_data = {}           # vencimento -> {id_fluxo: fluxo}
+        self._total_fundo = {}        # fundo_id -> soma dos fluxos pendentes (centavos)
+
+    def registrar(self, ativo, valor_centavos):
+        """Armazena o ativo e expande cada vencimento em um fluxo esperado de valor_centavos"""
+        vencimentos = sorted(v for v in ativo.get("vencimentos", []) if v)
+        fundo_id = ativo["fundo_id"]
+        fluxos = []
+        for n, vencimento in enumerate(vencimentos, start=1):
+            fluxos.append(FluxoAtivo(
+                id=f"{ativo['id']}-{n}",
+                fundo_id=fundo_id,
+                ativo_id=ativo["id"],
+                tipo=ativo.get("tipo_ativo") or "Ativo",
+                valor_centavos=valor_centavos,
+                vencimento=vencimento,
+                descricao=f"Vencimento {n}/{len(vencimentos)} do ativo {ativo['id']}"
+            ))
+
+        with self._lock:
+            self.remover(ativo["id"])
+            self.ativos[ativo["id"]] = ativo
+            self._fluxos_ativo[ativo["id"]] = fluxos
+            indice_fundo = self._por_fundo.setdefault(fundo_id, [])
+            for fluxo in fluxos:
+                insort(indice_fundo, (fluxo.vencimento, fluxo.id, fluxo), key=lambda item: item[:2])
+                self._por_data.setdefault(fluxo.vencimento, {})[fluxo.id] = fluxo
+            self._total_fundo[fundo_id] = self._total_fundo.get(fundo_id, 0) + valor_centavos * len(fluxos)
+        return fluxos
+
+    def remover(self, ativo_id):
+        """Remove um ativo e seus fluxos dos índices"""
+        with self._lock:
+            ativo = self.ativos.pop(ativo_id, None)
+            if ativo is None:
+                return None
+            fundo_id = ativo["fundo_id"]
+            ids = set()
+            for fluxo in self._fluxos_ativo.pop(ativo_id, []):
+                ids.add(fluxo.id)
+                self._total_fundo[fundo_id] -= fluxo.valor_centavos
+                na_data = self._por_data.get(fluxo.vencimento, {})
+                na_data.pop(fluxo.id, None)
+                if not na_data:
+                    self._por_data.pop(fluxo.vencimento, None)
+            self._por_fundo[fundo_id] = [item for item in self._por_fundo.get(fundo_id, []) if item[1] not in ids]
+            return ativo
+
+    def remover_fundo(self, fundo_id):
+        """Remove todos os ativos de um fundo e retorna seus ids"""
+        with self._lock:
+            ids = [a_id for a_id, a in self.ativos.items() if a["fundo_id"] == fundo_id]
+            for ativo_id in ids:
+                self.remover(ativo_id)
+            self._por_fundo.pop(fundo_id, None)
+            self._total_fundo.pop(fundo_id, None)
+            return ids
+
+    def listar(self, fundo_id=None):
+        """Lista os ativos (opcionalmente por fundo)"""
+        with self._lock:
+            if fundo_id is None:
+                return list(self.ativos.values())
+            return [a for a in self.ativos.values() if a["fundo_id"] == fundo_id]
+
+    def fluxos_fundo(self, fundo_id, inicio=None, fim=None):
+        """Fluxos de um fundo com vencimento entre inicio e fim (inclusive)"""
+        with self._lock:
+            indice = self._por_fundo.get(fundo_id, [])
+            esquerda = bisect_left(indice, inicio, key=lambda item: item[0]) if inicio else 0
+            direita = bisect_right(indice, fim, key=lambda item: item[0]) if fim else len(indice)
+            return [item[2] for item in indice[esquerda:direita]]
+
+    def fluxos_na_data(self, vencimento):
+        """Fluxos de todos os fundos que vencem em uma data"""
+        with self._lock:
+            return list(self._por_data.get(vencimento, {}).values())
+
+    def total_periodo(self, fundo_id, inicio=None, fim=None):
+        """Soma (centavos) dos fluxos de um fundo em uma janela de datas"""
+        if inicio is None and fim is None:
+            return self.total_fundo(fundo_id)
+        return sum(f.valor_centavos for f in self.fluxos_fundo(fundo_id, inicio, fim))
+
+    def total_fundo(self, fundo_id):
+        """Soma (centavos) de todos os fluxos esperados de um fundo"""
+        return self._total_fundo.get(fundo_id, 0)
+
+    def total_geral(self):
+        """Soma (centavos) dos fluxos esperados de todos os fundos"""
+        return sum(self._total_fundo.values())
@@ -0,0 +1 @@
+# SISTEMA TOMATE FUND - BENCHMARKS
@@ -0,0 +1,16 @@
+# SISTEMA TOMATE FUND - APLICAÇÃO PARA TESTE DE CARGA
+# Ponto de entrada WSGI usado pelo gunicorn em benchmarks/carga.py: a API com dados
+# sintéticos do tamanho definido em TOMATE_CARGA_FUNDOS / TOMATE_CARGA_LINHAS.
+# Cada worker gera os mesmos dados (mesma semente) na inicialização.
+import os
+
+import tomate_fund_vscode as api
+from benchmarks.dados import carregar_dados, gerar_dados
+
+carregar_dados(api, gerar_dados(
+    int(os.environ.get("TOMATE_CARGA_FUNDOS", 100)),
+    int(os.environ.get("TOMATE_CARGA_LINHAS", 10_000)),
+    int(os.environ.get("TOMATE_CARGA_SEED", 0))
+))
+
+app = api.app
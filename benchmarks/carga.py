@@ -0,0 +1,307 @@
+# SISTEMA TOMATE FUND - TESTE DE CARGA COM GUNICORN
+# Sobe a API sob gunicorn em localhost com dados sintéticos, dispara uma mistura
+# realista de requisições com concorrência fixa e relata vazão, latência
+# (p50/p95/p99) e taxa de erro por rota. Com várias quantidades de workers e
+# classes de worker, mostra onde a vazão deixa de crescer (saturação).
+#
+# Uso: python -m benchmarks.carga [--workers 1,2,4] [--classes sync,gthread,gevent]
+#          [--concorrencia 16] [--duracao 20] [--cenario medio] [--saida carga.json]
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.dados import CENARIOS
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mistura de requisições: (peso, rota). Predominam leituras de /relatorios e /dashboard.
+MISTURA = [
+    (40, "GET /relatorios"),
+    (30, "GET /dashboard/<id>"),
+    (8, "GET /fundos"),
+    (7, "POST /relatorios/gerar"),
+    (7, "PUT /fundos/<id>"),
+    (5, "POST /fundos"),
+    (3, "DELETE /fundos/<id>")
+]
+
+# Cada worker tem sua própria cópia dos dados em memória: um fundo criado por um
+# worker pode não existir no worker que recebe a exclusão, então 404 é esperado ali.
+STATUS_ESPERADOS = {
+    "POST /fundos": {201},
+    "DELETE /fundos/<id>": {200, 404}
+}
+
+# Crescimento mínimo de vazão ao aumentar os workers para não considerar saturado
+GANHO_MINIMO = 0.10
+
+
+class Cliente:
+    """Gera as requisições da mistura para um usuário virtual"""
+
+    def __init__(self, host, porta, fundos, rng):
+        self.conexao = http.client.HTTPConnection(host, porta, timeout=60)
+        self.fundos = fundos
+        self.rng = rng
+        self.criados = []
+        self.rotas = [r for _, r in MISTURA]
+        self.pesos = [p for p, _ in MISTURA]
+
+    def _fundo(self):
+        return str(self.rng.randint(1, self.fundos))
+
+    def requisicao(self, rota):
+        if rota == "GET /dashboard/<id>":
+            return "GET", f"/dashboard/{self._fundo()}", None
+        if rota == "POST /relatorios/gerar":
+            fundos = [self._fundo() for _ in range(5)]
+            return "POST", "/relatorios/gerar", {"tipo": "completo", "fundos": fundos}
+        if rota == "PUT /fundos/<id>":
+            return "PUT", f"/fundos/{self._fundo()}", {"liquidez": round(self.rng.uniform(1e6, 5e7), 2)}
+        if rota == "POST /fundos":
+            return "POST", "/fundos", {
+                "nome": "Fundo Carga", "cnpj": "00.000.000/0001-00", "patrimonio": 1e7, "liquidez": 1e6,
+                "politica_liquidez": "Misto", "gestor": "Tomate Capital", "taxa_admin": 1.0
+            }
+        if rota == "DELETE /fundos/<id>":
+            # Só exclui fundos criados pelo próprio teste, preservando os dados sintéticos
+            fundo_id = self.criados.pop() if self.criados else "inexistente"
+            return "DELETE", f"/fundos/{fundo_id}", None
+        metodo, path = rota.split(" ", 1)
+        return metodo, path, None
+
+    def executar(self):
+        """Uma requisição sorteada: (rota, segundos, bytes, ok)"""
+        rota = self.rng.choices(self.rotas, self.pesos)[0]
+        if rota == "DELETE /fundos/<id>" and not self.criados:
+            rota = "POST /fundos"
+        metodo, path, corpo = self.requisicao(rota)
+        cabecalhos = {"Accept-Encoding": "gzip"}
+        dados = None
+        if corpo is not None:
+            dados = json.dumps(corpo).encode()
+            cabecalhos["Content-Type"] = "application/json"
+
+        inicio = time.perf_counter()
+        try:
+            self.conexao.request(metodo, path, body=dados, headers=cabecalhos)
+            resposta = self.conexao.getresponse()
+            conteudo = resposta.read()
+            status = resposta.status
+        except (OSError, http.client.HTTPException):
+            self.conexao.close()
+            return rota, time.perf_counter() - inicio, 0, False
+        decorrido = time.perf_counter() - inicio
+
+        if rota == "POST /fundos" and status == 201:
+            self.criados.append(json.loads(conteudo)["data"]["id"])
+        ok = status in STATUS_ESPERADOS.get(rota, {200})
+        return rota, decorrido, len(conteudo), ok
+
+
+def _percentil(ordenados, q):
+    return ordenados[min(len(ordenados) - 1, int(round(q / 100 * (len(ordenados) - 1))))]
+
+
+def resumir(amostras, duracao):
+    """Vazão, latências (ms) e taxa de erro por rota e no total"""
+    por_rota = {rota: [] for _, rota in MISTURA}
+    for amostra in amostras:
+        por_rota[amostra[0]].append(amostra)
+    por_rota["TOTAL"] = amostras
+
+    resumo = {}
+    for rota, lista in por_rota.items():
+        if not lista:
+            continue
+        tempos = sorted(a[1] * 1000 for a in lista)
+        erros = sum(1 for a in lista if not a[3])
+        resumo[rota] = {
+            "requisicoes": len(lista),
+            "vazao_rps": round(len(lista) / duracao, 1),
+            "ms_p50": round(_percentil(tempos, 50), 2),
+            "ms_p95": round(_percentil(tempos, 95), 2),
+            "ms_p99": round(_percentil(tempos, 99), 2),
+            "taxa_erro": round(erros / len(lista), 4),
+            "kib_medio": round(sum(a[2] for a in lista) / len(lista) / 1024, 1)
+        }
+    return resumo
+
+
+def gerar_carga(host, porta, fundos, concorrencia, duracao, aquecimento, seed):
+    """Usuários virtuais em threads, cada um com uma conexão persistente"""
+    amostras = []
+    lock = threading.Lock()
+    inicio_medicao = time.perf_counter() + aquecimento
+    fim = inicio_medicao + duracao
+
+    def usuario(indice):
+        cliente = Cliente(host, porta, fundos, random.Random(seed * 1000 + indice))
+        locais = []
+        while True:
+            agora = time.perf_counter()
+            if agora >= fim:
+                break
+            amostra = cliente.executar()
+            if agora >= inicio_medicao:
+                locais.append(amostra)
+        cliente.conexao.close()
+        with lock:
+            amostras.extend(locais)
+
+    threads = [threading.Thread(target=usuario, args=(i,), daemon=True) for i in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return amostras
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_gunicorn(workers, classe, threads, fundos, linhas, seed):
+    """Sobe o gunicorn e espera o /health responder"""
+    porta = _porta_livre()
+    comando = [
+        sys.executable, "-m", "gunicorn", "benchmarks.app_carga:app",
+        "--chdir", RAIZ, "--bind", f"127.0.0.1:{porta}",
+        "--workers", str(workers), "--worker-class", classe,
+        "--timeout", "120", "--log-level", "warning"
+    ]
+    if classe == "gthread":
+        comando += ["--threads", str(threads)]
+    ambiente = {**os.environ, "TOMATE_CARGA_FUNDOS": str(fundos), "TOMATE_CARGA_LINHAS": str(linhas),
+                "TOMATE_CARGA_SEED": str(seed)}
+    processo = subprocess.Popen(comando, cwd=RAIZ, env=ambiente)
+
+    limite = time.time() + 300
+    while time.time() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"gunicorn terminou com código {processo.returncode}")
+        try:
+            conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=2)
+            conexao.request("GET", "/health")
+            if conexao.getresponse().status == 200:
+                conexao.close()
+                # Dá tempo aos demais workers de terminarem de carregar os dados
+                time.sleep(1 + linhas / 1_000_000)
+                return processo, porta
+        except OSError:
+            pass
+        time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("gunicorn não respondeu ao /health")
+
+
+def parar_gunicorn(processo):
+    processo.terminate()
+    try:
+        processo.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        processo.kill()
+
+
+def classe_disponivel(classe):
+    modulo = {"gevent": "gevent", "eventlet": "eventlet", "tornado": "tornado"}.get(classe)
+    if modulo is None:
+        return True
+    try:
+        __import__(modulo)
+        return True
+    except ImportError:
+        return False
+
+
+def imprimir(configuracao, resumo):
+    print(f"\n== {configuracao['classe']} x {configuracao['workers']} workers"
+          f" | concorrência {configuracao['concorrencia']} ==")
+    print(f"  {'rota':26} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'erro':>7}")
+    for rota, r in resumo.items():
+        print(f"  {rota:26} {r['requisicoes']:7d} {r['vazao_rps']:8.1f} {r['ms_p50']:8.1f}"
+              f" {r['ms_p95']:8.1f} {r['ms_p99']:8.1f} {r['taxa_erro']:7.2%}")
+
+
+def marcar_saturacao(execucoes):
+    """Para cada classe, marca onde mais workers deixam de aumentar a vazão total"""
+    por_classe = defaultdict(list)
+    for execucao in execucoes:
+        por_classe[execucao["configuracao"]["classe"]].append(execucao)
+    for lista in por_classe.values():
+        lista.sort(key=lambda e: e["configuracao"]["workers"])
+        anterior = None
+        for execucao in lista:
+            vazao = execucao["resumo"]["TOTAL"]["vazao_rps"]
+            execucao["saturado"] = anterior is not None and vazao < anterior * (1 + GANHO_MINIMO)
+            anterior = vazao
+
+
+def _lista(tipo):
+    return lambda texto: [tipo(v) for v in texto.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API sob gunicorn")
+    parser.add_argument("--workers", type=_lista(int), default=[1, 2, 4])
+    parser.add_argument("--classes", type=_lista(str), default=["sync", "gthread"])
+    parser.add_argument("--threads", type=int, default=4, help="threads por worker (gthread)")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--duracao", type=float, default=20, help="segundos medidos por configuração")
+    parser.add_argument("--aquecimento", type=float, default=3, help="segundos iniciais descartados")
+    parser.add_argument("--cenario", choices=sorted(CENARIOS), default="medio")
+    parser.add_argument("--fundos", type=int)
+    parser.add_argument("--linhas", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--saida", help="arquivo JSON onde gravar os resultados")
+    args = parser.parse_args(argv)
+
+    fundos, linhas = CENARIOS[args.cenario]
+    fundos = args.fundos or fundos
+    linhas = args.linhas if args.linhas is not None else linhas
+
+    execucoes = []
+    for classe in args.classes:
+        if not classe_disponivel(classe):
+            print(f"Classe de worker '{classe}' indisponível (dependência não instalada), ignorada")
+            continue
+        for workers in args.workers:
+            processo, porta = iniciar_gunicorn(workers, classe, args.threads, fundos, linhas, args.seed)
+            try:
+                amostras = gerar_carga("127.0.0.1", porta, fundos, args.concorrencia,
+                                       args.duracao, args.aquecimento, args.seed)
+            finally:
+                parar_gunicorn(processo)
+            configuracao = {"classe": classe, "workers": workers, "concorrencia": args.concorrencia,
+                            "threads": args.threads if classe == "gthread" else 1}
+            resumo = resumir(amostras, args.duracao)
+            imprimir(configuracao, resumo)
+            execucoes.append({"configuracao": configuracao, "resumo": resumo})
+
+    marcar_saturacao(execucoes)
+    print(f"\nVazão total ({fundos:,} fundos, {linhas:,} linhas):")
+    for execucao in execucoes:
+        c, total = execucao["configuracao"], execucao["resumo"]["TOTAL"]
+        marca = "  <- saturado" if execucao["saturado"] else ""
+        print(f"  {c['classe']:8} {c['workers']:3d} workers: {total['vazao_rps']:8.1f} req/s"
+              f"  p99 {total['ms_p99']:8.1f} ms  erro {total['taxa_erro']:.2%}{marca}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"cenario": {"fundos": fundos, "linhas": linhas, "seed": args.seed},
+                       "duracao_s": args.duracao, "execucoes": execucoes},
+                      arquivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
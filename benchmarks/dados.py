@@ -0,0 +1,143 @@
+# SISTEMA TOMATE FUND - GERADOR DE DADOS SINTÉTICOS
+# Gera fundos, compromissos, recebimentos e subscrições de forma determinística
+# (mesma semente, mesmos dados) e substitui o "banco de dados" da API por eles.
+from calendar import timegm
+from datetime import date, timedelta
+import random
+
+from particionamento import MapaShards
+from registros import Compromisso, Fundo, Recebimento, Subscricao
+
+# Tamanhos pré-definidos: (fundos, linhas somadas dos três livros)
+CENARIOS = {
+    "pequeno": (10, 100),
+    "medio": (100, 10_000),
+    "grande": (1_000, 500_000),
+    "maximo": (10_000, 5_000_000)
+}
+
+# Proporção das linhas em cada livro
+PROPORCAO_LIVROS = {"compromissos": 0.4, "recebimentos": 0.4, "subscricoes": 0.2}
+
+POLITICAS = ["Ativos de Risco", "Livre de Risco", "Misto", "Específico"]
+GESTORES = ["Tomate Capital", "Tomate Asset", "Tomate Crédito", "Tomate Real Estate"]
+TIPOS_COMPROMISSO = ["Taxa Administração", "Taxa Performance", "Debênture ABC Corp", "SPA Pagamento", "Amortização CCB"]
+TIPOS_RECEBIMENTO = ["Debênture XYZ Corp", "Recebível Comercial", "CRI Imobiliário", "Nota Comercial", "Dividendos"]
+COTISTAS = ["João Silva", "Maria Santos", "Empresa ABC Ltda", "Previdência Alfa", "Family Office Beta"]
+
+# Vencimentos espalhados em um ano a partir desta data
+DATA_BASE = date(2025, 1, 2)
+HORIZONTE_DIAS = 365
+
+
+def _cnpj(n):
+    digitos = f"{n:012d}"
+    return f"{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{n % 97:02d}"
+
+
+def gerar_dados(fundos, linhas, seed=0):
+    """Dados sintéticos no mesmo formato das estruturas da API"""
+    rng = random.Random(seed)
+    vencimentos = [(DATA_BASE + timedelta(days=d)).isoformat() for d in range(HORIZONTE_DIAS)]
+    ids_fundos = [str(i + 1) for i in range(fundos)]
+
+    fundos_data = {}
+    for i, fundo_id in enumerate(ids_fundos):
+        patrimonio = round(rng.uniform(5e6, 5e8), 2)
+        fundos_data[fundo_id] = {
+            "id": fundo_id,
+            "nome": f"Fundo Sintético {i + 1}",
+            "cnpj": _cnpj(i + 1),
+            "patrimonio": patrimonio,
+            "liquidez": round(patrimonio * rng.uniform(0.02, 0.2), 2),
+            "politica_liquidez": POLITICAS[i % len(POLITICAS)],
+            "prazo_resgate": rng.choice([1, 5, 15, 30, 60]),
+            "gestor": GESTORES[i % len(GESTORES)],
+            "taxa_admin": round(rng.uniform(0.5, 2.5), 2),
+            "data_criacao": "2024-01-15",
+            "status": "ATIVO"
+        }
+
+    def livro(quantidade, tipos):
+        return [
+            {
+                "id": i + 1,
+                "fundo_id": rng.choice(ids_fundos),
+                "tipo": tipos[i % len(tipos)],
+                # Cauda longa para que a análise de outliers tenha o que encontrar
+                "valor": round(rng.lognormvariate(11.5, 1.0), 2),
+                "vencimento": rng.choice(vencimentos),
+                "status": "PENDENTE",
+                "descricao": f"{tipos[i % len(tipos)]} sintético {i + 1}"
+            }
+            for i in range(quantidade)
+        ]
+
+    compromissos = livro(int(linhas * PROPORCAO_LIVROS["compromissos"]), TIPOS_COMPROMISSO)
+    recebimentos = livro(int(linhas * PROPORCAO_LIVROS["recebimentos"]), TIPOS_RECEBIMENTO)
+
+    subscricoes = []
+    for i in range(linhas - len(compromissos) - len(recebimentos)):
+        total_parcelas = rng.choice([1, 2, 3, 5, 10])
+        cotas = rng.randrange(100, 10_000, 100)
+        subscricoes.append({
+            "id": i + 1,
+            "fundo_id": rng.choice(ids_fundos),
+            "cotista": COTISTAS[i % len(COTISTAS)],
+            "cpf_cnpj": _cnpj(1_000_000 + i),
+            "cotas": cotas,
+            "valor_parcela": round(cotas * 100.0 / total_parcelas, 2),
+            "vencimento": rng.choice(vencimentos),
+            "status": "PENDENTE",
+            "parcela": f"{rng.randint(1, total_parcelas)}/{total_parcelas}"
+        })
+
+    return {
+        "fundos": fundos_data,
+        "compromissos": compromissos,
+        "recebimentos": recebimentos,
+        "subscricoes": subscricoes
+    }
+
+
+def carregar_dados(api, dados):
+    """Substitui os dados do módulo da API pelos dados gerados (como registros compactos)
+
+    Ativos, provisões, índice de busca e alertas voltam ao estado vazio; os alertas
+    de cada fundo são avaliados sob demanda na primeira consulta. As visões
+    materializadas são descartadas e recalculadas na primeira consulta. Em um shard
+    (TOMATE_SHARD) ficam só os fundos do shard e seus livros.
+    """
+    fundos = {fid: Fundo.de_dict(f) for fid, f in dados["fundos"].items()}
+    if api.SHARD is not None:
+        mapa = MapaShards(api.SHARD[1])
+        fundos = {fid: f for fid, f in fundos.items() if mapa.dono(fid) == api.SHARD[0]}
+    api.FUNDOS_DATA.clear()
+    api.FUNDOS_DATA.update(fundos)
+    api.COMPROMISSOS_DATA = [Compromisso.de_dict(c) for c in dados["compromissos"] if c["fundo_id"] in fundos]
+    api.RECEBIMENTOS_DATA = [Recebimento.de_dict(r) for r in dados["recebimentos"] if r["fundo_id"] in fundos]
+    api.SUBSCRICOES_DATA = [Subscricao.de_dict(s) for s in dados["subscricoes"] if s["fundo_id"] in fundos]
+    api.DOCUMENTOS_DATA.clear()
+    api.PROVISOES_TAXA_ADMIN.clear()
+    api.REGISTRO_ATIVOS = api.RegistroAtivos()
+    api.INDICE_BUSCA = api.IndiceInvertido()
+    api.MOTOR_ALERTAS = api.MotorAlertas(api.contexto_alertas)
+    api.HISTORICO_FUNDOS = api.HistoricoFundos()
+    api.AGREGADOR_RELATORIOS.invalidar()
+    api.VISOES.invalidar()
+
+
+def gerar_historico(historico, fundo, dias=3 * HORIZONTE_DIAS, por_dia=96, seed=0):
+    """Preenche o histórico do fundo com 'dias' de atualizações intradiárias (passeio aleatório)
+
+    Retorna o número de pontos registrados.
+    """
+    rng = random.Random(seed)
+    inicio = timegm((DATA_BASE - timedelta(days=dias)).timetuple())
+    passo = 86400 // por_dia
+    patrimonio, liquidez = fundo.patrimonio_centavos, fundo.liquidez_centavos
+    for i in range(dias * por_dia):
+        patrimonio = max(0, patrimonio + round(patrimonio * rng.gauss(0, 0.001)))
+        liquidez = max(0, liquidez + round(liquidez * rng.gauss(0, 0.002)))
+        historico.registrar(fundo.id, patrimonio, liquidez, inicio + i * passo)
+    return len(historico.series[fundo.id])
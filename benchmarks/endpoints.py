@@ -0,0 +1,202 @@
+# SISTEMA TOMATE FUND - BENCHMARK DAS ROTAS PRINCIPAIS
+# Carrega dados sintéticos no tamanho pedido e mede as rotas pelo test client do Flask.
+# O resultado é gravado em JSON para comparação entre versões; com um orçamento de
+# latência (ms de p95 por rota), o processo termina com código 1 se algum for excedido.
+# Toda requisição medida precisa responder 2xx: uma rota quebrada interrompe a execução
+# (código 2) em vez de virar uma latência (de uma página de erro) no resultado.
+#
+# Uso: python -m benchmarks.endpoints [--cenario medio | --fundos 100 --linhas 10000]
+#          [--repeticoes 10] [--saida resultado.json] [--base anterior.json]
+#          [--orcamento orcamento.json] [--limite get_relatorios=50 ...]
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import tomate_fund_vscode as api
+from benchmarks.dados import CENARIOS, carregar_dados, gerar_dados, gerar_historico
+
+# Fundos incluídos no relatório personalizado (o filtro é por lista de ids)
+FUNDOS_RELATORIO = 10
+# Histórico do fundo consultado: três anos de atualizações a cada 15 minutos
+DIAS_HISTORICO = 3 * 365
+ATUALIZACOES_POR_DIA = 96
+
+
+def _percentil(valores, q):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(q / 100 * (len(ordenados) - 1))))]
+
+
+class RespostaInvalida(Exception):
+    """Requisição medida que não respondeu 2xx"""
+
+
+def medir(cliente, requisicoes, repeticoes):
+    """Executa 'repeticoes' requisições (após uma de aquecimento) e resume as latências
+
+    requisicoes(i) -> (método, path, corpo JSON ou None) da i-ésima execução;
+    levanta RespostaInvalida se alguma (inclusive o aquecimento) não responder 2xx
+    """
+    tempos, tamanhos, status = [], [], set()
+    for i in range(-1, repeticoes):
+        metodo, path, corpo = requisicoes(i)
+        inicio = time.perf_counter()
+        resposta = cliente.open(path, method=metodo, json=corpo)
+        dados = resposta.get_data()
+        decorrido = (time.perf_counter() - inicio) * 1000
+        if not 200 <= resposta.status_code < 300:
+            raise RespostaInvalida(f"{metodo} {path} respondeu {resposta.status_code}: {dados[:200].decode(errors='replace')}")
+        if i < 0:
+            continue
+        tempos.append(decorrido)
+        tamanhos.append(len(dados))
+        status.add(resposta.status_code)
+    return {
+        "repeticoes": repeticoes,
+        "ms_min": round(min(tempos), 3),
+        "ms_mediana": round(statistics.median(tempos), 3),
+        "ms_p95": round(_percentil(tempos, 95), 3),
+        "ms_max": round(max(tempos), 3),
+        "bytes_resposta": int(statistics.median(tamanhos)),
+        "status": sorted(status)
+    }
+
+
+def executar(fundos, linhas, repeticoes, seed=0):
+    """Gera os dados, mede cada rota e retorna o resultado completo"""
+    inicio = time.perf_counter()
+    carregar_dados(api, gerar_dados(fundos, linhas, seed))
+    ids = list(api.FUNDOS_DATA.keys())
+    pontos_historico = gerar_historico(api.HISTORICO_FUNDOS, api.FUNDOS_DATA[ids[0]], DIAS_HISTORICO, ATUALIZACOES_POR_DIA, seed)
+    tempo_geracao = time.perf_counter() - inicio
+
+    cliente = api.app.test_client()
+    corpo_relatorio = {"tipo": "completo", "fundos": ids[:FUNDOS_RELATORIO]}
+
+    rotas = {}
+    rotas["get_relatorios"] = medir(cliente, lambda i: ("GET", "/relatorios", None), repeticoes)
+    # Sem a visão materializada: o cálculo completo a cada requisição
+    rotas["get_relatorios_ao_vivo"] = medir(cliente, lambda i: ("GET", "/relatorios?ao_vivo=true", None), repeticoes)
+    rotas["gerar_relatorio_personalizado"] = medir(
+        cliente, lambda i: ("POST", "/relatorios/gerar", corpo_relatorio), repeticoes
+    )
+    rotas["get_dashboard_fundo"] = medir(
+        cliente, lambda i: ("GET", f"/dashboard/{ids[i % len(ids)]}", None), repeticoes
+    )
+    rotas["get_outliers"] = medir(cliente, lambda i: ("GET", "/outliers", None), repeticoes)
+    # Todo o histórico (resolução automática) e um ano em resolução diária
+    rotas["get_historico_fundo"] = medir(
+        cliente, lambda i: ("GET", f"/fundos/{ids[0]}/historico", None), repeticoes
+    )
+    rotas["get_historico_fundo_diario"] = medir(
+        cliente, lambda i: ("GET", f"/fundos/{ids[0]}/historico?inicio=2024-01-01&fim=2024-12-31&resolucao=diario", None), repeticoes
+    )
+    # Por último, pois remove dados: um fundo diferente a cada execução, a partir do fim
+    excluir = ids[-(repeticoes + 1):]
+    rotas["deletar_fundo"] = medir(
+        cliente, lambda i: ("DELETE", f"/fundos/{excluir[i + 1]}", None), min(repeticoes, len(ids) - 1)
+    )
+
+    return {
+        "cenario": {"fundos": fundos, "linhas": linhas, "seed": seed, "pontos_historico": pontos_historico},
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "processador": platform.processor() or platform.machine()
+        },
+        "data_execucao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "tempo_geracao_s": round(tempo_geracao, 3),
+        "rotas": rotas
+    }
+
+
+def verificar_orcamento(resultado, orcamento):
+    """Rotas cujo p95 excede o orçamento (ms)"""
+    violacoes = []
+    for rota, limite in orcamento.items():
+        medido = resultado["rotas"].get(rota)
+        if medido is None:
+            raise ValueError(f"Rota desconhecida no orçamento: '{rota}'")
+        if medido["ms_p95"] > limite:
+            violacoes.append({"rota": rota, "ms_p95": medido["ms_p95"], "orcamento_ms": limite})
+    return violacoes
+
+
+def comparar(resultado, base):
+    """Linhas de comparação da mediana com um resultado anterior"""
+    linhas = []
+    for rota, medido in resultado["rotas"].items():
+        anterior = base.get("rotas", {}).get(rota)
+        if anterior and anterior["ms_mediana"]:
+            variacao = medido["ms_mediana"] / anterior["ms_mediana"] - 1
+            linhas.append(f"  {rota:32} {anterior['ms_mediana']:10.2f} -> {medido['ms_mediana']:10.2f} ms  ({variacao:+.1%})")
+    return linhas
+
+
+def _limite(texto):
+    rota, _, valor = texto.partition("=")
+    try:
+        return rota, float(valor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Limite inválido: '{texto}' (use rota=ms)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das rotas principais com dados sintéticos")
+    parser.add_argument("--cenario", choices=sorted(CENARIOS), default="pequeno")
+    parser.add_argument("--fundos", type=int, help="sobrepõe o número de fundos do cenário")
+    parser.add_argument("--linhas", type=int, help="sobrepõe o total de linhas dos livros do cenário")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--saida", help="arquivo JSON onde gravar o resultado")
+    parser.add_argument("--base", help="resultado JSON anterior para comparação")
+    parser.add_argument("--orcamento", help="arquivo JSON {rota: ms de p95}")
+    parser.add_argument("--limite", type=_limite, action="append", default=[], help="orçamento de uma rota (rota=ms)")
+    args = parser.parse_args(argv)
+
+    fundos, linhas = CENARIOS[args.cenario]
+    fundos = args.fundos or fundos
+    linhas = args.linhas if args.linhas is not None else linhas
+    if fundos < 2 or args.repeticoes < 1:
+        parser.error("são necessários ao menos 2 fundos e 1 repetição")
+
+    orcamento = {}
+    if args.orcamento:
+        with open(args.orcamento, encoding="utf-8") as arquivo:
+            orcamento.update(json.load(arquivo))
+    orcamento.update(dict(args.limite))
+
+    try:
+        resultado = executar(fundos, linhas, args.repeticoes, args.seed)
+    except RespostaInvalida as e:
+        print(f"FALHA: {e}", file=sys.stderr)
+        return 2
+    resultado["orcamento_ms_p95"] = orcamento
+    resultado["violacoes"] = verificar_orcamento(resultado, orcamento)
+
+    print(f"{fundos:,} fundos, {linhas:,} linhas (dados gerados em {resultado['tempo_geracao_s']:.1f} s)")
+    print(f"  {'rota':32} {'mediana':>10} {'p95':>10} {'máx':>10} {'KiB':>10}")
+    for rota, medido in resultado["rotas"].items():
+        print(f"  {rota:32} {medido['ms_mediana']:10.2f} {medido['ms_p95']:10.2f} {medido['ms_max']:10.2f}"
+              f" {medido['bytes_resposta'] / 1024:10.1f}")
+
+    if args.base:
+        with open(args.base, encoding="utf-8") as arquivo:
+            print("Comparação com", args.base, "(mediana)")
+            print("\n".join(comparar(resultado, json.load(arquivo))))
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+
+    for violacao in resultado["violacoes"]:
+        print(f"ORÇAMENTO EXCEDIDO: {violacao['rota']} p95 {violacao['ms_p95']:.2f} ms > {violacao['orcamento_ms']:.2f} ms")
+    return 1 if resultado["violacoes"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
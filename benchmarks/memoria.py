@@ -0,0 +1,77 @@
+# SISTEMA TOMATE FUND - BENCHMARK DE MEMÓRIA POR LINHA
+# Compara os bytes retidos por linha de cada livro guardado como dict (formato antigo)
+# e como registro compacto (registros.py). As linhas passam por JSON antes, como as
+# que chegam pela API: cada uma traz suas próprias cópias de status, tipo, fundo_id...
+# que o registro interna e o dict mantém duplicadas.
+#
+# Uso: python -m benchmarks.memoria [--linhas 100000] [--fundos 100] [--saida memoria.json]
+import argparse
+import gc
+import json
+import tracemalloc
+
+from benchmarks.dados import gerar_dados
+from registros import Compromisso, Fundo, Recebimento, Subscricao
+
+LIVROS = {
+    "fundos": Fundo,
+    "compromissos": Compromisso,
+    "recebimentos": Recebimento,
+    "subscricoes": Subscricao
+}
+
+
+def _retido(construir):
+    """Bytes ainda alocados depois de construir (e manter) o resultado"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        inicio = tracemalloc.get_traced_memory()[0]
+        resultado = construir()
+        gc.collect()
+        retido = tracemalloc.get_traced_memory()[0] - inicio
+    finally:
+        tracemalloc.stop()
+    return retido, resultado
+
+
+def medir(linhas_json, classe):
+    """Bytes por linha como dict e como registro, a partir das mesmas linhas em JSON"""
+    dicts, linhas = _retido(lambda: json.loads(linhas_json))
+    # O registro é montado a partir do dict, que é descartado: fica só o que o registro retém
+    registros, _ = _retido(lambda: [classe.de_dict(linha) for linha in json.loads(linhas_json)])
+    return {
+        "linhas": len(linhas),
+        "dict_bytes_linha": round(dicts / len(linhas), 1),
+        "registro_bytes_linha": round(registros / len(linhas), 1),
+        "reducao": round(1 - registros / dicts, 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória por linha: dict x registro compacto")
+    parser.add_argument("--linhas", type=int, default=100_000, help="linhas somadas dos três livros")
+    parser.add_argument("--fundos", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--saida", help="grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    dados = gerar_dados(args.fundos, args.linhas, args.seed)
+    dados["fundos"] = list(dados["fundos"].values())
+
+    resultado = {}
+    print(f"  {'livro':<14} {'linhas':>9} {'dict B/linha':>13} {'registro B/linha':>17} {'redução':>8}")
+    for livro, classe in LIVROS.items():
+        resultado[livro] = medir(json.dumps(dados[livro]), classe)
+        r = resultado[livro]
+        print(f"  {livro:<14} {r['linhas']:>9,} {r['dict_bytes_linha']:>13.1f} "
+              f"{r['registro_bytes_linha']:>17.1f} {r['reducao']:>8.1%}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+    return resultado
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# SISTEMA TOMATE FUND - BENCHMARK DE SERIALIZAÇÃO E COMPRESSÃO
+# Compara o provider JSON padrão com o JSONProviderRapido e mede os bytes
+# transferidos por /compromissos com e sem gzip.
+#
+# Uso: python -m benchmarks.serializacao [--linhas 100000] [--repeticoes 5]
+import argparse
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+import tomate_fund_vscode as api
+from benchmarks.dados import carregar_dados, gerar_dados
+from serializacao import JSONProviderRapido, orjson
+
+# Fundos a que os compromissos sintéticos pertencem (fundo_id de 1 a FUNDOS)
+FUNDOS = 50
+
+
+def gerar_compromissos(linhas):
+    """Compromissos sintéticos no mesmo formato de COMPROMISSOS_DATA"""
+    tipos = ["Taxa Administração", "Debênture ABC Corp", "Taxa Performance", "SPA Pagamento"]
+    return [
+        {
+            "id": i,
+            "fundo_id": str(i % FUNDOS + 1),
+            "tipo": tipos[i % len(tipos)],
+            "valor": round(1000 + (i * 7919) % 500000 + 0.37, 2),
+            "vencimento": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "status": "PENDENTE",
+            "descricao": f"Compromisso sintético {i}"
+        }
+        for i in range(linhas)
+    ]
+
+
+def cronometrar(funcao, repeticoes):
+    """Menor tempo (ms) entre as repetições"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return min(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialização JSON e gzip")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    # Os livros guardam registros compactos (registros.py): a carga passa pelo mesmo caminho da API
+    dados = gerar_dados(FUNDOS, 0)
+    dados["compromissos"] = gerar_compromissos(args.linhas)
+    carregar_dados(api, dados)
+    payload = {"success": True, "data": [c.para_dict() for c in api.COMPROMISSOS_DATA], "total_itens": args.linhas}
+
+    padrao = DefaultJSONProvider(api.app)
+    rapido = JSONProviderRapido(api.app)
+    with api.app.app_context():
+        t_padrao, _ = cronometrar(lambda: padrao.response(payload).get_data(), args.repeticoes)
+        t_rapido, _ = cronometrar(lambda: rapido.response(payload).get_data(), args.repeticoes)
+
+    cliente = api.app.test_client()
+    for cabecalhos in ({}, {"Accept-Encoding": "gzip"}):
+        resposta = cliente.get("/compromissos", headers=cabecalhos)
+        if resposta.status_code != 200:
+            raise SystemExit(f"/compromissos respondeu {resposta.status_code}: {resposta.get_data(as_text=True)[:200]}")
+    t_sem, sem_gzip = cronometrar(lambda: cliente.get("/compromissos").get_data(), args.repeticoes)
+    t_com, com_gzip = cronometrar(
+        lambda: cliente.get("/compromissos", headers={"Accept-Encoding": "gzip"}).get_data(), args.repeticoes
+    )
+
+    print(f"/compromissos com {args.linhas:,} linhas (melhor de {args.repeticoes})")
+    print(f"  serialização padrão (json):        {t_padrao:9.1f} ms")
+    print(f"  serialização rápida ({'orjson' if orjson else 'json':6}):      {t_rapido:9.1f} ms  ({t_padrao / t_rapido:.1f}x)")
+    print(f"  resposta sem gzip:                 {t_sem:9.1f} ms  {len(sem_gzip) / 1024:10.1f} KiB")
+    print(f"  resposta com gzip:                 {t_com:9.1f} ms  {len(com_gzip) / 1024:10.1f} KiB"
+          f"  ({len(sem_gzip) / len(com_gzip):.1f}x menor)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# SISTEMA TOMATE FUND - BUSCA TEXTUAL
+# Índice invertido em memória sobre ativos e documentos cadastrados
+import heapq
+import math
+import re
+import threading
+import unicodedata
+import zipfile
+from collections import Counter
+from io import BytesIO
+
+# Palavras muito frequentes em português que não ajudam a ranquear
+STOPWORDS = {
+    "a", "ao", "aos", "as", "com", "da", "das", "de", "do", "dos", "e", "em",
+    "na", "nas", "no", "nos", "o", "os", "ou", "para", "pela", "pelas", "pelo",
+    "pelos", "por", "que", "se", "sem", "sob", "sobre", "um", "uma", "uns", "umas"
+}
+
+_RE_TOKEN = re.compile(r"[a-z0-9]+")
+_RE_TAG_XML = re.compile(r"<[^>]+>")
+_RE_PARAGRAFO_DOCX = re.compile(r"</w:p>")
+
+# Parâmetros do ranqueamento BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalizar_texto(texto):
+    """Remove acentos e converte para minúsculas"""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    sem_acento = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return sem_acento.lower()
+
+
+def tokenizar(texto):
+    """Quebra o texto em termos normalizados, sem stopwords"""
+    return [t for t in _RE_TOKEN.findall(normalizar_texto(texto)) if t not in STOPWORDS]
+
+
+def extrair_texto_documento(nome_arquivo, conteudo):
+    """Extrai o texto de um arquivo enviado (.docx ou texto puro)"""
+    if not conteudo:
+        return ""
+    nome = (nome_arquivo or "").lower()
+    if nome.endswith(".docx"):
+        try:
+            with zipfile.ZipFile(BytesIO(conteudo)) as docx:
+                xml = docx.read("word/document.xml").decode("utf-8", errors="ignore")
+        except (zipfile.BadZipFile, KeyError):
+            return ""
+        xml = _RE_PARAGRAFO_DOCX.sub("\n", xml)
+        return _RE_TAG_XML.sub("", xml)
+    if nome.endswith((".txt", ".csv", ".md")):
+        try:
+            return conteudo.decode("utf-8")
+        except UnicodeDecodeError:
+            return conteudo.decode("latin-1")
+    return ""
+
+
+class IndiceInvertido:
+    """Índice invertido com atualização incremental e ranqueamento BM25"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}      # termo -> {doc_id: frequência}
+        self._documentos = {}    # doc_id -> (termos, comprimento, metadados)
+        self._total_termos = 0
+
+    def __len__(self):
+        return len(self._documentos)
+
+    def indexar(self, doc_id, texto, metadados=None):
+        """Indexa (ou reindexa) um documento"""
+        termos = Counter(tokenizar(texto))
+        with self._lock:
+            self._remover(doc_id)
+            for termo, frequencia in termos.items():
+                self._postings.setdefault(termo, {})[doc_id] = frequencia
+            comprimento = sum(termos.values())
+            self._documentos[doc_id] = (termos, comprimento, metadados or {})
+            self._total_termos += comprimento
+
+    def remover(self, doc_id):
+        """Remove um documento do índice"""
+        with self._lock:
+            self._remover(doc_id)
+
+    def _remover(self, doc_id):
+        registro = self._documentos.pop(doc_id, None)
+        if registro is None:
+            return
+        termos, comprimento, _ = registro
+        for termo in termos:
+            postings = self._postings.get(termo)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[termo]
+        self._total_termos -= comprimento
+
+    def buscar(self, consulta, limite=20):
+        """Retorna os documentos mais relevantes para a consulta"""
+        termos_consulta = set(tokenizar(consulta))
+        if not termos_consulta:
+            return []
+
+        with self._lock:
+            total_docs = len(self._documentos)
+            if not total_docs:
+                return []
+            comprimento_medio = self._total_termos / total_docs or 1
+            pontuacoes = {}
+
+            for termo in termos_consulta:
+                postings = self._postings.get(termo)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequencia in postings.items():
+                    comprimento = self._documentos[doc_id][1]
+                    norma = BM25_K1 * (1 - BM25_B + BM25_B * comprimento / comprimento_medio)
+                    parcial = idf * frequencia * (BM25_K1 + 1) / (frequencia + norma)
+                    pontuacoes[doc_id] = pontuacoes.get(doc_id, 0.0) + parcial
+
+            melhores = heapq.nlargest(limite, pontuacoes.items(), key=lambda item: item[1])
+            return [
+                {"id": doc_id, "score": round(score, 4), **self._documentos[doc_id][2]}
+                for doc_id, score in melhores
+            ]
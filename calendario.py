@@ -0,0 +1,130 @@
+# SISTEMA TOMATE FUND - CALENDÁRIO DE DIAS ÚTEIS
+# Feriados nacionais pré-calculados em um bitmap com contagem acumulada,
+# para aritmética de dias úteis (D+N, prazos de resgate, base 252) em O(1)
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+ANO_INICIO_PADRAO = 2000
+ANO_FIM_PADRAO = 2078
+
+# Feriados nacionais de data fixa (mês, dia)
+FERIADOS_FIXOS = [
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (12, 25),  # Natal
+]
+
+# Dia Nacional de Zumbi e da Consciência Negra (Lei 14.759/2023)
+ANO_INICIO_CONSCIENCIA_NEGRA = 2024
+
+
+def domingo_pascoa(ano):
+    """Data da Páscoa pelo algoritmo de Meeus/Jones/Butcher"""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados_nacionais(ano):
+    """Feriados nacionais (incluindo Carnaval e Corpus Christi) de um ano"""
+    feriados = [date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS]
+    if ano >= ANO_INICIO_CONSCIENCIA_NEGRA:
+        feriados.append(date(ano, 11, 20))
+    pascoa = domingo_pascoa(ano)
+    feriados += [
+        pascoa - timedelta(days=48),  # Segunda de Carnaval
+        pascoa - timedelta(days=47),  # Terça de Carnaval
+        pascoa - timedelta(days=2),   # Sexta-feira Santa
+        pascoa + timedelta(days=60),  # Corpus Christi
+    ]
+    return sorted(feriados)
+
+
+class CalendarioDiasUteis:
+    """Bitmap de dias úteis e contagem acumulada para um intervalo de anos"""
+
+    def __init__(self, ano_inicio=ANO_INICIO_PADRAO, ano_fim=ANO_FIM_PADRAO, feriados_extras=()):
+        self.inicio = np.datetime64(f"{ano_inicio:04d}-01-01", "D")
+        self.fim = np.datetime64(f"{ano_fim + 1:04d}-01-01", "D")
+        dias = np.arange(self.inicio, self.fim)
+
+        feriados = [d for ano in range(ano_inicio, ano_fim + 1) for d in feriados_nacionais(ano)]
+        feriados += list(feriados_extras)
+        offsets = (np.array(feriados, dtype="datetime64[D]") - self.inicio).astype(np.int64)
+        offsets = offsets[(offsets >= 0) & (offsets < len(dias))]
+
+        self.feriado = np.zeros(len(dias), dtype=bool)
+        self.feriado[offsets] = True
+        # 1970-01-01 foi quinta-feira: (dias desde a época + 3) % 7 -> 0 = segunda
+        dia_semana = (dias.astype(np.int64) + 3) % 7
+        self.util = (dia_semana < 5) & ~self.feriado
+
+        # acumulado[i] = dias úteis em [inicio, inicio + i)
+        self.acumulado = np.zeros(len(dias) + 1, dtype=np.int64)
+        np.cumsum(self.util, out=self.acumulado[1:])
+        # posicao_util[k] = offset do k-ésimo dia útil do calendário
+        self.posicao_util = np.flatnonzero(self.util)
+
+    def _offsets(self, datas):
+        valores = np.asarray(datas, dtype="datetime64[D]")
+        offsets = (valores - self.inicio).astype(np.int64)
+        if np.any(offsets < 0) or np.any(offsets > len(self.util)):
+            raise ValueError(f"Data fora do calendário ({self.inicio} a {self.fim})")
+        return offsets
+
+    def _datas(self, offsets, escalar):
+        resultado = self.inicio + offsets
+        return resultado.astype(object) if escalar else resultado
+
+    def eh_dia_util(self, datas):
+        """Indica se cada data é dia útil"""
+        offsets = self._offsets(datas)
+        if np.any(offsets >= len(self.util)):
+            raise ValueError(f"Data fora do calendário ({self.inicio} a {self.fim})")
+        return self.util[offsets]
+
+    def dias_uteis_entre(self, inicio, fim):
+        """Dias úteis em [inicio, fim); negativo se fim < inicio"""
+        return self.acumulado[self._offsets(fim)] - self.acumulado[self._offsets(inicio)]
+
+    def somar_dias_uteis(self, datas, dias):
+        """D+N: N dias úteis após cada data (a partir do próximo dia útil se a data não for útil)"""
+        escalar = np.ndim(datas) == 0 and np.ndim(dias) == 0
+        ordem = self.acumulado[self._offsets(datas)] + np.asarray(dias, dtype=np.int64)
+        if np.any(ordem < 0) or np.any(ordem >= len(self.posicao_util)):
+            raise ValueError("Resultado fora do calendário")
+        return self._datas(self.posicao_util[ordem], escalar)
+
+    def proximo_dia_util(self, datas):
+        """A própria data se for útil, senão o próximo dia útil"""
+        return self.somar_dias_uteis(datas, 0)
+
+    def dia_util_anterior(self, datas):
+        """A própria data se for útil, senão o dia útil anterior"""
+        escalar = np.ndim(datas) == 0
+        offsets = np.minimum(self._offsets(datas) + 1, len(self.util))
+        ordem = self.acumulado[offsets] - 1
+        if np.any(ordem < 0):
+            raise ValueError("Resultado fora do calendário")
+        return self._datas(self.posicao_util[ordem], escalar)
+
+
+@lru_cache(maxsize=None)
+def calendario_padrao():
+    """Calendário nacional compartilhado pelo sistema"""
+    return CalendarioDiasUteis()
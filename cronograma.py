@@ -0,0 +1,94 @@
+# SISTEMA TOMATE FUND - CRONOGRAMA DE SUBSCRIÇÕES
+# Parcelas futuras das subscrições geradas sob demanda (geradores),
+# apenas até o horizonte pedido, para projetar chamadas de capital
+from calendar import monthrange
+from datetime import date
+
+
+def parse_parcela(parcela):
+    """'2/5' -> (2, 5)"""
+    atual, total = str(parcela).split("/")
+    return int(atual), int(total)
+
+
+def somar_meses(data, meses):
+    """Soma meses a uma data, ajustando para o último dia do mês quando necessário"""
+    ano, mes = divmod(data.month - 1 + meses, 12)
+    ano += data.year
+    return date(ano, mes + 1, min(data.day, monthrange(ano, mes + 1)[1]))
+
+
+def _valores_centavos(subscricao, total_parcelas):
+    """Valor de cada parcela em centavos (o resto da divisão vai para a última)"""
+    if subscricao.get("compromisso_total") is None:
+        valor = round(subscricao["valor_parcela"] * 100)
+        return valor, valor
+    total = round(subscricao["compromisso_total"] * 100)
+    base = total // total_parcelas
+    return base, total - base * (total_parcelas - 1)
+
+
+def parcelas(subscricao, inicio=None, fim=None):
+    """Gera as parcelas de uma subscrição entre inicio e fim, a partir da parcela atual
+
+    A parcela atual é a indicada em 'parcela' com vencimento em 'vencimento';
+    as seguintes vencem a cada 'periodo_meses' meses. Nada é materializado além de 'fim'.
+    """
+    atual, total = parse_parcela(subscricao["parcela"])
+    periodo = int(subscricao.get("periodo_meses", 1))
+    if periodo < 1:
+        raise ValueError(f"Período inválido na subscrição {subscricao['id']}: {periodo} (periodo_meses deve ser >= 1)")
+    base = date.fromisoformat(subscricao["vencimento"])
+    inicio = date.fromisoformat(inicio) if isinstance(inicio, str) else inicio
+    fim = date.fromisoformat(fim) if isinstance(fim, str) else fim
+    valor_base, valor_ultima = _valores_centavos(subscricao, total)
+
+    # Salta direto para a primeira parcela que pode cair na janela
+    passo = 0
+    if inicio and inicio > base:
+        meses = (inicio.year - base.year) * 12 + inicio.month - base.month
+        passo = max(0, meses // periodo - 1)
+
+    for numero in range(atual + passo, total + 1):
+        vencimento = somar_meses(base, (numero - atual) * periodo)
+        if fim and vencimento > fim:
+            return
+        if inicio and vencimento < inicio:
+            continue
+        yield {
+            "subscricao_id": subscricao["id"],
+            "fundo_id": subscricao["fundo_id"],
+            "cotista": subscricao["cotista"],
+            "parcela": f"{numero}/{total}",
+            "valor": (valor_ultima if numero == total else valor_base) / 100,
+            "vencimento": vencimento.isoformat()
+        }
+
+
+def projetar_chamadas(subscricoes, inicio, fim):
+    """Gera as chamadas de capital de todas as subscrições na janela, em uma única passada"""
+    for subscricao in subscricoes:
+        if subscricao.get("status", "PENDENTE") != "PENDENTE":
+            continue
+        yield from parcelas(subscricao, inicio, fim)
+
+
+def agregar_chamadas(chamadas):
+    """Totais por fundo e por mês de vencimento (somados em centavos)"""
+    por_fundo, por_mes = {}, {}
+    total = 0
+    quantidade = 0
+    for chamada in chamadas:
+        mes = chamada["vencimento"][:7]
+        centavos = round(chamada["valor"] * 100)
+        fundo = por_fundo.setdefault(chamada["fundo_id"], {})
+        fundo[mes] = fundo.get(mes, 0) + centavos
+        por_mes[mes] = por_mes.get(mes, 0) + centavos
+        total += centavos
+        quantidade += 1
+    return {
+        "por_fundo": {f: {m: v / 100 for m, v in meses.items()} for f, meses in por_fundo.items()},
+        "por_mes": {m: por_mes[m] / 100 for m in sorted(por_mes)},
+        "total": total / 100,
+        "quantidade": quantidade
+    }
@@ -0,0 +1,101 @@
+# SISTEMA TOMATE FUND - ARQUIVOS ESTÁTICOS DA INTERFACE WEB
+# CSS e JS servidos como arquivos versionados pelo hash do conteúdo, pré-comprimidos
+# (gzip e brotli) na inicialização, com ETag e cache imutável no navegador
+import gzip
+import hashlib
+import os
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, apenas gzip
+    brotli = None
+
+PASTA_FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+PREFIXO_ASSETS = "/assets"
+
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+
+TIPOS_CONTEUDO = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".html": "text/html; charset=utf-8"
+}
+
+# Ordem de preferência das codificações quando o cliente aceita mais de uma
+PREFERENCIA_CODIFICACAO = ("br", "gzip", "identity")
+
+
+def codificacoes_aceitas(accept_encoding):
+    """Codificações aceitas pelo cliente (q > 0) a partir do cabeçalho Accept-Encoding"""
+    aceitas = {"identity"}
+    for parte in (accept_encoding or "").split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            aceitas.add(nome)
+        elif nome == "identity":
+            aceitas.discard("identity")
+    if "*" in aceitas:
+        aceitas.update(PREFERENCIA_CODIFICACAO)
+    return aceitas
+
+
+class ArquivoEstatico:
+    """Conteúdo de um arquivo com suas versões pré-comprimidas"""
+
+    def __init__(self, nome, conteudo, tipo, cache_control):
+        self.nome = nome
+        self.tipo = tipo
+        self.cache_control = cache_control
+        self.hash = hashlib.sha256(conteudo).hexdigest()[:16]
+        self.versoes = {"identity": conteudo, "gzip": gzip.compress(conteudo, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.versoes["br"] = brotli.compress(conteudo, quality=11)
+
+    def responder(self, requisicao):
+        """Resposta com a melhor codificação aceita, ETag e suporte a 304"""
+        aceitas = codificacoes_aceitas(requisicao.headers.get("Accept-Encoding"))
+        codificacao = next((c for c in PREFERENCIA_CODIFICACAO if c in aceitas and c in self.versoes), "identity")
+
+        resposta = Response(self.versoes[codificacao], content_type=self.tipo)
+        if codificacao != "identity":
+            resposta.headers["Content-Encoding"] = codificacao
+        resposta.headers["Vary"] = "Accept-Encoding"
+        resposta.headers["Cache-Control"] = self.cache_control
+        resposta.set_etag(f"{self.hash}-{codificacao}")
+        return resposta.make_conditional(requisicao)
+
+
+class Frontend:
+    """Página principal e assets versionados carregados da pasta frontend/"""
+
+    def __init__(self, pasta=PASTA_FRONTEND, prefixo=PREFIXO_ASSETS):
+        self.assets = {}
+        urls = {}
+        for nome in ("app.css", "app.js"):
+            with open(os.path.join(pasta, nome), "rb") as arquivo:
+                conteudo = arquivo.read()
+            base, extensao = os.path.splitext(nome)
+            estatico = ArquivoEstatico(nome, conteudo, TIPOS_CONTEUDO[extensao], CACHE_IMUTAVEL)
+            nome_versionado = f"{base}.{estatico.hash}{extensao}"
+            self.assets[nome_versionado] = estatico
+            urls[nome] = f"{prefixo}/{nome_versionado}"
+
+        with open(os.path.join(pasta, "index.html"), encoding="utf-8") as arquivo:
+            html = arquivo.read()
+        for nome, url in urls.items():
+            html = html.replace("{{" + nome + "}}", url)
+        # A página muda de conteúdo quando os assets mudam, então só é revalidada
+        self.index = ArquivoEstatico("index.html", html.encode("utf-8"), TIPOS_CONTEUDO[".html"], CACHE_REVALIDAR)
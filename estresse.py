@@ -0,0 +1,107 @@
+# SISTEMA TOMATE FUND - TESTE DE ESTRESSE DE LIQUIDEZ
+# Simulação de Monte Carlo de inadimplência e atraso das entradas
+# (recebimentos e subscrições) contra os compromissos de cada fundo
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Premissas padrão por categoria de entrada
+PARAMETROS_PADRAO = {
+    "recebimentos": {"prob_default": 0.03, "prob_atraso": 0.15, "atraso_medio_dias": 10},
+    "subscricoes": {"prob_default": 0.02, "prob_atraso": 0.10, "atraso_medio_dias": 15}
+}
+CATEGORIAS = ("recebimentos", "subscricoes")
+
+# Processos do pool da simulação (o 'workers' da requisição nunca passa disso)
+WORKERS_PADRAO = int(os.environ.get("TOMATE_ESTRESSE_WORKERS", 0)) or os.cpu_count() or 1
+
+CAMINHOS_PADRAO = 100_000
+HORIZONTES_PADRAO = (15, 30, 60, 90)
+PERCENTIS = (1, 5, 50)
+
+# Caminhos simulados por bloco (limita a memória de fundos com muitas entradas)
+CAMINHOS_POR_BLOCO = 10_000
+
+
+def semente_fundo(seed, fundo_id):
+    """Semente estável por fundo, independente de como os fundos são distribuídos entre processos"""
+    return np.random.SeedSequence(seed, spawn_key=(zlib.crc32(str(fundo_id).encode()),))
+
+
+def simular_fundo(fundo, parametros, horizontes, caminhos, seed):
+    """Simula os caminhos de um fundo e retorna as métricas por horizonte
+
+    fundo: {"fundo_id", "liquidez", "entradas": [(dias, valor, categoria)], "saidas": [(dias, valor)]}
+    """
+    rng = np.random.default_rng(semente_fundo(seed, fundo["fundo_id"]))
+    horizontes = np.asarray(horizontes)
+
+    entradas = fundo["entradas"]
+    dias_entrada = np.array([e[0] for e in entradas], dtype=float)
+    valores_entrada = np.array([e[1] for e in entradas], dtype=float)
+    categoria = np.array([CATEGORIAS.index(e[2]) for e in entradas], dtype=int)
+    prob_default = np.array([parametros[c]["prob_default"] for c in CATEGORIAS])[categoria]
+    prob_atraso = np.array([parametros[c]["prob_atraso"] for c in CATEGORIAS])[categoria]
+    atraso_medio = np.array([parametros[c]["atraso_medio_dias"] for c in CATEGORIAS])[categoria]
+
+    # Saídas são determinísticas: acumulado devido até cada horizonte
+    saidas = fundo["saidas"]
+    dias_saida = np.array([s[0] for s in saidas], dtype=float)
+    valores_saida = np.array([s[1] for s in saidas], dtype=float)
+    saidas_horizonte = np.array([valores_saida[dias_saida <= h].sum() for h in horizontes])
+
+    saldos = np.empty((caminhos, len(horizontes)))
+    for inicio in range(0, caminhos, CAMINHOS_POR_BLOCO):
+        n = min(CAMINHOS_POR_BLOCO, caminhos - inicio)
+        inadimplente = rng.random((n, len(entradas))) < prob_default
+        atrasado = rng.random((n, len(entradas))) < prob_atraso
+        atraso = np.where(atrasado, rng.exponential(1.0, (n, len(entradas))) * atraso_medio, 0.0)
+        chegada = np.where(inadimplente, np.inf, dias_entrada + atraso)
+        # Entradas recebidas até cada horizonte: (caminhos x entradas) @ valores, um horizonte por vez
+        recebido = np.stack([(chegada <= h) @ valores_entrada for h in horizontes], axis=1)
+        saldos[inicio:inicio + n] = fundo["liquidez"] + recebido - saidas_horizonte
+
+    esperado = saldos.mean(axis=0)
+    percentis = np.percentile(saldos, PERCENTIS, axis=0)
+    resultado = []
+    for j, horizonte in enumerate(horizontes):
+        p = {f"p{q}": round(float(percentis[i, j]), 2) for i, q in enumerate(PERCENTIS)}
+        resultado.append({
+            "horizonte_dias": int(horizonte),
+            "prob_deficit": round(float((saldos[:, j] < 0).mean()), 6),
+            "saldo_esperado": round(float(esperado[j]), 2),
+            "percentis_saldo": p,
+            "lar_95": round(float(esperado[j] - p["p5"]), 2),
+            "lar_99": round(float(esperado[j] - p["p1"]), 2),
+            "saidas_devidas": round(float(saidas_horizonte[j]), 2)
+        })
+    return {"fundo_id": fundo["fundo_id"], "horizontes": resultado}
+
+
+_pool = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _executor():
+    """Pool único do processo, mantido entre requisições (recriado após fork, como nos relatórios)"""
+    global _pool, _pid
+    with _lock:
+        if _pid != os.getpid():
+            _pid = os.getpid()
+            _pool = ProcessPoolExecutor(max_workers=WORKERS_PADRAO)
+        return _pool
+
+
+def simular(fundos, parametros=None, horizontes=HORIZONTES_PADRAO, caminhos=CAMINHOS_PADRAO, seed=0, workers=None):
+    """Simula todos os fundos, distribuindo-os entre o pool de processos"""
+    parametros = {c: {**PARAMETROS_PADRAO[c], **(parametros or {}).get(c, {})} for c in CATEGORIAS}
+    workers = min(int(workers or WORKERS_PADRAO), WORKERS_PADRAO, len(fundos))
+    if workers <= 1:
+        return [simular_fundo(f, parametros, horizontes, caminhos, seed) for f in fundos]
+
+    futuros = [_executor().submit(simular_fundo, f, parametros, horizontes, caminhos, seed) for f in fundos]
+    return [f.result() for f in futuros]
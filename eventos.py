@@ -0,0 +1,70 @@
+# SISTEMA TOMATE FUND - EVENTOS EM TEMPO REAL (SSE)
+# Difusor de alterações para a interface web via Server-Sent Events.
+# Um único buffer circular é compartilhado por todos os clientes: publicar é O(1)
+# independentemente do número de conexões, e cada cliente só guarda seu cursor.
+# Sob o worker gevent (gunicorn.conf.py) a espera na condição é cooperativa: cada
+# conexão ociosa é um greenlet parado, não um worker ou thread do servidor.
+import json
+import threading
+from collections import deque
+
+CAPACIDADE_PADRAO = 1000
+INTERVALO_KEEPALIVE = 15
+RETRY_MS = 3000
+
+
+def _serializavel(obj):
+    """Registros compactos (registros.py) viram dict; o resto, texto"""
+    para_dict = getattr(obj, "para_dict", None)
+    return para_dict() if para_dict is not None else str(obj)
+
+
+class DifusorEventos:
+    """Buffer circular de eventos com sequência monotônica e espera por condição"""
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        self._eventos = deque(maxlen=capacidade)
+        self._sequencia = 0
+        self._condicao = threading.Condition()
+
+    @property
+    def sequencia(self):
+        return self._sequencia
+
+    def publicar(self, tipo, dados):
+        """Publica um evento para todos os clientes conectados"""
+        carga = json.dumps(dados, ensure_ascii=False, default=_serializavel)
+        with self._condicao:
+            self._sequencia += 1
+            self._eventos.append((self._sequencia, tipo, carga))
+            self._condicao.notify_all()
+            return self._sequencia
+
+    def eventos_desde(self, ultimo, timeout=None):
+        """Eventos com sequência maior que 'ultimo' (espera até timeout se não houver)
+
+        Retorna None se o cliente ficou para trás além da capacidade do buffer.
+        """
+        with self._condicao:
+            self._condicao.wait_for(lambda: self._sequencia > ultimo, timeout)
+            if self._eventos and self._eventos[0][0] > ultimo + 1:
+                return None
+            return [e for e in self._eventos if e[0] > ultimo]
+
+    def stream(self, ultimo=None, keepalive=INTERVALO_KEEPALIVE):
+        """Gerador de mensagens no formato text/event-stream"""
+        cursor = self._sequencia if ultimo is None else ultimo
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            eventos = self.eventos_desde(cursor, keepalive)
+            if eventos is None:
+                # Cliente perdeu eventos: pede para recarregar tudo
+                cursor = self._sequencia
+                yield f"id: {cursor}\nevent: resync\ndata: {{}}\n\n"
+                continue
+            if not eventos:
+                yield ": keepalive\n\n"
+                continue
+            for sequencia, tipo, carga in eventos:
+                yield f"id: {sequencia}\nevent: {tipo}\ndata: {carga}\n\n"
+                cursor = sequencia
@@ -0,0 +1,850 @@
+// Configuração da API
+const API_URL = window.location.origin;
+let fundoAtual = '';
+
+// Funções de Utilidade
+function formatarMoeda(valor) {
+    return new Intl.NumberFormat('pt-BR', {
+        style: 'currency',
+        currency: 'BRL'
+    }).format(valor);
+}
+
+async function fazerRequisicao(endpoint, options = {}) {
+    try {
+        const response = await fetch(`${API_URL}${endpoint}`, {
+            ...options,
+            headers: {
+                'Content-Type': 'application/json',
+                ...options.headers
+            }
+        });
+        return await response.json();
+    } catch (error) {
+        console.error('Erro na requisição:', error);
+        return { success: false, error: 'Erro de conexão com o servidor' };
+    }
+}
+
+// Navegação por Tabs
+function mostrarTab(tabId, btn) {
+    document.querySelectorAll('.tab-content').forEach(tab => tab.classList.remove('active'));
+    document.querySelectorAll('.tab-btn').forEach(b => b.classList.remove('active'));
+
+    document.getElementById(`tab-${tabId}`).classList.add('active');
+    btn.classList.add('active');
+}
+
+// Tabelas virtualizadas: só as linhas visíveis existem no DOM (um conjunto fixo de
+// <tr> reaproveitado na rolagem) e os dados vêm da API em páginas (?offset=&limite=)
+const ALTURA_LINHA = 48;
+const ALTURA_TABELA = 480;
+const LINHAS_POR_PAGINA = 200;
+const LINHAS_EXTRAS = 8;
+let tabelaAtiva = null;
+
+class TabelaVirtual {
+    constructor({ id, endpoint, entidade, colunas }) {
+        // colunas: [{ titulo, valor: registro => texto, html: true se o valor for HTML }]
+        this.id = id;
+        this.endpoint = endpoint;
+        this.entidade = entidade;
+        this.colunas = colunas;
+        this.total = 0;
+        this.paginas = new Map();
+        this.pendentes = new Map();
+        this.geracao = 0;
+        this.linhas = [];
+        this.quadroAgendado = false;
+        this.aoRedimensionar = () => this.agendar();
+    }
+
+    url(numero) {
+        const separador = this.endpoint.includes('?') ? '&' : '?';
+        return `${this.endpoint}${separador}offset=${numero * LINHAS_POR_PAGINA}&limite=${LINHAS_POR_PAGINA}`;
+    }
+
+    carregarPagina(numero) {
+        if (this.paginas.has(numero)) {
+            return Promise.resolve({ success: true });
+        }
+        if (!this.pendentes.has(numero)) {
+            const geracao = this.geracao;
+            const promessa = fazerRequisicao(this.url(numero)).then(result => {
+                // Descarta respostas de antes de um recarregamento
+                if (geracao !== this.geracao) return result;
+                this.pendentes.delete(numero);
+                if (result.success) {
+                    this.paginas.set(numero, result.data);
+                    this.total = result.total_itens ?? result.total;
+                }
+                return result;
+            });
+            this.pendentes.set(numero, promessa);
+        }
+        return this.pendentes.get(numero);
+    }
+
+    // Primeira página: traz também os totais do conjunto completo
+    iniciar() {
+        return this.carregarPagina(0);
+    }
+
+    registro(indice) {
+        const pagina = this.paginas.get(Math.floor(indice / LINHAS_POR_PAGINA));
+        return pagina ? pagina[indice % LINHAS_POR_PAGINA] : undefined;
+    }
+
+    html() {
+        const colgroup = `<colgroup>${this.colunas.map(() => '<col>').join('')}</colgroup>`;
+        const cabecalho = this.colunas.map(c => `<th>${c.titulo}</th>`).join('');
+        return `
+            <div class="tabela-virtual" id="${this.id}">
+                <table class="table tabela-cabecalho">${colgroup}<thead><tr>${cabecalho}</tr></thead></table>
+                <div class="tabela-rolagem" style="max-height: ${ALTURA_TABELA}px;">
+                    <div class="tabela-espaco"></div>
+                    <table class="table tabela-corpo">${colgroup}<tbody></tbody></table>
+                </div>
+            </div>
+        `;
+    }
+
+    anexar() {
+        const raiz = document.getElementById(this.id);
+        this.cabecalho = raiz.querySelector('.tabela-cabecalho');
+        this.rolagem = raiz.querySelector('.tabela-rolagem');
+        this.espaco = raiz.querySelector('.tabela-espaco');
+        this.corpo = raiz.querySelector('.tabela-corpo');
+
+        const quantidade = Math.ceil(ALTURA_TABELA / ALTURA_LINHA) + 2 * LINHAS_EXTRAS;
+        const tbody = this.corpo.tBodies[0];
+        for (let i = 0; i < quantidade; i++) {
+            const tr = document.createElement('tr');
+            this.colunas.forEach(() => tr.appendChild(document.createElement('td')));
+            tbody.appendChild(tr);
+            this.linhas.push(tr);
+        }
+
+        this.rolagem.addEventListener('scroll', () => this.agendar(), { passive: true });
+        window.addEventListener('resize', this.aoRedimensionar);
+        if (tabelaAtiva && tabelaAtiva !== this) tabelaAtiva.destruir();
+        tabelaAtiva = this;
+        this.renderizar();
+    }
+
+    // Remove o listener da janela; os da rolagem saem junto com o HTML substituído
+    destruir() {
+        window.removeEventListener('resize', this.aoRedimensionar);
+    }
+
+    agendar() {
+        if (this.quadroAgendado) return;
+        this.quadroAgendado = true;
+        requestAnimationFrame(() => {
+            this.quadroAgendado = false;
+            if (tabelaAtiva === this) this.renderizar();
+        });
+    }
+
+    renderizar() {
+        // Cabeçalho e corpo com a mesma largura (descontando a barra de rolagem)
+        const largura = `${this.rolagem.clientWidth}px`;
+        this.cabecalho.style.width = largura;
+        this.corpo.style.width = largura;
+        this.espaco.style.height = `${this.total * ALTURA_LINHA}px`;
+
+        const inicio = Math.max(0, Math.floor(this.rolagem.scrollTop / ALTURA_LINHA) - LINHAS_EXTRAS);
+        const fim = Math.min(this.total, inicio + this.linhas.length);
+        this.corpo.style.transform = `translateY(${inicio * ALTURA_LINHA}px)`;
+
+        const faltando = new Set();
+        this.linhas.forEach((tr, i) => {
+            const indice = inicio + i;
+            if (indice >= fim) {
+                tr.hidden = true;
+                return;
+            }
+            tr.hidden = false;
+            const registro = this.registro(indice);
+            if (registro === undefined) {
+                faltando.add(Math.floor(indice / LINHAS_POR_PAGINA));
+            }
+            this.preencher(tr, registro);
+        });
+
+        faltando.forEach(numero => {
+            this.carregarPagina(numero).then(() => this.agendar());
+        });
+    }
+
+    preencher(tr, registro) {
+        if (tr.registro === registro && registro !== undefined) return;
+        tr.registro = registro;
+        this.colunas.forEach((coluna, i) => {
+            const td = tr.cells[i];
+            if (registro === undefined) {
+                td.textContent = i === 0 ? 'Carregando…' : '';
+            } else if (coluna.html) {
+                td.innerHTML = coluna.valor(registro);
+            } else {
+                td.textContent = coluna.valor(registro);
+            }
+        });
+    }
+
+    // Descarta o cache de páginas e busca de novo as linhas visíveis
+    recarregar() {
+        this.geracao++;
+        this.paginas.clear();
+        this.pendentes.clear();
+        const primeira = Math.floor(this.rolagem.scrollTop / ALTURA_LINHA / LINHAS_POR_PAGINA);
+        this.carregarPagina(primeira).then(() => this.agendar());
+    }
+
+    // Atualização em tempo real: altera o registro no cache ou recarrega se o total mudou
+    aplicarEvento(evento) {
+        const fundoExcluido = evento.entidade === 'fundo' && evento.acao === 'excluido';
+        if (evento.entidade !== this.entidade && !fundoExcluido) return;
+        if (evento.acao === 'atualizado' && evento.registro) {
+            for (const pagina of this.paginas.values()) {
+                const i = pagina.findIndex(r => r.id === evento.registro.id);
+                if (i >= 0) {
+                    pagina[i] = evento.registro;
+                    this.agendar();
+                    return;
+                }
+            }
+            return;
+        }
+        this.recarregar();
+    }
+}
+
+// Gerenciamento de Fundos
+async function carregarFundos() {
+    aplicarFundos(await fazerRequisicao('/fundos'));
+}
+
+function aplicarFundos(result) {
+    if (result.success) {
+        const select = document.getElementById('fundo-select');
+        const selectRel = document.getElementById('fundos-relatorio');
+        const selectAtivo = document.getElementById('fundo_id');
+
+        let options = '<option value="">Todos os Fundos</option>';
+        let optionsRel = '';
+
+        result.data.forEach(fundo => {
+            options += `<option value="${fundo.id}">${fundo.nome}</option>`;
+            optionsRel += `<option value="${fundo.id}">${fundo.nome}</option>`;
+        });
+
+        select.innerHTML = options;
+        selectRel.innerHTML = optionsRel;
+        selectAtivo.innerHTML = optionsRel;
+
+        select.onchange = (e) => {
+            fundoAtual = e.target.value;
+        };
+    }
+}
+
+async function carregarResumoGeral() {
+    const result = await fazerRequisicao('/relatorios');
+    if (result.success) {
+        aplicarResumo(result.data.resumo_geral);
+    }
+}
+
+// Carga inicial em uma única ida ao servidor
+async function carregarInicial() {
+    const result = await fazerRequisicao('/batch', {
+        method: 'POST',
+        body: JSON.stringify({
+            paralelo: true,
+            requisicoes: [
+                { id: 'fundos', path: '/fundos' },
+                { id: 'relatorios', path: '/relatorios' }
+            ]
+        })
+    });
+    if (!result.success) {
+        carregarFundos();
+        carregarResumoGeral();
+        return;
+    }
+    const respostas = Object.fromEntries(result.data.map(r => [r.id, r.body]));
+    aplicarFundos(respostas.fundos);
+    if (respostas.relatorios.success) {
+        aplicarResumo(respostas.relatorios.data.resumo_geral);
+    }
+}
+
+function aplicarResumo(resumo) {
+    document.getElementById('patrimonio-total').textContent = formatarMoeda(resumo.patrimonio_total);
+    document.getElementById('liquidez-total').textContent = formatarMoeda(resumo.liquidez_total);
+    document.getElementById('compromissos-total').textContent = formatarMoeda(resumo.compromissos_pendentes);
+    document.getElementById('recebimentos-total').textContent = formatarMoeda(resumo.recebimentos_pendentes);
+}
+
+function mostrarFormularioFundo() {
+    document.getElementById('formulario-fundo').style.display = 'block';
+}
+
+function cancelarFormulario() {
+    document.getElementById('formulario-fundo').style.display = 'none';
+    document.getElementById('form-fundo').reset();
+}
+
+const COLUNAS_FUNDOS = [
+    { titulo: 'Nome', valor: f => f.nome },
+    { titulo: 'CNPJ', valor: f => f.cnpj },
+    { titulo: 'Patrimônio', valor: f => formatarMoeda(f.patrimonio) },
+    { titulo: 'Status', valor: f => f.status },
+    { titulo: 'Ações', html: true, valor: f => `
+        <button class="btn" style="padding: 5px 10px; font-size: 0.8rem;" onclick="abrirEditarFundo('${f.id}')">✏️</button>
+        <button class="btn btn-danger" style="padding: 5px 10px; font-size: 0.8rem;" onclick="deletarFundo('${f.id}')">🗑️</button>
+    ` }
+];
+
+async function listarFundos() {
+    const tabela = new TabelaVirtual({ id: 'tabela-fundos', endpoint: '/fundos', entidade: 'fundo', colunas: COLUNAS_FUNDOS });
+    const result = await tabela.iniciar();
+    if (result.success) {
+        mostrarDados('📋 Lista de Fundos', tabela.html());
+        tabela.anexar();
+    }
+}
+
+async function abrirEditarFundo(id) {
+    const result = await fazerRequisicao(`/fundos/${id}`);
+    if (result.success) {
+        const fundo = result.data;
+        document.getElementById('edit-fundo-id').value = fundo.id;
+        document.getElementById('edit-nome').value = fundo.nome;
+        document.getElementById('edit-cnpj').value = fundo.cnpj;
+        document.getElementById('edit-patrimonio').value = fundo.patrimonio;
+        document.getElementById('edit-liquidez').value = fundo.liquidez;
+        document.getElementById('edit-politica_liquidez').value = fundo.politica_liquidez;
+        document.getElementById('edit-prazo_resgate').value = fundo.prazo_resgate;
+        document.getElementById('edit-gestor').value = fundo.gestor;
+        document.getElementById('edit-taxa_admin').value = fundo.taxa_admin;
+        document.getElementById('edit-status').value = fundo.status;
+
+        document.getElementById('modal-editar-fundo').style.display = 'block';
+    }
+}
+
+function fecharModal() {
+    document.getElementById('modal-editar-fundo').style.display = 'none';
+}
+
+async function deletarFundo(id) {
+    if (confirm('Tem certeza que deseja deletar este fundo? Todos os dados relacionados serão removidos.')) {
+        const result = await fazerRequisicao(`/fundos/${id}`, { method: 'DELETE' });
+        if (result.success) {
+            mostrarSucesso(result.message);
+            // Com o stream de eventos ativo, tabelas e totais são atualizados pelo evento
+            if (!eventosConectados) {
+                listarFundos();
+                carregarFundos();
+                carregarResumoGeral();
+            }
+        } else {
+            mostrarErro(result.error);
+        }
+    }
+}
+
+// Relatórios
+async function carregarRelatorios() {
+    const result = await fazerRequisicao('/relatorios');
+    if (result.success) {
+        const data = result.data;
+        let html = '<h4>Resumo por Fundo</h4><table class="table"><thead><tr><th>Fundo</th><th>Liquidez</th><th>Compromissos</th><th>Recebimentos</th><th>Saldo Projetado</th></tr></thead><tbody>';
+
+        data.relatorio_por_fundo.forEach(item => {
+            html += `
+                <tr>
+                    <td>${item.fundo.nome}</td>
+                    <td>${formatarMoeda(item.fundo.liquidez)}</td>
+                    <td>${formatarMoeda(item.compromissos)}</td>
+                    <td>${formatarMoeda(item.recebimentos)}</td>
+                    <td style="font-weight: bold; color: ${item.saldo_projetado >= 0 ? '#2f855a' : '#c53030'}">
+                        ${formatarMoeda(item.saldo_projetado)}
+                    </td>
+                </tr>
+            `;
+        });
+
+        html += '</tbody></table>';
+        mostrarDados('📈 Relatório Consolidado', html);
+    }
+}
+
+async function gerarRelatorioPersonalizado() {
+    const tipo = document.getElementById('tipo-relatorio').value;
+    const selectFundos = document.getElementById('fundos-relatorio');
+    const fundos = Array.from(selectFundos.selectedOptions).map(opt => opt.value);
+    const data_inicio = document.getElementById('data-inicio').value;
+    const data_fim = document.getElementById('data-fim').value;
+
+    const result = await fazerRequisicao('/relatorios/gerar', {
+        method: 'POST',
+        body: JSON.stringify({ tipo, fundos, data_inicio, data_fim })
+    });
+
+    if (result.success) {
+        const relatorio = result.data;
+        let html = `
+            <div class="alert success">
+                <strong>Relatório Gerado:</strong> ${relatorio.tipo.toUpperCase()}<br>
+                <strong>Data:</strong> ${relatorio.data_geracao}
+            </div>
+        `;
+
+        if (relatorio.dados.fundos) {
+            html += '<h4>Fundos Analisados</h4>';
+            html += '<table class="table"><thead><tr><th>Nome</th><th>CNPJ</th><th>Patrimônio</th></tr></thead><tbody>';
+            relatorio.dados.fundos.forEach(f => {
+                html += `<tr><td>${f.nome}</td><td>${f.cnpj}</td><td>${formatarMoeda(f.patrimonio)}</td></tr>`;
+            });
+            html += '</tbody></table>';
+
+            if (relatorio.dados.estatisticas_fundos) {
+                const stats = relatorio.dados.estatisticas_fundos;
+                html += `
+                    <h5>📈 Estatísticas</h5>
+                    <p><strong>Patrimônio Total:</strong> ${formatarMoeda(stats.total_patrimonio)}</p>
+                    <p><strong>Liquidez Total:</strong> ${formatarMoeda(stats.total_liquidez)}</p>
+                    <p><strong>Patrimônio Médio:</strong> ${formatarMoeda(stats.patrimonio_medio)}</p>
+                    <p><strong>Liquidez Média:</strong> ${formatarMoeda(stats.liquidez_media)}</p>
+                `;
+            }
+        }
+
+        if (relatorio.dados.compromissos) {
+            html += `<h4>💸 Compromissos (Total: ${formatarMoeda(relatorio.dados.total_compromissos)})</h4>`;
+            html += '<table class="table"><thead><tr><th>Tipo</th><th>Valor</th><th>Vencimento</th></tr></thead><tbody>';
+            relatorio.dados.compromissos.forEach(comp => {
+                html += `<tr><td>${comp.tipo}</td><td>${formatarMoeda(comp.valor)}</td><td>${comp.vencimento}</td></tr>`;
+            });
+            html += '</tbody></table>';
+        }
+
+        if (relatorio.dados.recebimentos) {
+            html += `<h4>💰 Recebimentos (Total: ${formatarMoeda(relatorio.dados.total_recebimentos)})</h4>`;
+            html += '<table class="table"><thead><tr><th>Tipo</th><th>Valor</th><th>Vencimento</th></tr></thead><tbody>';
+            relatorio.dados.recebimentos.forEach(rec => {
+                html += `<tr><td>${rec.tipo}</td><td>${formatarMoeda(rec.valor)}</td><td>${rec.vencimento}</td></tr>`;
+            });
+            html += '</tbody></table>';
+        }
+
+        if (relatorio.dados.subscricoes) {
+            html += `<h4>📋 Subscrições (Total: ${formatarMoeda(relatorio.dados.total_subscricoes)})</h4>`;
+            html += '<table class="table"><thead><tr><th>Cotista</th><th>Valor</th><th>Vencimento</th></tr></thead><tbody>';
+            relatorio.dados.subscricoes.forEach(sub => {
+                html += `<tr><td>${sub.cotista}</td><td>${formatarMoeda(sub.valor_parcela)}</td><td>${sub.vencimento}</td></tr>`;
+            });
+            html += '</tbody></table>';
+        }
+
+        mostrarDados('📊 Relatório Personalizado', html);
+    } else {
+        mostrarErro(result.error);
+    }
+}
+
+// Carregar templates de relatório
+async function carregarTemplatesRelatorio() {
+    const result = await fazerRequisicao('/relatorios/templates');
+    if (result.success) {
+        let html = '<h4>📋 Templates de Relatórios Disponíveis</h4>';
+        result.data.forEach(template => {
+            html += `
+                <div style="margin-bottom: 15px; padding: 15px; border: 1px solid #e2e8f0; border-radius: 8px;">
+                    <h5>${template.nome}</h5>
+                    <p>${template.descricao}</p>
+                    <button class="btn" onclick="selecionarTemplate('${template.id}')" style="margin-top: 10px;">Usar Template</button>
+                </div>
+            `;
+        });
+        mostrarDados('📋 Templates de Relatórios', html);
+    }
+}
+
+// Selecionar template
+function selecionarTemplate(templateId) {
+    document.getElementById('tipo-relatorio').value = templateId;
+    mostrarTab('relatorios', document.querySelector('.tab-btn:nth-child(3)'));
+}
+
+// Event Listeners para formulários
+document.getElementById('form-fundo').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const formData = new FormData(e.target);
+    const dados = Object.fromEntries(formData.entries());
+
+    const result = await fazerRequisicao('/fundos', {
+        method: 'POST',
+        body: JSON.stringify(dados)
+    });
+
+    if (result.success) {
+        mostrarSucesso(result.message);
+        cancelarFormulario();
+        listarFundos();
+        if (!eventosConectados) {
+            carregarFundos();
+            carregarResumoGeral();
+        }
+    } else {
+        mostrarErro(result.error);
+    }
+});
+
+document.getElementById('form-editar-fundo').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const fundoId = document.getElementById('edit-fundo-id').value;
+    const formData = new FormData(e.target);
+    const dados = Object.fromEntries(formData.entries());
+    delete dados.id; // Remover ID dos dados
+
+    const result = await fazerRequisicao(`/fundos/${fundoId}`, {
+        method: 'PUT',
+        body: JSON.stringify(dados)
+    });
+
+    if (result.success) {
+        mostrarSucesso(result.message);
+        fecharModal();
+        listarFundos();
+        if (!eventosConectados) {
+            carregarFundos();
+            carregarResumoGeral();
+        }
+    } else {
+        mostrarErro(result.error);
+    }
+});
+
+// Funções existentes (mantidas)
+async function carregarDashboard() {
+    if (!fundoAtual) {
+        mostrarErro('Selecione um fundo específico para ver o dashboard');
+        return;
+    }
+
+    const result = await fazerRequisicao(`/dashboard/${fundoAtual}`);
+    if (result.success) {
+        const data = result.data;
+        let html = `
+            <div class="alert success">
+                <strong>Dashboard do ${data.fundo.nome}</strong><br>
+                Atualizado em: ${data.data_atualizacao}
+            </div>
+
+            <h4>📊 Informações do Fundo</h4>
+            <table class="table">
+                <tr><td><strong>CNPJ:</strong></td><td>${data.fundo.cnpj}</td></tr>
+                <tr><td><strong>Gestor:</strong></td><td>${data.fundo.gestor}</td></tr>
+                <tr><td><strong>Patrimônio:</strong></td><td>${formatarMoeda(data.fundo.patrimonio)}</td></tr>
+                <tr><td><strong>Liquidez:</strong></td><td>${formatarMoeda(data.fundo.liquidez)}</td></tr>
+                <tr><td><strong>Política:</strong></td><td>${data.fundo.politica_liquidez}</td></tr>
+                <tr><td><strong>Taxa Admin:</strong></td><td>${data.fundo.taxa_admin}% a.a.</td></tr>
+                <tr><td><strong>Liquidação de Resgate:</strong></td><td>${data.data_liquidacao_resgate} (D+${data.fundo.prazo_resgate} úteis)</td></tr>
+            </table>
+
+            <h4>💰 Projeções de Fluxo de Caixa</h4>
+            <table class="table">
+                <thead>
+                    <tr>
+                        <th>Período</th>
+                        <th>Entradas</th>
+                        <th>Saídas</th>
+                        <th>Saldo Projetado</th>
+                    </tr>
+                </thead>
+                <tbody>
+        `;
+
+        data.projecoes.forEach(proj => {
+            html += `
+                <tr>
+                    <td>${proj.periodo}</td>
+                    <td>${formatarMoeda(proj.entradas)}</td>
+                    <td>${formatarMoeda(proj.saidas)}</td>
+                    <td>${formatarMoeda(proj.saldo_projetado)}</td>
+                </tr>
+            `;
+        });
+
+        html += '</tbody></table>';
+
+        if (data.chamadas_capital.itens.length > 0) {
+            html += `<p><strong>Chamadas de capital (90 dias):</strong> ${formatarMoeda(data.chamadas_capital.total)} em ${data.chamadas_capital.itens.length} parcelas</p>`;
+        }
+
+        if (data.juros_projetados.itens.length > 0) {
+            html += `<p><strong>Juros projetados dos ativos (30 dias):</strong> ${formatarMoeda(data.juros_projetados.total)}</p>`;
+        }
+
+        if (data.alertas.length > 0) {
+            html += '<h4>🚨 Alertas Importantes</h4><div class="alert">';
+            data.alertas.forEach(alerta => {
+                html += `<p>• ${alerta}</p>`;
+            });
+            html += '</div>';
+        }
+
+        mostrarDados('📊 Dashboard de Tesouraria', html);
+    }
+}
+
+const COLUNAS_COMPROMISSOS = [
+    { titulo: 'ID', valor: c => c.id },
+    { titulo: 'Tipo', valor: c => c.tipo },
+    { titulo: 'Valor', valor: c => formatarMoeda(c.valor) },
+    { titulo: 'Vencimento', valor: c => c.vencimento },
+    { titulo: 'Status', html: true, valor: c => `<span class="status-pendente">${c.status}</span>` }
+];
+
+const COLUNAS_RECEBIMENTOS = COLUNAS_COMPROMISSOS;
+
+const COLUNAS_SUBSCRICOES = [
+    { titulo: 'ID', valor: s => s.id },
+    { titulo: 'Cotista', valor: s => s.cotista },
+    { titulo: 'CPF/CNPJ', valor: s => s.cpf_cnpj },
+    { titulo: 'Cotas', valor: s => s.cotas },
+    { titulo: 'Valor', valor: s => formatarMoeda(s.valor_parcela) },
+    { titulo: 'Vencimento', valor: s => s.vencimento },
+    { titulo: 'Parcela', valor: s => s.parcela }
+];
+
+// Lançamentos (compromissos, recebimentos, subscrições): totais do servidor e tabela virtual
+async function carregarLancamentos({ recurso, entidade, rotulo, titulo, colunas }) {
+    const endpoint = fundoAtual ? `/${recurso}?fundo_id=${fundoAtual}` : `/${recurso}`;
+    const tabela = new TabelaVirtual({ id: `tabela-${recurso}`, endpoint, entidade, colunas });
+    const result = await tabela.iniciar();
+
+    if (result.success) {
+        const html = `
+            <div class="alert success">
+                <strong>Total de ${rotulo}:</strong> ${formatarMoeda(result.total_valor)} 
+                (${result.total_itens} itens)
+            </div>
+        ` + tabela.html();
+        mostrarDados(titulo, html);
+        tabela.anexar();
+    }
+}
+
+function carregarCompromissos() {
+    return carregarLancamentos({
+        recurso: 'compromissos', entidade: 'compromisso', rotulo: 'Compromissos',
+        titulo: '💸 Compromissos de Pagamento', colunas: COLUNAS_COMPROMISSOS
+    });
+}
+
+function carregarRecebimentos() {
+    return carregarLancamentos({
+        recurso: 'recebimentos', entidade: 'recebimento', rotulo: 'Recebimentos',
+        titulo: '💰 Recebimentos Esperados', colunas: COLUNAS_RECEBIMENTOS
+    });
+}
+
+function carregarSubscricoes() {
+    return carregarLancamentos({
+        recurso: 'subscricoes', entidade: 'subscricao', rotulo: 'Subscrições',
+        titulo: '📋 Subscrições Pendentes', colunas: COLUNAS_SUBSCRICOES
+    });
+}
+
+async function carregarOutliers() {
+    const result = await fazerRequisicao('/outliers');
+
+    if (result.success) {
+        const data = result.data;
+        let html = `
+            <h4>💸 Análise de Compromissos</h4>
+            <table class="table">
+                <tr><td><strong>Média:</strong></td><td>${formatarMoeda(data.compromissos.media)}</td></tr>
+                <tr><td><strong>Máximo:</strong></td><td>${formatarMoeda(data.compromissos.maximo)}</td></tr>
+                <tr><td><strong>Mínimo:</strong></td><td>${formatarMoeda(data.compromissos.minimo)}</td></tr>
+            </table>
+        `;
+
+        if (data.compromissos.outliers.length > 0) {
+            html += '<h5>🔴 Outliers de Compromissos</h5>';
+            data.compromissos.outliers.forEach(outlier => {
+                html += `<p>• ${outlier.item.tipo}: ${formatarMoeda(outlier.item.valor)} (+${outlier.desvio_percentual}% da média)</p>`;
+            });
+        } else {
+            html += '<p>✅ Nenhum outlier encontrado em compromissos</p>';
+        }
+
+        html += `
+            <h4>💰 Análise de Recebimentos</h4>
+            <table class="table">
+                <tr><td><strong>Média:</strong></td><td>${formatarMoeda(data.recebimentos.media)}</td></tr>
+                <tr><td><strong>Máximo:</strong></td><td>${formatarMoeda(data.recebimentos.maximo)}</td></tr>
+                <tr><td><strong>Mínimo:</strong></td><td>${formatarMoeda(data.recebimentos.minimo)}</td></tr>
+            </table>
+        `;
+
+        if (data.recebimentos.outliers.length > 0) {
+            html += '<h5>🟡 Outliers de Recebimentos</h5>';
+            data.recebimentos.outliers.forEach(outlier => {
+                html += `<p>• ${outlier.item.tipo}: ${formatarMoeda(outlier.item.valor)} (+${outlier.desvio_percentual}% da média)</p>`;
+            });
+        } else {
+            html += '<p>✅ Nenhum outlier encontrado em recebimentos</p>';
+        }
+
+        mostrarDados('📊 Análise de Outliers', html);
+    }
+}
+
+// Mostrar dados na tela
+function mostrarDados(titulo, html) {
+    if (tabelaAtiva) tabelaAtiva.destruir();
+    tabelaAtiva = null;
+    document.getElementById('data-title').textContent = titulo;
+    document.getElementById('data-content').innerHTML = html;
+}
+
+// Mostrar erro
+function mostrarErro(mensagem) {
+    const html = `<div class="alert">${mensagem}</div>`;
+    mostrarDados('❌ Erro', html);
+}
+
+// Mostrar sucesso
+function mostrarSucesso(mensagem) {
+    const html = `<div class="alert success">${mensagem}</div>`;
+    mostrarDados('✅ Sucesso', html);
+}
+
+// Fechar modal ao clicar fora
+window.onclick = function(event) {
+    const modal = document.getElementById('modal-editar-fundo');
+    if (event.target == modal) {
+        modal.style.display = 'none';
+    }
+}
+
+// Atualizações em tempo real (SSE)
+let eventosConectados = false;
+
+function atualizarOpcoesFundo(fundo, acao) {
+    ['fundo-select', 'fundos-relatorio', 'fundo_id'].forEach(selectId => {
+        const select = document.getElementById(selectId);
+        const opcao = select.querySelector(`option[value="${fundo.id}"]`);
+        if (acao === 'excluido') {
+            if (opcao) opcao.remove();
+        } else if (opcao) {
+            opcao.textContent = fundo.nome;
+        } else {
+            select.insertAdjacentHTML('beforeend', `<option value="${fundo.id}">${fundo.nome}</option>`);
+        }
+    });
+    if (acao === 'excluido' && fundoAtual === fundo.id) {
+        fundoAtual = '';
+    }
+}
+
+function conectarEventos() {
+    if (!window.EventSource) return;
+    const fonte = new EventSource(`${API_URL}/eventos`);
+    fonte.onopen = () => { eventosConectados = true; };
+    fonte.onerror = () => { eventosConectados = false; };
+    fonte.addEventListener('mudanca', (e) => {
+        const evento = JSON.parse(e.data);
+        aplicarResumo(evento.totais);
+        if (evento.entidade === 'fundo') {
+            const fundo = evento.registro || { id: evento.id };
+            atualizarOpcoesFundo(fundo, evento.acao);
+        }
+        if (tabelaAtiva) {
+            tabelaAtiva.aplicarEvento(evento);
+        }
+    });
+    fonte.addEventListener('resync', () => {
+        if (tabelaAtiva) {
+            tabelaAtiva.recarregar();
+        }
+        carregarFundos();
+        carregarResumoGeral();
+    });
+}
+
+// Inicializar aplicação
+document.addEventListener('DOMContentLoaded', function() {
+    carregarInicial();
+    conectarEventos();
+});
+
+function mostrarFormularioAtivo() {
+    document.getElementById('formulario-fundo').style.display = 'none';
+    document.getElementById('formulario-ativo').style.display = 'block';
+}
+
+function cancelarFormularioAtivo() {
+    document.getElementById('formulario-ativo').style.display = 'none';
+    document.getElementById('form-ativo').reset();
+    // Limpar datas extras de vencimento
+    const container = document.getElementById('vencimentos-container');
+    container.innerHTML = `
+        <div class="form-row" style="margin-bottom: 10px;">
+            <input type="date" name="vencimentos[]" class="vencimento-input">
+            <button type="button" class="btn btn-secondary" onclick="adicionarDataVencimento()" style="padding: 5px 15px;">+</button>
+        </div>
+    `;
+}
+
+function adicionarDataVencimento() {
+    const container = document.getElementById('vencimentos-container');
+    const div = document.createElement('div');
+    div.className = 'form-row';
+    div.style.marginBottom = '10px';
+    div.innerHTML = `
+        <input type="date" name="vencimentos[]" class="vencimento-input">
+        <button type="button" class="btn btn-danger" onclick="this.parentElement.remove()" style="padding: 5px 15px;">-</button>
+    `;
+    container.appendChild(div);
+}
+
+// Listener para o formulário de ativos
+document.addEventListener('DOMContentLoaded', function() {
+    const formAtivo = document.getElementById('form-ativo');
+    if (formAtivo) {
+        formAtivo.addEventListener('submit', async function(e) {
+            e.preventDefault();
+
+            const formData = new FormData(this);
+
+            try {
+                const response = await fetch('/ativos', {
+                    method: 'POST',
+                    body: formData
+                });
+                const result = await response.json();
+
+                if (result.success) {
+                    mostrarSucesso(result.message);
+                    cancelarFormularioAtivo();
+                    if (!eventosConectados) {
+                        carregarResumoGeral();
+                    }
+                } else {
+                    mostrarErro(result.error);
+                }
+            } catch (error) {
+                mostrarErro('Erro ao conectar com o servidor');
+            }
+        });
+    }
+});
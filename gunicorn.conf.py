@@ -0,0 +1,17 @@
+# SISTEMA TOMATE FUND - CONFIGURAÇÃO DO GUNICORN
+# Carregada automaticamente por "gunicorn" executado na raiz do projeto.
+# Worker assíncrono (gevent): cada conexão é um greenlet e o gunicorn aplica o
+# monkey-patching antes de importar a aplicação, então a espera de cada cliente do
+# stream de eventos (/eventos, SSE) na condição do DifusorEventos é cooperativa.
+# Centenas de abas abertas ficam ociosas sem ocupar um worker ou thread cada.
+# Os eventos são publicados na memória de cada processo: com mais de um worker, um
+# cliente só recebe as alterações feitas no worker em que está conectado.
+import os
+
+wsgi_app = "tomate_fund_vscode:app"
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = os.environ.get("TOMATE_WORKER_CLASSE", "gevent")
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+# Conexões simultâneas por worker gevent (inclui as conexões de eventos ociosas)
+worker_connections = int(os.environ.get("TOMATE_WORKER_CONEXOES", 2000))
+timeout = 120
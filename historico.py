@@ -0,0 +1,203 @@
+# SISTEMA TOMATE FUND - HISTÓRICO DE PATRIMÔNIO E LIQUIDEZ
+# Cada alteração de patrimônio/liquidez de um fundo vira um ponto de uma série temporal
+# guardada em arrays compactos (int64: instante em segundos UTC e valores em centavos).
+# Agregados diário, semanal (a partir de segunda) e mensal são mantidos a cada ponto
+# novo, com fechamento, mínimo e máximo do período: consultas de intervalos longos
+# leem poucos períodos já prontos em vez de percorrer todos os pontos.
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from calendar import timegm
+from datetime import datetime, timedelta, timezone
+
+SEGUNDOS_DIA = 86400
+METRICAS = ("patrimonio", "liquidez")
+RESOLUCOES = ("bruto", "diario", "semanal", "mensal")
+
+# Em resolucao=auto, a mais fina que não passe desse número de pontos
+MAXIMO_PONTOS_AUTO = 500
+# Pontos brutos devolvidos de uma vez; acima disso é preciso uma resolução agregada
+MAXIMO_PONTOS_BRUTOS = 20000
+
+
+def inicio_periodo(resolucao, instante):
+    """Início (segundos UTC) do período diário, semanal ou mensal que contém o instante"""
+    if resolucao == "diario":
+        return instante - instante % SEGUNDOS_DIA
+    if resolucao == "semanal":
+        dia = instante // SEGUNDOS_DIA
+        # 01/01/1970 foi uma quinta-feira (weekday 3)
+        return (dia - (dia + 3) % 7) * SEGUNDOS_DIA
+    if resolucao == "mensal":
+        data = time.gmtime(instante)
+        return timegm((data.tm_year, data.tm_mon, 1, 0, 0, 0))
+    raise ValueError(f"Resolução desconhecida: '{resolucao}'")
+
+
+def ler_instante(texto, fim=False):
+    """'2025-01-31' ou '2025-01-31T12:00:00' (UTC) -> segundos; datas sem hora em 'fim' incluem o dia todo"""
+    try:
+        data = datetime.fromisoformat(texto)
+    except ValueError:
+        raise ValueError(f"Data inválida: '{texto}' (use AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS)")
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    if fim and len(texto) == 10:
+        data += timedelta(days=1, seconds=-1)
+    return int(data.timestamp())
+
+
+def _formatar(instante, resolucao):
+    data = datetime.fromtimestamp(instante, timezone.utc)
+    return data.strftime("%Y-%m-%dT%H:%M:%SZ") if resolucao == "bruto" else data.strftime("%Y-%m-%d")
+
+
+class Agregado:
+    """Períodos de uma resolução: início, fechamento, mínimo e máximo de cada métrica"""
+
+    __slots__ = ("resolucao", "inicios", "atualizacoes", "colunas")
+
+    def __init__(self, resolucao):
+        self.resolucao = resolucao
+        self.inicios = array("q")
+        self.atualizacoes = array("q")
+        self.colunas = {m: (array("q"), array("q"), array("q")) for m in METRICAS}
+
+    def adicionar(self, instante, valores):
+        inicio = inicio_periodo(self.resolucao, instante)
+        if self.inicios and self.inicios[-1] == inicio:
+            self.atualizacoes[-1] += 1
+            for metrica, valor in zip(METRICAS, valores):
+                fechamento, minimo, maximo = self.colunas[metrica]
+                fechamento[-1] = valor
+                if valor < minimo[-1]:
+                    minimo[-1] = valor
+                if valor > maximo[-1]:
+                    maximo[-1] = valor
+            return
+        self.inicios.append(inicio)
+        self.atualizacoes.append(1)
+        for metrica, valor in zip(METRICAS, valores):
+            for coluna in self.colunas[metrica]:
+                coluna.append(valor)
+
+    def intervalo(self, inicio, fim):
+        """Posições [a, b) dos períodos que tocam o intervalo"""
+        a = bisect_left(self.inicios, inicio_periodo(self.resolucao, inicio)) if inicio is not None else 0
+        b = bisect_right(self.inicios, fim) if fim is not None else len(self.inicios)
+        return a, b
+
+    def pontos(self, a, b):
+        colunas = []
+        nomes = []
+        for metrica in METRICAS:
+            fechamento, minimo, maximo = self.colunas[metrica]
+            colunas += [fechamento[a:b], minimo[a:b], maximo[a:b]]
+            nomes += [metrica, f"{metrica}_minimo", f"{metrica}_maximo"]
+        return [
+            {"inicio": _formatar(inicio, self.resolucao), **{n: v / 100 for n, v in zip(nomes, valores)},
+             "atualizacoes": atualizacoes}
+            for inicio, atualizacoes, *valores in zip(self.inicios[a:b], self.atualizacoes[a:b], *colunas)
+        ]
+
+
+class SerieFundo:
+    """Pontos brutos de um fundo e seus agregados"""
+
+    __slots__ = ("instantes", "valores", "agregados")
+
+    def __init__(self):
+        self.instantes = array("q")
+        self.valores = {m: array("q") for m in METRICAS}
+        self.agregados = {r: Agregado(r) for r in RESOLUCOES[1:]}
+
+    def __len__(self):
+        return len(self.instantes)
+
+    def registrar(self, instante, valores):
+        if self.instantes:
+            if all(self.valores[m][-1] == v for m, v in zip(METRICAS, valores)):
+                return False
+            # A série é sempre crescente no tempo (relógio ajustado para trás não reordena)
+            instante = max(instante, self.instantes[-1])
+        self.instantes.append(instante)
+        for metrica, valor in zip(METRICAS, valores):
+            self.valores[metrica].append(valor)
+        for agregado in self.agregados.values():
+            agregado.adicionar(instante, valores)
+        return True
+
+    def intervalo(self, inicio, fim):
+        a = bisect_left(self.instantes, inicio) if inicio is not None else 0
+        b = bisect_right(self.instantes, fim) if fim is not None else len(self.instantes)
+        return a, b
+
+    def pontos(self, a, b):
+        colunas = [self.valores[m][a:b] for m in METRICAS]
+        return [
+            {"instante": _formatar(instante, "bruto"), **{m: v / 100 for m, v in zip(METRICAS, valores)}}
+            for instante, *valores in zip(self.instantes[a:b], *colunas)
+        ]
+
+
+class HistoricoFundos:
+    """Séries de patrimônio e liquidez de todos os fundos"""
+
+    def __init__(self, relogio=time.time):
+        self.series = {}
+        self.relogio = relogio
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Total de pontos brutos guardados"""
+        return sum(len(serie) for serie in list(self.series.values()))
+
+    def registrar(self, fundo_id, patrimonio_centavos, liquidez_centavos, instante=None):
+        """Acrescenta um ponto se algum dos valores mudou; retorna se foi registrado"""
+        instante = int(self.relogio() if instante is None else instante)
+        with self._lock:
+            serie = self.series.get(fundo_id)
+            if serie is None:
+                serie = self.series[fundo_id] = SerieFundo()
+            return serie.registrar(instante, (patrimonio_centavos, liquidez_centavos))
+
+    def remover(self, fundo_id):
+        with self._lock:
+            self.series.pop(fundo_id, None)
+
+    def exportar(self, fundo_id):
+        """Pontos brutos do fundo [[instante, patrimônio, liquidez]] (centavos), para movê-lo de processo"""
+        with self._lock:
+            serie = self.series.get(fundo_id)
+            if serie is None:
+                return []
+            return [list(ponto) for ponto in zip(serie.instantes, *(serie.valores[m] for m in METRICAS))]
+
+    def consultar(self, fundo_id, inicio=None, fim=None, resolucao="auto"):
+        """Pontos do fundo entre inicio e fim (segundos UTC) -> (resolução usada, pontos)
+
+        resolucao: bruto, diario, semanal, mensal ou auto (a mais fina com até
+        MAXIMO_PONTOS_AUTO pontos no intervalo).
+        """
+        if resolucao != "auto" and resolucao not in RESOLUCOES:
+            raise ValueError(f"Resolução inválida: '{resolucao}' (use auto, {', '.join(RESOLUCOES)})")
+        with self._lock:
+            serie = self.series.get(fundo_id)
+            if serie is None:
+                return (resolucao if resolucao != "auto" else "bruto"), []
+            fontes = {"bruto": serie, **serie.agregados}
+            if resolucao == "auto":
+                resolucao = RESOLUCOES[-1]
+                for candidata in RESOLUCOES:
+                    a, b = fontes[candidata].intervalo(inicio, fim)
+                    if b - a <= MAXIMO_PONTOS_AUTO:
+                        resolucao = candidata
+                        break
+            a, b = fontes[resolucao].intervalo(inicio, fim)
+            if resolucao == "bruto" and b - a > MAXIMO_PONTOS_BRUTOS:
+                raise ValueError(
+                    f"{b - a} pontos no intervalo (máximo {MAXIMO_PONTOS_BRUTOS} em 'bruto'): "
+                    "use uma resolução agregada ou um intervalo menor"
+                )
+            return resolucao, fontes[resolucao].pontos(a, b)
@@ -0,0 +1,94 @@
+# SISTEMA TOMATE FUND - ÍNDICE DOS LIVROS POR FUNDO
+# Linhas de compromissos, recebimentos e subscrições de cada fundo sem varrer os livros
+# inteiros a cada consulta. Os livros só crescem (append/extend) ou são trocados por uma
+# lista nova (exclusão de fundo, carga de dados): o índice lê apenas as linhas
+# acrescentadas desde a última consulta e é reconstruído quando a lista muda.
+import threading
+
+
+class IndiceLivros:
+    """Linhas de cada livro agrupadas por fundo_id"""
+
+    def __init__(self, livros):
+        """livros: função sem argumentos -> {nome: lista atual de linhas}"""
+        self.livros = livros
+        self._estados = {}
+        self._lock = threading.Lock()
+
+    def _indice(self, nome):
+        linhas = self.livros()[nome]
+        estado = self._estados.get(nome)
+        if estado is None or estado[0] is not linhas or estado[1] > len(linhas):
+            estado = self._estados[nome] = [linhas, 0, {}]
+        _, lidas, por_fundo = estado
+        total = len(linhas)
+        for i in range(lidas, total):
+            linha = linhas[i]
+            por_fundo.setdefault(linha.fundo_id, []).append(linha)
+        estado[1] = total
+        return por_fundo
+
+    def linhas(self, nome, fundo_id):
+        """Linhas do fundo no livro, na ordem do livro"""
+        with self._lock:
+            return list(self._indice(nome).get(fundo_id, ()))
+
+
+class TotaisFundos:
+    """Totais consolidados em centavos mantidos por delta dos fundos alterados
+
+    Cada fundo contribui com [patrimônio, liquidez, soma de cada livro]; uma alteração
+    recalcula só a contribuição dos fundos envolvidos (linhas do fundo no índice). A soma é
+    refeita do zero quando um livro é trocado por outra lista ou a quantidade de fundos não
+    bate com as contribuições conhecidas (dados carregados sem notificação).
+    """
+
+    def __init__(self, fundos, indice, atributos):
+        """fundos: função -> {fundo_id: Fundo}; atributos: {livro: atributo do valor em centavos}"""
+        self.fundos = fundos
+        self.indice = indice
+        self.atributos = atributos
+        self._por_fundo = {}
+        self._soma = None
+        self._livros = ()
+        self._lock = threading.Lock()
+
+    def _contribuicao(self, fundo_id):
+        fundo = self.fundos().get(fundo_id)
+        if fundo is None:
+            return None
+        valores = [fundo.patrimonio_centavos, fundo.liquidez_centavos]
+        for nome, atributo in self.atributos.items():
+            valores.append(sum(getattr(linha, atributo) for linha in self.indice.linhas(nome, fundo_id)))
+        return valores
+
+    def _reconstruir(self):
+        self._por_fundo = {}
+        self._soma = [0] * (2 + len(self.atributos))
+        for fundo_id in list(self.fundos()):
+            valores = self._contribuicao(fundo_id)
+            if valores is not None:
+                self._por_fundo[fundo_id] = valores
+                self._soma = [a + b for a, b in zip(self._soma, valores)]
+
+    def atualizar(self, fundo_ids):
+        """Aplica a alteração dos fundos e devolve (total_fundos, patrimônio, liquidez, *livros)"""
+        with self._lock:
+            livros = self.indice.livros()
+            # Referências às próprias listas (não id(): o id de uma lista liberada pode ser reutilizado)
+            atuais = tuple(livros[nome] for nome in self.atributos)
+            if self._soma is None or any(a is not b for a, b in zip(atuais, self._livros)):
+                self._livros = atuais
+                self._reconstruir()
+            else:
+                for fundo_id in fundo_ids:
+                    antigo = self._por_fundo.pop(fundo_id, None)
+                    novo = self._contribuicao(fundo_id)
+                    if antigo is not None:
+                        self._soma = [a - b for a, b in zip(self._soma, antigo)]
+                    if novo is not None:
+                        self._por_fundo[fundo_id] = novo
+                        self._soma = [a + b for a, b in zip(self._soma, novo)]
+                if len(self._por_fundo) != len(self.fundos()):
+                    self._reconstruir()
+            return (len(self._por_fundo), *self._soma)
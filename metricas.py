@@ -0,0 +1,284 @@
+# SISTEMA TOMATE FUND - MÉTRICAS NO FORMATO PROMETHEUS
+# Middleware WSGI que mede latência (histograma), bytes e status de cada rota, mais
+# medidores (tamanho dos dados) e taxas de acerto de cache, expostos em texto Prometheus.
+# Com vários processos (workers do gunicorn), defina TOMATE_METRICAS_DIR: cada processo
+# grava seu estado em metricas_<pid>.json e a exportação soma os arquivos de todos.
+# O estado é regravado em segundo plano a cada INTERVALO_GRAVACAO segundos, então a
+# soma pode atrasar esse tanto. O diretório deve começar vazio a cada inicialização.
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites dos buckets de latência, em segundos
+LIMITES_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Intervalo entre gravações do estado do processo no diretório compartilhado
+INTERVALO_GRAVACAO = 1.0
+
+# Rótulo das requisições que não casaram com nenhuma rota
+ROTA_DESCONHECIDA = "<nao_encontrada>"
+CHAVE_ROTA = "tomate.rota"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _rotulos(nomes, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RegistroMetricas:
+    """Contadores e histogramas do processo, com gravação/leitura para somar entre processos"""
+
+    def __init__(self, diretorio=None, limites=LIMITES_PADRAO, intervalo=INTERVALO_GRAVACAO):
+        self.diretorio = diretorio
+        self.limites = tuple(limites)
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._requisicoes = defaultdict(int)   # (rota, metodo, status) -> quantidade
+        self._bytes = defaultdict(int)         # (direcao, rota, metodo) -> bytes
+        self._histogramas = {}                 # (rota, metodo) -> [contagem por bucket..., +Inf, soma]
+        self._medidores = {}                   # nome -> (ajuda, rótulos, função -> {valores dos rótulos: valor})
+        self._caches = {}                      # nome -> função -> (acertos, falhas)
+        self._alterado = False
+        self._pid_gravador = None
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def observar(self, rota, metodo, status, duracao, bytes_entrada, bytes_saida):
+        """Registra uma requisição concluída (duracao=None para não entrar no histograma)"""
+        with self._lock:
+            self._requisicoes[(rota, metodo, str(status))] += 1
+            self._bytes[("entrada", rota, metodo)] += bytes_entrada
+            self._bytes[("saida", rota, metodo)] += bytes_saida
+            if duracao is not None:
+                histograma = self._histogramas.get((rota, metodo))
+                if histograma is None:
+                    histograma = self._histogramas[(rota, metodo)] = [0] * (len(self.limites) + 1) + [0.0]
+                histograma[bisect_left(self.limites, duracao)] += 1
+                histograma[-1] += duracao
+            self._alterado = True
+        if self.diretorio and self._pid_gravador != os.getpid():
+            self._iniciar_gravador()
+
+    def _iniciar_gravador(self):
+        # Uma thread por processo (após o fork de cada worker), iniciada na primeira requisição
+        with self._lock:
+            if self._pid_gravador == os.getpid():
+                return
+            self._pid_gravador = os.getpid()
+
+        def gravar_periodicamente():
+            while True:
+                time.sleep(self.intervalo)
+                if self._alterado:
+                    self.gravar()
+
+        threading.Thread(target=gravar_periodicamente, name="gravador-metricas", daemon=True).start()
+        atexit.register(self.gravar)
+
+    def registrar_medidor(self, nome, ajuda, rotulos, funcao):
+        """Medidor calculado na exportação: funcao() -> {(valores dos rótulos): valor}"""
+        self._medidores[nome] = (ajuda, tuple(rotulos), funcao)
+
+    def registrar_cache(self, nome, funcao):
+        """Cache cujos acertos/falhas acumulados são lidos na exportação: funcao() -> (acertos, falhas)"""
+        self._caches[nome] = funcao
+
+    def instantaneo(self):
+        """Estado atual do processo em formato serializável"""
+        with self._lock:
+            estado = {
+                "pid": os.getpid(),
+                "requisicoes": [[*k, v] for k, v in self._requisicoes.items()],
+                "bytes": [[*k, v] for k, v in self._bytes.items()],
+                "histogramas": [[*k, list(v)] for k, v in self._histogramas.items()]
+            }
+        estado["medidores"] = {
+            nome: [[*valores, valor] for valores, valor in funcao().items()]
+            for nome, (_, _, funcao) in self._medidores.items()
+        }
+        estado["caches"] = {nome: list(funcao()) for nome, funcao in self._caches.items()}
+        return estado
+
+    def gravar(self):
+        """Grava o estado do processo no diretório compartilhado (escrita atômica)"""
+        self._alterado = False
+        caminho = os.path.join(self.diretorio, f"metricas_{os.getpid()}.json")
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(self.instantaneo(), arquivo)
+        os.replace(temporario, caminho)
+
+    def _estados(self):
+        if not self.diretorio:
+            return [self.instantaneo()]
+        self.gravar()
+        estados = []
+        for caminho in glob.glob(os.path.join(self.diretorio, "metricas_*.json")):
+            try:
+                with open(caminho, encoding="utf-8") as arquivo:
+                    estados.append(json.load(arquivo))
+            except (OSError, ValueError):
+                continue
+        return estados
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus, somando todos os processos"""
+        requisicoes, bytes_, caches = defaultdict(int), defaultdict(int), defaultdict(lambda: [0, 0])
+        histogramas = {}
+        medidores = defaultdict(list)
+        multiprocesso = bool(self.diretorio)
+
+        for estado in self._estados():
+            for *chave, valor in estado["requisicoes"]:
+                requisicoes[tuple(chave)] += valor
+            for *chave, valor in estado["bytes"]:
+                bytes_[tuple(chave)] += valor
+            for rota, metodo, valores in estado["histogramas"]:
+                soma = histogramas.setdefault((rota, metodo), [0] * len(valores))
+                for i, v in enumerate(valores):
+                    soma[i] += v
+            # Acertos e falhas são acumulados desde o início de cada processo
+            for nome, (acertos, falhas) in estado["caches"].items():
+                caches[nome][0] += acertos
+                caches[nome][1] += falhas
+            # Medidores são o estado atual: só de processos vivos, identificados pelo pid
+            if not multiprocesso or _processo_vivo(estado["pid"]):
+                for nome, linhas in estado["medidores"].items():
+                    medidores[nome].extend((estado["pid"], linha) for linha in linhas)
+
+        saida = []
+        saida.append("# HELP tomate_requisicoes_total Requisições HTTP concluídas")
+        saida.append("# TYPE tomate_requisicoes_total counter")
+        for (rota, metodo, status), valor in sorted(requisicoes.items()):
+            saida.append(f"tomate_requisicoes_total{_rotulos(('rota', 'metodo', 'status'), (rota, metodo, status))} {valor}")
+
+        erros = defaultdict(int)
+        for (rota, metodo, status), valor in requisicoes.items():
+            if status.startswith("5"):
+                erros[(rota, metodo)] += valor
+        saida.append("# HELP tomate_erros_total Requisições HTTP com status 5xx")
+        saida.append("# TYPE tomate_erros_total counter")
+        for (rota, metodo), valor in sorted(erros.items()):
+            saida.append(f"tomate_erros_total{_rotulos(('rota', 'metodo'), (rota, metodo))} {valor}")
+
+        saida.append("# HELP tomate_requisicao_duracao_segundos Latência das requisições HTTP")
+        saida.append("# TYPE tomate_requisicao_duracao_segundos histogram")
+        for (rota, metodo), valores in sorted(histogramas.items()):
+            acumulado = 0
+            for i, limite in enumerate(self.limites + ("+Inf",)):
+                acumulado += valores[i]
+                le = f'le="{limite}"'
+                saida.append(f"tomate_requisicao_duracao_segundos_bucket{_rotulos(('rota', 'metodo'), (rota, metodo), le)} {acumulado}")
+            rotulos = _rotulos(("rota", "metodo"), (rota, metodo))
+            saida.append(f"tomate_requisicao_duracao_segundos_sum{rotulos} {valores[-1]}")
+            saida.append(f"tomate_requisicao_duracao_segundos_count{rotulos} {acumulado}")
+
+        for nome, direcao, ajuda in (("tomate_requisicao_bytes_total", "entrada", "Bytes recebidos no corpo das requisições"),
+                                     ("tomate_resposta_bytes_total", "saida", "Bytes enviados no corpo das respostas")):
+            saida.append(f"# HELP {nome} {ajuda}")
+            saida.append(f"# TYPE {nome} counter")
+            for (d, rota, metodo), valor in sorted(bytes_.items()):
+                if d == direcao:
+                    saida.append(f"{nome}{_rotulos(('rota', 'metodo'), (rota, metodo))} {valor}")
+
+        for nome, (ajuda, rotulos, _) in sorted(self._medidores.items()):
+            saida.append(f"# HELP {nome} {ajuda}")
+            saida.append(f"# TYPE {nome} gauge")
+            for pid, (*valores, valor) in medidores.get(nome, []):
+                nomes, valores = (rotulos + ("pid",), (*valores, pid)) if multiprocesso else (rotulos, valores)
+                saida.append(f"{nome}{_rotulos(nomes, valores)} {valor}")
+
+        saida.append("# HELP tomate_cache_acertos_total Consultas atendidas pelo cache")
+        saida.append("# TYPE tomate_cache_acertos_total counter")
+        for nome, (acertos, _) in sorted(caches.items()):
+            saida.append(f"tomate_cache_acertos_total{_rotulos(('cache',), (nome,))} {acertos}")
+        saida.append("# HELP tomate_cache_falhas_total Consultas que precisaram calcular o valor")
+        saida.append("# TYPE tomate_cache_falhas_total counter")
+        for nome, (_, falhas) in sorted(caches.items()):
+            saida.append(f"tomate_cache_falhas_total{_rotulos(('cache',), (nome,))} {falhas}")
+        saida.append("# HELP tomate_cache_taxa_acerto Fração das consultas atendidas pelo cache")
+        saida.append("# TYPE tomate_cache_taxa_acerto gauge")
+        for nome, (acertos, falhas) in sorted(caches.items()):
+            taxa = acertos / (acertos + falhas) if acertos + falhas else 0.0
+            saida.append(f"tomate_cache_taxa_acerto{_rotulos(('cache',), (nome,))} {taxa:.6f}")
+
+        return "\n".join(saida) + "\n"
+
+
+class _CorpoMedido:
+    """Envolve o corpo da resposta WSGI para contar os bytes e medir até o fim do envio"""
+
+    def __init__(self, corpo, ao_fechar):
+        self._corpo = corpo
+        self._ao_fechar = ao_fechar
+        self.bytes = 0
+
+    def __iter__(self):
+        for bloco in self._corpo:
+            self.bytes += len(bloco)
+            yield bloco
+
+    def close(self):
+        try:
+            if hasattr(self._corpo, "close"):
+                self._corpo.close()
+        finally:
+            self._ao_fechar(self.bytes)
+
+
+class MiddlewareMetricas:
+    """Middleware WSGI que registra cada requisição no RegistroMetricas
+
+    A rota (modelo da URL, ex.: /fundos/<fundo_id>) é lida de environ[CHAVE_ROTA],
+    preenchida pela aplicação; streams (text/event-stream) não entram no histograma.
+    """
+
+    def __init__(self, app_wsgi, registro):
+        self.app_wsgi = app_wsgi
+        self.registro = registro
+
+    def __call__(self, environ, start_response):
+        inicio = time.perf_counter()
+        resposta = {}
+
+        def iniciar_resposta(status, headers, exc_info=None):
+            resposta["status"] = status.split(" ", 1)[0]
+            resposta["stream"] = any(k.lower() == "content-type" and v.startswith("text/event-stream")
+                                     for k, v in headers)
+            return start_response(status, headers, exc_info)
+
+        def ao_fechar(bytes_saida):
+            duracao = None if resposta.get("stream") else time.perf_counter() - inicio
+            try:
+                bytes_entrada = int(environ.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                bytes_entrada = 0
+            self.registro.observar(
+                environ.get(CHAVE_ROTA, ROTA_DESCONHECIDA), environ.get("REQUEST_METHOD", ""),
+                resposta.get("status", "500"), duracao, bytes_entrada, bytes_saida
+            )
+
+        return _CorpoMedido(self.app_wsgi(environ, iniciar_resposta), ao_fechar)
@@ -0,0 +1,96 @@
+# SISTEMA TOMATE FUND - PARTICIONAMENTO DOS FUNDOS ENTRE SHARDS
+# Cada fundo (com seus livros) pertence a um shard, escolhido por hashing de rendezvous
+# (HRW) sobre o fundo_id: o shard com o maior hash de "shard:fundo" é o dono. O mapa não
+# depende da ordem de cadastro e, ao acrescentar um shard, só os fundos que passam a ter
+# o novo shard como maior hash mudam de lugar (cerca de 1/N), em vez de quase todos como
+# em fundo % N. Um processo da API vira shard com TOMATE_SHARD=<índice>/<total>.
+import hashlib
+import os
+
+
+def ler_shard(texto=None):
+    """'1/4' (ou TOMATE_SHARD) -> (índice, total); None quando o processo não é um shard"""
+    texto = os.environ.get("TOMATE_SHARD") if texto is None else texto
+    if not texto:
+        return None
+    try:
+        indice, total = (int(parte) for parte in texto.split("/"))
+    except ValueError:
+        raise ValueError(f"TOMATE_SHARD inválido: '{texto}' (use <índice>/<total>, ex.: 0/4)")
+    if not 0 <= indice < total:
+        raise ValueError(f"TOMATE_SHARD inválido: '{texto}' (índice deve estar entre 0 e {total - 1})")
+    return indice, total
+
+
+def _peso(shard, fundo_id):
+    resumo = hashlib.blake2b(f"{shard}:{fundo_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(resumo, "big")
+
+
+class MapaShards:
+    """Dono de cada fundo entre 'total' shards (hashing de rendezvous)"""
+
+    def __init__(self, total):
+        if total < 1:
+            raise ValueError("É preciso ao menos um shard")
+        self.total = total
+
+    def dono(self, fundo_id):
+        fundo_id = str(fundo_id)
+        return max(range(self.total), key=lambda shard: _peso(shard, fundo_id))
+
+    def particionar(self, fundo_ids):
+        """{shard: [fundo_ids]} mantendo a ordem recebida (sem repetições)"""
+        partes = {}
+        for fundo_id in dict.fromkeys(fundo_ids):
+            partes.setdefault(self.dono(fundo_id), []).append(fundo_id)
+        return partes
+
+
+def proximo_id(ids, shard=None, piso=0):
+    """Próximo id inteiro de um livro; em um shard (índice, total), só ids ≡ índice (mod total),
+    para que linhas criadas em shards diferentes nunca repitam o id
+
+    piso: maior id já usado fora dos ids locais (sementes de todos os shards, linhas criadas
+    aqui e depois movidas no rebalanceamento); o novo id fica sempre acima dele.
+    """
+    proximo = max(max(ids, default=0), piso) + 1
+    if shard is None:
+        return proximo
+    indice, total = shard
+    return proximo + (indice - proximo) % total
+
+
+def planejar_rebalanceamento(cargas, total, tolerancia=0.1, maximo_movimentos=None):
+    """Movimentos de fundos que aproximam a carga dos shards
+
+    cargas: {fundo_id: (shard atual, peso)}; o peso costuma ser o número de linhas
+    dos livros do fundo (mais 1, para contar o próprio fundo). Move sempre do shard
+    mais carregado para o menos carregado o fundo que mais reduz a diferença entre
+    eles, até a diferença ficar dentro de 'tolerancia' da carga média por shard.
+    Retorna [(fundo_id, origem, destino, peso)].
+    """
+    por_shard = {shard: {} for shard in range(total)}
+    for fundo_id, (shard, peso) in cargas.items():
+        por_shard[shard][fundo_id] = peso
+    soma = {shard: sum(fundos.values()) for shard, fundos in por_shard.items()}
+    limite = tolerancia * sum(soma.values()) / total
+    movimentos = []
+    while maximo_movimentos is None or len(movimentos) < maximo_movimentos:
+        origem = max(soma, key=soma.get)
+        destino = min(soma, key=soma.get)
+        diferenca = soma[origem] - soma[destino]
+        if diferenca <= limite:
+            break
+        # O ideal é mover metade da diferença; pesos >= diferença não melhoram nada
+        candidatos = [(abs(diferenca / 2 - peso), fundo_id) for fundo_id, peso in por_shard[origem].items()
+                      if 0 < peso < diferenca]
+        if not candidatos:
+            break
+        _, fundo_id = min(candidatos)
+        peso = por_shard[origem].pop(fundo_id)
+        por_shard[destino][fundo_id] = peso
+        soma[origem] -= peso
+        soma[destino] += peso
+        movimentos.append((fundo_id, origem, destino, peso))
+    return movimentos
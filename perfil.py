@@ -0,0 +1,157 @@
+# SISTEMA TOMATE FUND - PROFILING SOB DEMANDA
+# Middleware WSGI que executa requisições escolhidas sob o cProfile, com um amostrador
+# de pilhas em paralelo, e grava o resultado em uma pasta de tamanho limitado:
+#   <id>.pstats     estatísticas do cProfile (python -m pstats <arquivo>)
+#   <id>.collapsed  pilhas amostradas no formato "a;b;c contagem" (flamegraph.pl, speedscope)
+#   <id>.json       método, caminho, status e duração da requisição
+# Uma requisição é perfilada quando traz o cabeçalho X-Tomate-Perfil com o token de
+# administrador (TOMATE_PERFIL_TOKEN) ou quando é sorteada pela taxa TOMATE_PERFIL_TAXA.
+# Sem token nem taxa o middleware nem é instalado: as requisições não pagam nada.
+import cProfile
+import hmac
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+TOKEN_ADMIN = os.environ.get("TOMATE_PERFIL_TOKEN")
+TAXA_AMOSTRAGEM = float(os.environ.get("TOMATE_PERFIL_TAXA", 0))
+PASTA_PERFIS = os.environ.get("TOMATE_PERFIL_DIR", os.path.join(tempfile.gettempdir(), "tomate_perfis"))
+MAXIMO_PERFIS = int(os.environ.get("TOMATE_PERFIL_MAXIMO", 50))
+
+# Intervalo entre amostras de pilha, em segundos; durante o perfil o switch interval do
+# GIL é reduzido para o mesmo valor, senão o amostrador só rodaria a cada 5 ms
+INTERVALO_AMOSTRAS = 0.001
+
+CHAVE_PEDIDO = "HTTP_X_TOMATE_PERFIL"
+CABECALHO_ID = "X-Tomate-Perfil-Id"
+
+
+def perfil_habilitado():
+    """Indica se o profiling sob demanda foi configurado"""
+    return bool(TOKEN_ADMIN) or TAXA_AMOSTRAGEM > 0
+
+
+def _quadro(codigo):
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})".replace(";", ",")
+
+
+class AmostradorPilhas(threading.Thread):
+    """Coleta periodicamente a pilha de uma thread e conta as pilhas iguais"""
+
+    def __init__(self, thread_id, intervalo=INTERVALO_AMOSTRAS):
+        super().__init__(name="amostrador-perfil", daemon=True)
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while quadro is not None:
+                pilha.append(_quadro(quadro.f_code))
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        return self.pilhas
+
+
+class MiddlewarePerfil:
+    """Perfila as requisições que pedem (ou são sorteadas) e devolve o id no cabeçalho"""
+
+    def __init__(self, app_wsgi, pasta=PASTA_PERFIS, token=TOKEN_ADMIN, taxa=TAXA_AMOSTRAGEM, maximo=MAXIMO_PERFIS):
+        self.app_wsgi = app_wsgi
+        self.pasta = pasta
+        self.token = token
+        self.taxa = taxa
+        self.maximo = maximo
+        # O cProfile não permite dois perfis simultâneos no mesmo processo (Python 3.12+)
+        self._em_andamento = threading.Lock()
+        os.makedirs(pasta, exist_ok=True)
+
+    def _pedido(self, environ):
+        pedido = environ.get(CHAVE_PEDIDO)
+        if pedido and self.token:
+            return hmac.compare_digest(pedido.encode(), self.token.encode())
+        return self.taxa > 0 and random.random() < self.taxa
+
+    def __call__(self, environ, start_response):
+        if not self._pedido(environ) or not self._em_andamento.acquire(blocking=False):
+            return self.app_wsgi(environ, start_response)
+        try:
+            return self._perfilar(environ, start_response)
+        finally:
+            self._em_andamento.release()
+
+    def _perfilar(self, environ, start_response):
+        perfil_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        resposta = {}
+
+        def iniciar_resposta(status, headers, exc_info=None):
+            resposta["status"] = status
+            return start_response(status, headers + [(CABECALHO_ID, perfil_id)], exc_info)
+
+        amostrador = AmostradorPilhas(threading.get_ident())
+        perfilador = cProfile.Profile()
+        switch_anterior = sys.getswitchinterval()
+        sys.setswitchinterval(INTERVALO_AMOSTRAS)
+        inicio = time.perf_counter()
+        amostrador.start()
+        perfilador.enable()
+        try:
+            corpo = self.app_wsgi(environ, iniciar_resposta)
+        finally:
+            perfilador.disable()
+            duracao = time.perf_counter() - inicio
+            pilhas = amostrador.parar()
+            sys.setswitchinterval(switch_anterior)
+        self._gravar(perfil_id, perfilador, pilhas, {
+            "id": perfil_id,
+            "metodo": environ.get("REQUEST_METHOD"),
+            "caminho": environ.get("PATH_INFO"),
+            "query": environ.get("QUERY_STRING", ""),
+            "status": resposta.get("status"),
+            "duracao_ms": round(duracao * 1000, 3),
+            "amostras": sum(pilhas.values()),
+            "pid": os.getpid()
+        })
+        return corpo
+
+    def _gravar(self, perfil_id, perfilador, pilhas, metadados):
+        base = os.path.join(self.pasta, perfil_id)
+        perfilador.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as arquivo:
+            for pilha, contagem in pilhas.most_common():
+                arquivo.write(f"{pilha} {contagem}\n")
+        with open(f"{base}.json", "w", encoding="utf-8") as arquivo:
+            json.dump(metadados, arquivo, ensure_ascii=False)
+        self._limitar_pasta()
+
+    def _limitar_pasta(self):
+        """Remove os perfis mais antigos além do máximo configurado"""
+        perfis = {}
+        for nome in os.listdir(self.pasta):
+            caminho = os.path.join(self.pasta, nome)
+            perfil_id = nome.split(".", 1)[0]
+            try:
+                perfis[perfil_id] = max(perfis.get(perfil_id, 0), os.path.getmtime(caminho))
+            except OSError:
+                continue
+        excedentes = sorted(perfis, key=perfis.get)[:-self.maximo] if len(perfis) > self.maximo else []
+        for perfil_id in excedentes:
+            for extensao in (".pstats", ".collapsed", ".json"):
+                try:
+                    os.remove(os.path.join(self.pasta, perfil_id + extensao))
+                except OSError:
+                    pass
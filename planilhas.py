@@ -0,0 +1,281 @@
+# SISTEMA TOMATE FUND - PLANILHAS (XLSX E CSV) EM STREAMING
+# Relatórios exportados como planilha sem montar o arquivo em memória: as linhas vêm de
+# geradores e são escritas em modo "somente escrita", em blocos que já seguem para o
+# cliente. O XLSX é um zip (zipfile da biblioteca padrão, sem openpyxl) escrito em um
+# destino sem seek, com textos inline na célula (sem tabela de strings compartilhadas),
+# então a memória usada não cresce com o número de linhas. Abas acima do limite de
+# linhas do Excel continuam em uma nova aba ("nome (2)").
+# As abas de cada relatório (abas_relatorio, abas_consolidado) são montadas a partir do
+# JSON do relatório, o mesmo na API e no roteador de shards.
+import csv
+import io
+import math
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from registros import CompromissoProvisionado, Fundo, Recebimento, SubscricaoCronograma
+
+FORMATOS = ("xlsx", "csv")
+TIPOS_CONTEUDO = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8"
+}
+
+# Limites do Excel: linhas por aba (incluindo o cabeçalho), caracteres por célula e no nome da aba
+MAXIMO_LINHAS_ABA = 1_048_576
+MAXIMO_CARACTERES_CELULA = 32767
+MAXIMO_NOME_ABA = 31
+
+# Colunas das abas dos relatórios, com os campos das subclasses dos registros (vazios
+# nas linhas que não os têm)
+COLUNAS_LIVROS = {
+    "fundos": Fundo.CAMPOS,
+    "compromissos": CompromissoProvisionado.CAMPOS,
+    "recebimentos": Recebimento.CAMPOS,
+    "subscricoes": SubscricaoCronograma.CAMPOS,
+    "fluxos_ativos": ("id", "fundo_id", "ativo_id", "tipo", "valor", "vencimento", "status", "descricao")
+}
+COLUNAS_ESTATISTICAS = ("fundo_id", "livro", "total", "quantidade", "media", "minimo", "maximo")
+COLUNAS_CONSOLIDADO = ("fundo_id", "nome", "patrimonio", "liquidez", "compromissos", "recebimentos",
+                       "subscricoes", "fluxos_ativos", "saldo_projetado")
+COLUNAS_RESUMO = ("campo", "valor")
+
+# Linhas montadas por vez antes de passar ao zip/CSV; blocos entregues ao cliente de ~64 KB
+LINHAS_POR_LOTE = 1000
+TAMANHO_BLOCO = 64 * 1024
+NIVEL_COMPRESSAO = 1
+
+# Caracteres de controle que o XML não aceita
+_ILEGAIS_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_PROIBIDOS_NOME_ABA = re.compile(r"[\[\]:*?/\\]")
+
+_FIM = object()
+_TIPO_PLANILHA = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+_RELACAO = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+class _Saida:
+    """Destino do zip sem seek: acumula o que foi escrito até ser drenado"""
+
+    def __init__(self):
+        self.partes = []
+        self.tamanho = 0
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.tamanho += len(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def drenar(self):
+        dados = b"".join(self.partes)
+        self.partes.clear()
+        self.tamanho = 0
+        return dados
+
+
+def _celula(valor):
+    if valor is None:
+        return "<c/>"
+    tipo = type(valor)
+    if tipo is bool:
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if tipo is int or (tipo is float and math.isfinite(valor)):
+        return f"<c><v>{valor!r}</v></c>"
+    texto = _ILEGAIS_XML.sub("", str(valor))[:MAXIMO_CARACTERES_CELULA]
+    espaco = ' xml:space="preserve"' if texto != texto.strip() else ""
+    return f'<c t="inlineStr"><is><t{espaco}>{escape(texto)}</t></is></c>'
+
+
+def _linha_xml(valores):
+    return "<row>" + "".join(map(_celula, valores)) + "</row>"
+
+
+def _nome_aba(nome, usados):
+    """Nome válido e único para a aba (até 31 caracteres, sem []:*?/\\)"""
+    base = _PROIBIDOS_NOME_ABA.sub("_", str(nome)).strip("'") or "Planilha"
+    candidato, n = base[:MAXIMO_NOME_ABA], 1
+    while candidato.lower() in usados:
+        n += 1
+        sufixo = f" ({n})"
+        candidato = base[:MAXIMO_NOME_ABA - len(sufixo)] + sufixo
+    usados.add(candidato.lower())
+    return candidato
+
+
+def _arquivos_pacote(nomes):
+    """Partes fixas do pacote OOXML para as abas escritas"""
+    abas = range(1, len(nomes) + 1)
+    tipos = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{_TIPO_PLANILHA}.worksheet+xml"/>'
+        for i in abas
+    )
+    yield "[Content_Types].xml", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        f'<Override PartName="/xl/workbook.xml" ContentType="{_TIPO_PLANILHA}.sheet.main+xml"/>'
+        f'{tipos}</Types>'
+    )
+    yield "_rels/.rels", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'<Relationship Id="rId1" Type="{_RELACAO}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    folhas = "".join(f'<sheet name={quoteattr(nome)} sheetId="{i}" r:id="rId{i}"/>' for i, nome in zip(abas, nomes))
+    yield "xl/workbook.xml", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="{_RELACAO}">'
+        f'<sheets>{folhas}</sheets></workbook>'
+    )
+    relacoes = "".join(
+        f'<Relationship Id="rId{i}" Type="{_RELACAO}/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in abas
+    )
+    yield "xl/_rels/workbook.xml.rels", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'{relacoes}</Relationships>'
+    )
+
+
+def gerar_xlsx(abas, linhas_por_aba=MAXIMO_LINHAS_ABA):
+    """Gera os bytes de um .xlsx em blocos, a partir de [(nome, colunas, linhas)]
+
+    'linhas' é qualquer iterável (de preferência um gerador) de sequências de valores
+    na ordem das colunas; None vira célula vazia. Abas com mais linhas que o limite
+    continuam em abas seguintes, com o mesmo cabeçalho.
+    """
+    saida = _Saida()
+    nomes = []
+    usados = set()
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO) as arquivo:
+        for nome, colunas, linhas in abas:
+            cabecalho = _linha_xml(colunas)
+            linhas = iter(linhas)
+            restantes = True
+            while restantes:
+                nomes.append(_nome_aba(nome, usados))
+                # force_zip64: o tamanho final da aba não é conhecido ao abrir a entrada
+                with arquivo.open(f"xl/worksheets/sheet{len(nomes)}.xml", "w", force_zip64=True) as folha:
+                    folha.write(
+                        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        f'<sheetData>{cabecalho}'.encode()
+                    )
+                    escritas = 1
+                    while True:
+                        lote = []
+                        for valores in linhas:
+                            lote.append(_linha_xml(valores))
+                            escritas += 1
+                            if len(lote) == LINHAS_POR_LOTE or escritas == linhas_por_aba:
+                                break
+                        if lote:
+                            folha.write("".join(lote).encode())
+                            if saida.tamanho >= TAMANHO_BLOCO:
+                                yield saida.drenar()
+                        if len(lote) < LINHAS_POR_LOTE or escritas == linhas_por_aba:
+                            break
+                    folha.write(b"</sheetData></worksheet>")
+                if escritas < linhas_por_aba:
+                    restantes = False
+                else:
+                    # Aba cheia: só abre a continuação se ainda houver linhas
+                    proxima = next(linhas, _FIM)
+                    restantes = proxima is not _FIM
+                    if restantes:
+                        linhas = _reinserir(proxima, linhas)
+        for caminho, conteudo in _arquivos_pacote(nomes):
+            arquivo.writestr(caminho, conteudo)
+    yield saida.drenar()
+
+
+def _reinserir(primeira, linhas):
+    yield primeira
+    yield from linhas
+
+
+def gerar_csv(colunas, linhas):
+    """Gera os bytes de um CSV (UTF-8 com BOM, para o Excel reconhecer os acentos) em blocos"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("\ufeff")
+    escritor.writerow(colunas)
+    for valores in linhas:
+        escritor.writerow(["" if v is None else v for v in valores])
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def linhas_registros(registros, colunas):
+    """Valores das colunas de cada registro (ou dict); campos ausentes ficam vazios"""
+    for registro in registros:
+        dados = registro.para_dict() if hasattr(registro, "para_dict") else registro
+        yield [dados.get(coluna) for coluna in colunas]
+
+
+def validar_formato(formato):
+    """None/'json' -> None (resposta JSON); 'xlsx' ou 'csv' -> o próprio formato"""
+    if not formato or formato == "json":
+        return None
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: '{formato}' (use json, {', '.join(FORMATOS)})")
+    return formato
+
+
+def renderizar(nome, formato, abas, aba=None):
+    """(blocos do arquivo, tipo de conteúdo, nome do arquivo) do relatório
+
+    xlsx leva todas as abas; csv só uma ('aba', padrão a primeira).
+    """
+    if formato == "csv":
+        escolhida = aba or abas[0][0]
+        selecionadas = [a for a in abas if a[0] == escolhida]
+        if not selecionadas:
+            raise ValueError(f"Aba inválida: '{escolhida}' (use {', '.join(a[0] for a in abas)})")
+        _, colunas, linhas = selecionadas[0]
+        return gerar_csv(colunas, linhas), TIPOS_CONTEUDO[formato], f"{nome}_{escolhida}.csv"
+    return gerar_xlsx(abas), TIPOS_CONTEUDO[formato], f"{nome}.{formato}"
+
+
+def abas_relatorio(relatorio):
+    """Abas da planilha do relatório personalizado: uma por livro presente e o resumo"""
+    dados = relatorio["dados"]
+    abas = [(nome, colunas, linhas_registros(dados[nome], colunas))
+            for nome, colunas in COLUNAS_LIVROS.items() if nome in dados]
+    if "estatisticas_por_fundo" in dados:
+        abas.append(("estatisticas_por_fundo", COLUNAS_ESTATISTICAS, (
+            [fundo_id, livro, e["total"], e["quantidade"], e["media"], e["minimo"], e["maximo"]]
+            for fundo_id, livros in dados["estatisticas_por_fundo"].items()
+            for livro, e in livros.items()
+        )))
+    resumo = [
+        ("tipo", relatorio["tipo"]),
+        ("data_geracao", relatorio["data_geracao"]),
+        ("periodo_inicio", relatorio["periodo"]["inicio"]),
+        ("periodo_fim", relatorio["periodo"]["fim"]),
+        ("fundos_analisados", relatorio["fundos_analisados"])
+    ]
+    resumo += [(chave, valor) for chave, valor in dados.items() if chave.startswith("total_")]
+    resumo += list(dados.get("estatisticas_fundos", {}).items())
+    abas.append(("resumo", COLUNAS_RESUMO, resumo))
+    return abas
+
+
+def abas_consolidado(dados, atualizado_em=None):
+    """Abas da planilha do resumo consolidado (/relatorios): por fundo e resumo geral"""
+    linhas = (
+        [r["fundo"]["id"], r["fundo"]["nome"], r["fundo"]["patrimonio"], r["fundo"]["liquidez"],
+         r["compromissos"], r["recebimentos"], r["subscricoes"], r["fluxos_ativos"], r["saldo_projetado"]]
+        for r in dados["relatorio_por_fundo"]
+    )
+    resumo = list(dados["resumo_geral"].items()) + [("visao_atualizada_em", atualizado_em)]
+    return [("por_fundo", COLUNAS_CONSOLIDADO, linhas), ("resumo", COLUNAS_RESUMO, resumo)]
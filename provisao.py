@@ -0,0 +1,56 @@
+# SISTEMA TOMATE FUND - PROVISÃO DA TAXA DE ADMINISTRAÇÃO
+# Provisão diária da taxa de administração (% a.a., base 252 dias úteis)
+# calculada para todos os fundos de uma vez a partir de vetores de PL e taxa
+import numpy as np
+
+from calendario import calendario_padrao
+
+DIAS_UTEIS_ANO = 252
+
+# Pagamento da taxa no 5º dia útil do mês seguinte à competência
+DIA_UTIL_PAGAMENTO = 5
+
+
+def competencias(mes_inicio, mes_fim):
+    """Meses ('AAAA-MM') de mes_inicio a mes_fim, inclusive"""
+    meses = np.arange(np.datetime64(mes_inicio, "M"), np.datetime64(mes_fim, "M") + 1)
+    if not len(meses):
+        raise ValueError("Período de competências vazio")
+    return meses
+
+
+def provisao_diaria(patrimonios, taxas_aa, dias_uteis):
+    """Matriz fundos x dias com a taxa provisionada em cada dia útil
+
+    patrimonios pode ser um vetor (PL constante) ou uma matriz fundos x dias.
+    """
+    patrimonios = np.asarray(patrimonios, dtype=float)
+    if patrimonios.ndim == 1:
+        patrimonios = np.broadcast_to(patrimonios[:, None], (len(patrimonios), len(dias_uteis)))
+    taxas_dia = np.asarray(taxas_aa, dtype=float)[:, None] / 100 / DIAS_UTEIS_ANO
+    return patrimonios * taxas_dia
+
+
+def provisionar_meses(patrimonios, taxas_aa, mes_inicio, mes_fim, calendario=None):
+    """Provisão diária de todos os fundos agregada por competência
+
+    Retorna (competências, dias úteis do período, matriz fundos x competências).
+    """
+    calendario = calendario or calendario_padrao()
+    meses = competencias(mes_inicio, mes_fim)
+    dias = np.arange(meses[0].astype("datetime64[D]"), (meses[-1] + 1).astype("datetime64[D]"))
+    dias_uteis = dias[calendario.eh_dia_util(dias)]
+
+    diaria = provisao_diaria(patrimonios, taxas_aa, dias_uteis)
+    # Início de cada competência dentro do vetor de dias úteis
+    mes_do_dia = dias_uteis.astype("datetime64[M]")
+    fronteiras = np.searchsorted(mes_do_dia, meses)
+    mensal = np.add.reduceat(diaria, fronteiras, axis=1) if diaria.size else np.zeros((len(diaria), len(meses)))
+    return meses, dias_uteis, mensal
+
+
+def vencimentos_competencias(meses, calendario=None):
+    """Data de pagamento de cada competência (N-ésimo dia útil do mês seguinte)"""
+    calendario = calendario or calendario_padrao()
+    primeiro_dia = (np.asarray(meses, dtype="datetime64[M]") + 1).astype("datetime64[D]")
+    return calendario.somar_dias_uteis(primeiro_dia, DIA_UTIL_PAGAMENTO - 1)
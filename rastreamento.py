@@ -0,0 +1,224 @@
+# SISTEMA TOMATE FUND - RASTREAMENTO (SPANS) DAS ETAPAS DAS REQUISIÇÕES
+# Spans leves e aninhados (filtro, soma, projeção, serialização...) dentro de cada
+# requisição. Ao fim da requisição a árvore de spans pode ser:
+#   - gravada em JSON lines, um span por linha (TOMATE_TRACE_JSONL=<arquivo>)
+#   - enviada a um coletor OTLP/HTTP JSON (TOMATE_TRACE_OTLP=http://localhost:4318/v1/traces)
+#   - registrada no log de requisições lentas se passar de TOMATE_TRACE_LENTO_MS
+# Sem nenhuma dessas variáveis o rastreamento fica desligado e span() não faz nada.
+import json
+import os
+import queue
+import secrets
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+ARQUIVO_JSONL = os.environ.get("TOMATE_TRACE_JSONL")
+URL_OTLP = os.environ.get("TOMATE_TRACE_OTLP")
+LIMIAR_LENTO_MS = float(os.environ.get("TOMATE_TRACE_LENTO_MS", 0))
+ARQUIVO_LENTOS = os.environ.get("TOMATE_TRACE_LENTOS_ARQUIVO", os.path.join(tempfile.gettempdir(), "tomate_lentos.jsonl"))
+
+NOME_SERVICO = "tomate-fund"
+
+# Fila de envio ao coletor OTLP: acima disso os traces são descartados, sem bloquear a requisição
+CAPACIDADE_FILA_OTLP = 1000
+LOTE_OTLP = 50
+
+_span_atual = ContextVar("tomate_span_atual", default=None)
+_lock_arquivos = threading.Lock()
+
+
+class Span:
+    """Etapa cronometrada, com atributos e filhos"""
+
+    __slots__ = ("nome", "trace_id", "span_id", "pai", "inicio_ns", "fim_ns", "atributos", "filhos", "_token")
+
+    def __init__(self, nome, pai, atributos):
+        self.nome = nome
+        self.pai = pai
+        self.trace_id = pai.trace_id if pai else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.atributos = atributos
+        self.filhos = []
+        self.inicio_ns = time.time_ns()
+        self.fim_ns = None
+        self._token = None
+
+    @property
+    def duracao_ms(self):
+        return ((self.fim_ns or time.time_ns()) - self.inicio_ns) / 1e6
+
+    def definir(self, **atributos):
+        self.atributos.update(atributos)
+
+    def arvore(self):
+        """Representação aninhada usada no log de requisições lentas"""
+        return {
+            "nome": self.nome,
+            "duracao_ms": round(self.duracao_ms, 3),
+            "atributos": self.atributos,
+            "filhos": [filho.arvore() for filho in self.filhos]
+        }
+
+    def percorrer(self):
+        yield self
+        for filho in self.filhos:
+            yield from filho.percorrer()
+
+
+def rastreamento_habilitado():
+    """Indica se algum destino de spans foi configurado"""
+    return bool(ARQUIVO_JSONL or URL_OTLP or LIMIAR_LENTO_MS > 0)
+
+
+def abrir_span(nome, atributos=None, raiz=False):
+    """Abre um span filho do atual (ou a raiz de um novo trace, se raiz=True)
+
+    Retorna None se o rastreamento estiver desligado ou, sem raiz=True, se não
+    houver trace ativo.
+    """
+    pai = _span_atual.get()
+    if pai is None and not (raiz and rastreamento_habilitado()):
+        return None
+    novo = Span(nome, pai, dict(atributos or {}))
+    if pai is not None:
+        pai.filhos.append(novo)
+    novo._token = _span_atual.set(novo)
+    return novo
+
+
+def fechar_span(aberto):
+    """Fecha o span; ao fechar a raiz, exporta o trace completo"""
+    if aberto is None or aberto.fim_ns is not None:
+        return
+    aberto.fim_ns = time.time_ns()
+    try:
+        _span_atual.reset(aberto._token)
+    except ValueError:
+        # Fechado em outro contexto (ex.: teardown após cópia de contexto)
+        _span_atual.set(aberto.pai)
+    if aberto.pai is None:
+        exportar_trace(aberto)
+
+
+@contextmanager
+def span(nome, **atributos):
+    """Cronometra uma etapa dentro da requisição atual (sem trace ativo, não faz nada)"""
+    if _span_atual.get() is None:
+        yield None
+        return
+    aberto = abrir_span(nome, atributos)
+    try:
+        yield aberto
+    finally:
+        fechar_span(aberto)
+
+
+def _registro_span(s):
+    return {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "parentSpanId": s.pai.span_id if s.pai else "",
+        "name": s.nome,
+        "startTimeUnixNano": s.inicio_ns,
+        "endTimeUnixNano": s.fim_ns,
+        "durationMs": round(s.duracao_ms, 3),
+        "attributes": s.atributos
+    }
+
+
+def _valor_otlp(valor):
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+def _span_otlp(s):
+    return {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "parentSpanId": s.pai.span_id if s.pai else "",
+        "name": s.nome,
+        "kind": 2 if s.pai is None else 1,
+        "startTimeUnixNano": str(s.inicio_ns),
+        "endTimeUnixNano": str(s.fim_ns),
+        "attributes": [{"key": k, "value": _valor_otlp(v)} for k, v in s.atributos.items()]
+    }
+
+
+class ExportadorOTLP:
+    """Envia traces a um coletor OTLP/HTTP (JSON) a partir de uma thread em segundo plano"""
+
+    def __init__(self, url, capacidade=CAPACIDADE_FILA_OTLP):
+        self.url = url
+        self.fila = queue.Queue(maxsize=capacidade)
+        self.descartados = 0
+        self._pid = None
+
+    def enviar(self, raiz):
+        if self._pid != os.getpid():
+            # Uma thread por processo (workers do gunicorn são criados por fork)
+            self._pid = os.getpid()
+            threading.Thread(target=self._executar, name="exportador-otlp", daemon=True).start()
+        try:
+            self.fila.put_nowait(raiz)
+        except queue.Full:
+            self.descartados += 1
+
+    def _executar(self):
+        while True:
+            lote = [self.fila.get()]
+            while len(lote) < LOTE_OTLP:
+                try:
+                    lote.append(self.fila.get_nowait())
+                except queue.Empty:
+                    break
+            corpo = {"resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": NOME_SERVICO}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "rastreamento"},
+                    "spans": [_span_otlp(s) for raiz in lote for s in raiz.percorrer()]
+                }]
+            }]}
+            requisicao = urllib.request.Request(
+                self.url, data=json.dumps(corpo, default=str).encode(),
+                headers={"Content-Type": "application/json"}, method="POST"
+            )
+            try:
+                urllib.request.urlopen(requisicao, timeout=5).close()
+            except OSError:
+                # Coletor indisponível: o lote é descartado, a API segue funcionando
+                self.descartados += len(lote)
+
+
+EXPORTADOR_OTLP = ExportadorOTLP(URL_OTLP) if URL_OTLP else None
+
+
+def _anexar_linhas(caminho, linhas):
+    with _lock_arquivos:
+        with open(caminho, "a", encoding="utf-8") as arquivo:
+            for linha in linhas:
+                arquivo.write(json.dumps(linha, ensure_ascii=False, default=str) + "\n")
+
+
+def exportar_trace(raiz):
+    """Envia o trace concluído aos destinos configurados"""
+    if ARQUIVO_JSONL:
+        _anexar_linhas(ARQUIVO_JSONL, [_registro_span(s) for s in raiz.percorrer()])
+    if EXPORTADOR_OTLP is not None:
+        EXPORTADOR_OTLP.enviar(raiz)
+    if LIMIAR_LENTO_MS > 0 and raiz.duracao_ms >= LIMIAR_LENTO_MS:
+        _anexar_linhas(ARQUIVO_LENTOS, [{
+            "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "trace_id": raiz.trace_id,
+            "duracao_ms": round(raiz.duracao_ms, 3),
+            "limiar_ms": LIMIAR_LENTO_MS,
+            "arvore": raiz.arvore()
+        }])
@@ -0,0 +1,186 @@
+# SISTEMA TOMATE FUND - REGISTROS COMPACTOS
+# Fundos, linhas dos livros (compromissos, recebimentos, subscrições) e fluxos esperados
+# dos ativos como dataclasses
+# com __slots__ em vez de dicts: sem dicionário por linha e com os campos categóricos
+# (status, tipo, fundo_id, vencimento...) internados, compartilhando uma única string.
+# Valores monetários ficam em centavos inteiros (atributos *_centavos): somas exatas e
+# independentes da ordem, que podem ser divididas entre processos sem perder centavos.
+# Continuam aceitando r["campo"], r.get("campo"), keys() e items() como um dict, com os
+# valores em reais (float); para_dict() é o atalho (gerado por classe) para o dict pronto
+# para JSON. A conversão para float só acontece nessa borda.
+# Campos que só algumas linhas têm ficam em subclasses, para não virarem null no JSON.
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+
+SUFIXO_CENTAVOS = "_centavos"
+
+
+def centavos(valor):
+    """Reais (float, int ou texto) -> centavos inteiros"""
+    return round(float(valor) * 100)
+
+
+def reais(valor_centavos):
+    """Centavos inteiros -> reais (float), apenas para a resposta JSON"""
+    return valor_centavos / 100
+
+
+class Registro(Mapping):
+    """Base dos registros: acesso por chave compatível com o dict que substitui"""
+
+    __slots__ = ()
+    CAMPOS = ()
+    INTERNADOS = frozenset()
+
+    def __post_init__(self):
+        for campo in self.INTERNADOS:
+            valor = getattr(self, campo)
+            if type(valor) is str:
+                setattr(self, campo, sys.intern(valor))
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Cria o registro a partir de um dict com os mesmos campos (valores em reais)"""
+        campos = {}
+        for chave, valor in dados.items():
+            atributo = cls._monetarios.get(chave)
+            if atributo is None:
+                campos[chave] = valor
+            else:
+                campos[atributo] = centavos(valor)
+        return cls(**campos)
+
+    def __getitem__(self, chave):
+        atributo = self._monetarios.get(chave)
+        if atributo is not None:
+            return getattr(self, atributo) / 100
+        if chave not in self._indice:
+            raise KeyError(chave)
+        return getattr(self, chave)
+
+    def __setitem__(self, chave, valor):
+        atributo = self._monetarios.get(chave)
+        if atributo is not None:
+            setattr(self, atributo, centavos(valor))
+            return
+        if chave not in self._indice:
+            raise KeyError(chave)
+        if chave in self.INTERNADOS and type(valor) is str:
+            valor = sys.intern(valor)
+        setattr(self, chave, valor)
+
+    def __iter__(self):
+        return iter(self.CAMPOS)
+
+    def __len__(self):
+        return len(self.CAMPOS)
+
+    def __contains__(self, chave):
+        return chave in self._indice
+
+
+def _gerar_para_dict(atributos):
+    """Gera para_dict() com os campos escritos no código, como o dataclasses faz com __init__
+    (cerca de 2x mais rápido que montar o dict em um laço)"""
+    itens = []
+    for atributo in atributos:
+        if atributo.endswith(SUFIXO_CENTAVOS):
+            itens.append(f"{atributo[:-len(SUFIXO_CENTAVOS)]!r}: self.{atributo} / 100")
+        else:
+            itens.append(f"{atributo!r}: self.{atributo}")
+    namespace = {}
+    exec(f"def para_dict(self):\n    return {{{', '.join(itens)}}}\n", namespace)
+    para_dict = namespace["para_dict"]
+    para_dict.__doc__ = "Dict pronto para JSON (valores em reais)"
+    return para_dict
+
+
+def registro(*internados):
+    """Transforma a classe em dataclass com slots e registra seus campos"""
+    def decorar(cls):
+        cls = dataclass(slots=True)(cls)
+        atributos = tuple(f.name for f in fields(cls))
+        cls._monetarios = {a[:-len(SUFIXO_CENTAVOS)]: a for a in atributos if a.endswith(SUFIXO_CENTAVOS)}
+        cls.CAMPOS = tuple(a[:-len(SUFIXO_CENTAVOS)] if a.endswith(SUFIXO_CENTAVOS) else a for a in atributos)
+        cls.INTERNADOS = frozenset(internados) | cls.INTERNADOS
+        cls._indice = frozenset(cls.CAMPOS)
+        cls.para_dict = _gerar_para_dict(atributos)
+        return cls
+    return decorar
+
+
+@registro("id", "politica_liquidez", "gestor", "data_criacao", "status")
+class Fundo(Registro):
+    id: str
+    nome: str
+    cnpj: str
+    patrimonio_centavos: int
+    liquidez_centavos: int
+    politica_liquidez: str
+    prazo_resgate: int
+    gestor: str
+    taxa_admin: float
+    data_criacao: str
+    status: str
+
+
+@registro("fundo_id", "tipo", "vencimento", "status")
+class Compromisso(Registro):
+    id: int
+    fundo_id: str
+    tipo: str
+    valor_centavos: int = 0
+    vencimento: str = None
+    status: str = "PENDENTE"
+    descricao: str = None
+
+
+@registro("competencia")
+class CompromissoProvisionado(Compromisso):
+    """Compromisso de taxa de administração gerado pela provisão mensal"""
+    competencia: str = None
+
+
+@registro("fundo_id", "tipo", "vencimento", "status")
+class Recebimento(Registro):
+    id: int
+    fundo_id: str
+    tipo: str
+    valor_centavos: int
+    vencimento: str
+    status: str = "PENDENTE"
+    descricao: str = None
+
+
+@registro("fundo_id", "vencimento", "status", "parcela")
+class Subscricao(Registro):
+    id: int
+    fundo_id: str
+    cotista: str
+    cpf_cnpj: str
+    cotas: int
+    valor_parcela_centavos: int = 0
+    vencimento: str = None
+    status: str = "PENDENTE"
+    parcela: str = None
+
+
+@registro()
+class SubscricaoCronograma(Subscricao):
+    """Subscrição cadastrada pela API, com o cronograma completo de integralização"""
+    compromisso_total_centavos: int = 0
+    periodo_meses: int = 1
+
+
+@registro("fundo_id", "ativo_id", "tipo", "vencimento", "status")
+class FluxoAtivo(Registro):
+    """Fluxo esperado de um vencimento de ativo (ativos.py)"""
+    id: str
+    fundo_id: str
+    ativo_id: str
+    tipo: str
+    valor_centavos: int
+    vencimento: str
+    status: str = "PENDENTE"
+    descricao: str = None
@@ -0,0 +1,912 @@
+# SISTEMA TOMATE FUND - ROTEADOR DOS SHARDS POR FUNDO
+# Os fundos (com livros, ativos e histórico) ficam particionados entre vários processos
+# da API, cada um iniciado com TOMATE_SHARD=<índice>/<total> (particionamento.py). O
+# roteador mantém o diretório fundo -> shard e encaminha as rotas de um fundo ao shard
+# dono; as rotas consolidadas (/relatorios, /outliers, /relatorios/gerar com fundos de
+# vários shards e as listagens sem fundo_id) vão a todos os shards em paralelo e as
+# parciais são combinadas aqui, somando em centavos. Fundos podem ser movidos entre
+# shards (POST /shards/rebalancear) para equilibrar a carga.
+#
+# O diretório fica em memória: o roteador roda em um único processo (com threads).
+# Uso: python roteador.py --shards 4 [--porta 5000]   (sobe os shards nas portas seguintes)
+#      python roteador.py --urls http://10.0.0.1:5000,http://10.0.0.2:5000
+#      (ou TOMATE_SHARDS_URLS, na ordem dos índices dos shards)
+import argparse
+import atexit
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import chain
+from urllib.parse import quote, urlencode
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+from particionamento import MapaShards, planejar_rebalanceamento
+from planilhas import abas_consolidado, abas_relatorio, renderizar, validar_formato
+from registros import centavos, reais
+from serializacao import JSONProviderRapido, comprimir_resposta
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, json da biblioteca padrão
+    orjson = None
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+TEMPO_LIMITE = float(os.environ.get("TOMATE_SHARDS_TEMPO_LIMITE", 120))
+# Com uma tolerância (ex.: 0.2), rebalanceia em segundo plano após cada fundo criado
+REBALANCEAMENTO_AUTOMATICO = os.environ.get("TOMATE_REBALANCEAMENTO_AUTOMATICO")
+LIMITE_MAXIMO_PAGINA = 1000
+TAMANHO_BLOCO = 64 * 1024
+# Cabeçalhos da resposta do shard repassados ao cliente
+CABECALHOS_REPASSADOS = ("Content-Type", "Content-Disposition", "Content-Encoding", "Cache-Control",
+                         "Vary", "X-Accel-Buffering")
+LIVROS = {"compromissos": "valor", "recebimentos": "valor", "subscricoes": "valor_parcela"}
+# Requisições de todos os fundos (rotas consolidadas) no controle de migrações
+TODOS = None
+
+
+def _ler_json(corpo):
+    return orjson.loads(corpo) if orjson else json.loads(corpo)
+
+
+def _gerar_json(dados):
+    return orjson.dumps(dados) if orjson else json.dumps(dados).encode("utf-8")
+
+
+def _chave_id(fundo_id):
+    """Ids numéricos em ordem numérica (a ordem de cadastro da API), os demais depois"""
+    return (0, int(fundo_id), "") if fundo_id.isdigit() else (1, 0, fundo_id)
+
+
+class ErroShard(Exception):
+    """Resposta de erro de um shard (ou falha ao alcançá-lo), repassada ao cliente"""
+
+    def __init__(self, status, corpo):
+        super().__init__(corpo.get("error") or f"Shard respondeu {status}")
+        self.status = status
+        self.corpo = corpo
+
+
+class ClusterShards:
+    """Shards da API, diretório fundo -> shard e migração de fundos entre shards"""
+
+    def __init__(self, urls=()):
+        self._pool = None
+        self.configurar(urls)
+
+    def configurar(self, urls):
+        self.urls = [url.rstrip("/") for url in urls]
+        self.mapa = MapaShards(len(self.urls)) if self.urls else None
+        self.diretorio = None
+        self.migrando = set()
+        self.em_andamento = {}
+        self.movimentos = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._rebalanceando = threading.Lock()
+        self._rodizio = itertools.count()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self._pool = ThreadPoolExecutor(max_workers=max(8 * len(self.urls), 1), thread_name_prefix="shards")
+
+    # --- HTTP ---
+
+    def chamar(self, shard, metodo, caminho, consulta=None, corpo=None, tipo=None, cabecalhos=None, stream=False):
+        """(status, cabeçalhos, corpo) da requisição ao shard; stream=True devolve a resposta aberta"""
+        url = self.urls[shard] + caminho
+        if consulta:
+            url += "?" + (consulta if isinstance(consulta, str) else urlencode(consulta, doseq=True))
+        if corpo is not None and not isinstance(corpo, bytes):
+            corpo, tipo = _gerar_json(corpo), "application/json"
+        cabecalhos = dict(cabecalhos or {})
+        if tipo:
+            cabecalhos["Content-Type"] = tipo
+        pedido = urllib.request.Request(url, data=corpo, method=metodo, headers=cabecalhos)
+        try:
+            resposta = urllib.request.urlopen(pedido, timeout=TEMPO_LIMITE)
+        except urllib.error.HTTPError as e:
+            resposta = e
+        except OSError as e:
+            raise ErroShard(502, {"success": False, "error": f"Shard {shard} indisponível: {e}"})
+        if stream:
+            return resposta
+        with resposta:
+            return resposta.getcode(), resposta.headers, resposta.read()
+
+    def json(self, shard, metodo, caminho, consulta=None, corpo=None):
+        """Resposta JSON do shard; status de erro viram ErroShard"""
+        status, _, dados = self.chamar(shard, metodo, caminho, consulta, corpo)
+        try:
+            resposta = _ler_json(dados) if dados else {}
+        except ValueError:
+            resposta = {"success": False, "error": dados.decode("utf-8", "replace")[:500]}
+        if status >= 400:
+            raise ErroShard(status, resposta)
+        return resposta
+
+    def espalhar(self, chamadas):
+        """{shard: (método, caminho, consulta, corpo)} em paralelo -> {shard: resposta JSON}"""
+        futuros = {shard: self._pool.submit(self.json, shard, *chamada) for shard, chamada in chamadas.items()}
+        return {shard: futuro.result() for shard, futuro in futuros.items()}
+
+    def todos(self, metodo, caminho, consulta=None, corpo=None):
+        return self.espalhar({shard: (metodo, caminho, consulta, corpo) for shard in range(len(self.urls))})
+
+    def qualquer(self):
+        """Shard para rotas que não dependem dos fundos (rodízio)"""
+        return next(self._rodizio) % len(self.urls)
+
+    # --- DIRETÓRIO ---
+
+    def carregar_diretorio(self):
+        """Monta o diretório com os fundos de cada shard (na primeira requisição)"""
+        if self.diretorio is not None:
+            return
+        if not self.urls:
+            raise ErroShard(503, {"success": False, "error": "Nenhum shard configurado (TOMATE_SHARDS_URLS)"})
+        diretorio = {
+            fundo["id"]: shard
+            for shard, resposta in self.todos("GET", "/fundos").items()
+            for fundo in resposta["data"]
+        }
+        with self._lock:
+            if self.diretorio is None:
+                self.diretorio = dict(sorted(diretorio.items(), key=lambda item: _chave_id(item[0])))
+
+    def fundos(self):
+        with self._lock:
+            return list(self.diretorio)
+
+    def posicoes(self):
+        """Posição de cada fundo no diretório, para ordenar as respostas combinadas"""
+        with self._lock:
+            return {fundo_id: i for i, fundo_id in enumerate(self.diretorio)}
+
+    def dono(self, fundo_id):
+        shard = self.diretorio.get(fundo_id)
+        return self.mapa.dono(fundo_id) if shard is None else shard
+
+    def particionar(self, fundo_ids):
+        """{shard: [fundo_ids]} em ordem de shard, cada fundo uma vez"""
+        with self._lock:
+            partes = {}
+            for fundo_id in dict.fromkeys(fundo_ids):
+                partes.setdefault(self.dono(fundo_id), []).append(fundo_id)
+        return dict(sorted(partes.items()))
+
+    def reservar_fundo(self, fundo_id=None):
+        """Reserva no diretório o id do fundo novo (o próximo livre, como na API em um só
+        processo, ou o informado) -> (id, shard); None se o id informado já existe"""
+        with self._lock:
+            if fundo_id is None:
+                fundo_id = str(len(self.diretorio) + 1)
+                while fundo_id in self.diretorio:
+                    fundo_id = str(int(fundo_id) + 1)
+            elif fundo_id in self.diretorio:
+                return None
+            shard = self.diretorio[fundo_id] = self.mapa.dono(fundo_id)
+            return fundo_id, shard
+
+    def remover_fundo(self, fundo_id):
+        with self._lock:
+            self.diretorio.pop(fundo_id, None)
+
+    @contextmanager
+    def em_uso(self, fundo_id=TODOS):
+        """Requisição a um fundo (ou a todos, TODOS) -> shard dono; a migração de um fundo
+        espera as requisições em andamento e as novas esperam a migração terminar"""
+        with self._cond:
+            while fundo_id in self.migrando or (fundo_id is TODOS and self.migrando):
+                self._cond.wait()
+            self.em_andamento[fundo_id] = self.em_andamento.get(fundo_id, 0) + 1
+            shard = self.dono(fundo_id) if fundo_id is not TODOS else None
+        try:
+            yield shard
+        finally:
+            with self._cond:
+                self.em_andamento[fundo_id] -= 1
+                if not self.em_andamento[fundo_id]:
+                    del self.em_andamento[fundo_id]
+                self._cond.notify_all()
+
+    # --- REBALANCEAMENTO ---
+
+    def cargas(self):
+        """{fundo_id: (shard, peso)}: linhas dos livros do fundo mais 1 (o próprio fundo)"""
+        return {
+            fundo_id: (shard, linhas + 1)
+            for shard, resposta in self.todos("GET", "/interno/carga").items()
+            for fundo_id, linhas in resposta["data"].items()
+        }
+
+    def mover(self, fundo_id, origem, destino):
+        """Copia o fundo para o destino, aponta o diretório para lá e o remove da origem"""
+        with self._cond:
+            self.migrando.add(fundo_id)
+            while self.em_andamento.get(fundo_id) or self.em_andamento.get(TODOS):
+                self._cond.wait()
+        try:
+            caminho = f"/fundos/{quote(fundo_id, safe='')}"
+            exportado = self.json(origem, "GET", f"/interno{caminho}/exportar")["data"]
+            self.json(destino, "POST", "/interno/fundos/importar", corpo=exportado)
+            with self._lock:
+                self.diretorio[fundo_id] = destino
+            self.json(origem, "DELETE", caminho)
+            self.movimentos += 1
+        finally:
+            with self._cond:
+                self.migrando.discard(fundo_id)
+                self._cond.notify_all()
+
+    def rebalancear(self, tolerancia=0.1, executar=True, maximo_movimentos=None):
+        """Planeja (e executa) a movimentação de fundos dos shards mais carregados para os menos carregados"""
+        with self._rebalanceando:
+            cargas = self.cargas()
+            plano = planejar_rebalanceamento(cargas, len(self.urls), tolerancia, maximo_movimentos)
+            carga_shards = [0] * len(self.urls)
+            for shard, peso in cargas.values():
+                carga_shards[shard] += peso
+            movimentos = []
+            for fundo_id, origem, destino, peso in plano:
+                movimento = {"fundo_id": fundo_id, "origem": origem, "destino": destino, "peso": peso}
+                if executar:
+                    try:
+                        self.mover(fundo_id, origem, destino)
+                        movimento["status"] = "movido"
+                    except ErroShard as e:
+                        movimento.update(status="erro", erro=str(e))
+                movimentos.append(movimento)
+            return {
+                "carga_antes": carga_shards,
+                "movimentos": movimentos,
+                "executado": executar
+            }
+
+    def rebalancear_em_segundo_plano(self, tolerancia):
+        """Rebalanceamento automático (após cadastro de fundo); ignorado se já houver um em curso"""
+        def executar():
+            if self._rebalanceando.locked():
+                return
+            try:
+                self.rebalancear(tolerancia)
+            except ErroShard:
+                pass
+        threading.Thread(target=executar, name="rebalanceamento", daemon=True).start()
+
+
+# =========================================================
+# APLICAÇÃO FLASK DO ROTEADOR
+# =========================================================
+
+app = Flask(__name__)
+app.json = JSONProviderRapido(app)
+CORS(app)
+
+CLUSTER = ClusterShards([url for url in os.environ.get("TOMATE_SHARDS_URLS", "").split(",") if url])
+
+
+@app.after_request
+def aplicar_compressao(response):
+    return comprimir_resposta(response, request)
+
+
+@app.errorhandler(ErroShard)
+def erro_shard(e):
+    return jsonify(e.corpo), e.status
+
+
+@app.before_request
+def preparar_diretorio():
+    if request.endpoint != 'health_check':
+        CLUSTER.carregar_diretorio()
+
+
+def responder_bruto(status, cabecalhos, corpo):
+    return Response(corpo, status=status,
+                    headers=[(nome, cabecalhos[nome]) for nome in CABECALHOS_REPASSADOS if nome in cabecalhos])
+
+
+def encaminhar(shard, corpo=None, tipo=None):
+    """Repassa a requisição atual ao shard e devolve a resposta dele em blocos"""
+    resposta = CLUSTER.chamar(
+        shard, request.method, request.path, request.query_string.decode(),
+        corpo if corpo is not None else request.get_data() or None,
+        tipo or request.content_type,
+        {"Accept-Encoding": request.headers.get("Accept-Encoding", "")}, stream=True
+    )
+
+    def blocos():
+        with resposta:
+            while bloco := resposta.read(TAMANHO_BLOCO):
+                yield bloco
+
+    return responder_bruto(resposta.getcode(), resposta.headers, blocos())
+
+
+def encaminhar_fundo(fundo_id):
+    """Repassa a requisição ao shard dono do fundo (lida por inteiro: a migração do fundo espera o fim)"""
+    with CLUSTER.em_uso(fundo_id) as shard:
+        status, cabecalhos, corpo = CLUSTER.chamar(
+            shard, request.method, request.path, request.query_string.decode(), request.get_data() or None,
+            request.content_type, {"Accept-Encoding": request.headers.get("Accept-Encoding", "")}
+        )
+    return responder_bruto(status, cabecalhos, corpo)
+
+
+def paginar(dados):
+    """Recorta a página pedida e retorna (página, metadados da paginação)"""
+    if 'offset' not in request.args and 'limite' not in request.args:
+        return dados, {}
+    try:
+        offset = int(request.args.get('offset', 0))
+        limite = int(request.args.get('limite', LIMITE_MAXIMO_PAGINA))
+    except ValueError:
+        raise ValueError("Parâmetros 'offset' e 'limite' devem ser inteiros")
+    if offset < 0 or limite < 1:
+        raise ValueError("'offset' deve ser >= 0 e 'limite' >= 1")
+    limite = min(limite, LIMITE_MAXIMO_PAGINA)
+    return dados[offset:offset + limite], {"offset": offset, "limite": limite}
+
+
+def responder_planilha(nome, formato, abas):
+    corpo, tipo, arquivo = renderizar(nome, formato, abas, request.args.get('aba'))
+    return Response(corpo, mimetype=tipo, headers={
+        "Content-Disposition": f'attachment; filename="{arquivo}"',
+        "Cache-Control": "no-cache"
+    })
+
+
+def ordenar_fundos(fundo_ids):
+    """Ids na ordem dos fundos no diretório"""
+    posicoes = CLUSTER.posicoes()
+    return sorted(fundo_ids, key=lambda fundo_id: posicoes.get(fundo_id, len(posicoes)))
+
+
+def ordenar_por_fundo(itens, campo="fundo_id"):
+    """Itens na ordem dos fundos no diretório (estável dentro de cada fundo)"""
+    posicoes = CLUSTER.posicoes()
+    return sorted(itens, key=lambda item: posicoes.get(item[campo], len(posicoes)))
+
+
+def somar_reais(valores):
+    """Soma exata de valores em reais (via centavos)"""
+    return reais(sum(centavos(v) for v in valores))
+
+
+# --- ROTAS DE UM FUNDO (shard dono) ---
+
+@app.route('/fundos/<fundo_id>', methods=['GET', 'PUT'])
+@app.route('/fundos/<fundo_id>/historico', methods=['GET'])
+@app.route('/dashboard/<fundo_id>', methods=['GET'])
+def rota_fundo(fundo_id):
+    """Rotas de um fundo: atendidas pelo shard dono"""
+    return encaminhar_fundo(fundo_id)
+
+
+@app.route('/fundos/<fundo_id>', methods=['DELETE'])
+def deletar_fundo(fundo_id):
+    """Deletar um fundo no shard dono e retirá-lo do diretório"""
+    resposta = encaminhar_fundo(fundo_id)
+    if resposta.status_code == 200:
+        CLUSTER.remover_fundo(fundo_id)
+    return resposta
+
+
+@app.route('/fundos', methods=['POST'])
+def criar_fundo():
+    """Criar um fundo: o roteador escolhe o id (único entre os shards) e o shard dono"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return encaminhar(CLUSTER.qualquer())
+
+    reserva = CLUSTER.reservar_fundo(str(data['id']) if data.get('id') is not None else None)
+    if reserva is None:
+        return jsonify({"success": False, "error": f"Fundo '{data['id']}' já existe"}), 400
+    fundo_id, shard = reserva
+
+    try:
+        status, cabecalhos, corpo = CLUSTER.chamar(shard, "POST", "/fundos", corpo={**data, "id": fundo_id})
+    except ErroShard:
+        CLUSTER.remover_fundo(fundo_id)
+        raise
+    if status >= 300:
+        CLUSTER.remover_fundo(fundo_id)
+    elif REBALANCEAMENTO_AUTOMATICO:
+        CLUSTER.rebalancear_em_segundo_plano(float(REBALANCEAMENTO_AUTOMATICO))
+    return responder_bruto(status, cabecalhos, corpo)
+
+
+@app.route('/subscricoes', methods=['POST'])
+def criar_subscricao():
+    """Cadastrar uma subscrição no shard dono do fundo"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('fundo_id'):
+        return encaminhar(CLUSTER.qualquer())
+    return encaminhar_fundo(str(data['fundo_id']))
+
+
+@app.route('/ativos', methods=['POST'])
+def cadastrar_ativo():
+    """Cadastrar um ativo (multipart) no shard dono do fundo"""
+    # O corpo bruto fica em cache e é repassado inteiro; o formulário é lido só pelo fundo_id
+    request.get_data()
+    fundo_id = request.form.get('fundo_id')
+    if not fundo_id:
+        return encaminhar(CLUSTER.qualquer())
+    return encaminhar_fundo(fundo_id)
+
+
+# --- LISTAGENS (shard dono com fundo_id; todos os shards sem) ---
+
+# rota -> (campo com o total de itens, ordem dos itens, {total: campo somado (em centavos)})
+LISTAGENS = {
+    "/fundos": ("total", "fundo", {}),
+    "/compromissos": ("total_itens", "id", {"total_valor": "valor"}),
+    "/recebimentos": ("total_itens", "id", {"total_valor": "valor"}),
+    "/subscricoes": ("total_itens", "id", {"total_valor": "valor_parcela"}),
+    "/ativos": ("total_itens", "fundo_id", {}),
+    "/ativos/fluxos": ("total_itens", "fundo_id", {"total_valor": "valor"}),
+    "/ativos/juros": ("total_itens", "fundo_id", {"total_juros": "juros"}),
+    "/alertas": ("total_itens", "fundo_id", {})
+}
+
+
+@app.route('/fundos', methods=['GET'])
+@app.route('/compromissos', methods=['GET'])
+@app.route('/recebimentos', methods=['GET'])
+@app.route('/subscricoes', methods=['GET'])
+@app.route('/ativos', methods=['GET'])
+@app.route('/ativos/fluxos', methods=['GET'])
+@app.route('/ativos/juros', methods=['GET'])
+@app.route('/alertas', methods=['GET'])
+def listar():
+    """Listagens: concatenadas de todos os shards, com totais e paginação calculados aqui"""
+    fundo_id = request.args.get('fundo_id')
+    if fundo_id:
+        return encaminhar_fundo(fundo_id)
+
+    campo_total, ordem, somas = LISTAGENS[request.path]
+    consulta = {k: v for k, v in request.args.items() if k not in ('offset', 'limite')}
+    with CLUSTER.em_uso():
+        respostas = list(CLUSTER.todos("GET", request.path, consulta).values())
+
+    dados = list(chain.from_iterable(r["data"] for r in respostas))
+    if ordem == "id":
+        dados.sort(key=lambda item: item["id"])
+    else:
+        dados = ordenar_por_fundo(dados, "id" if ordem == "fundo" else ordem)
+    try:
+        pagina, paginacao = paginar(dados)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    resposta = {**respostas[0], "data": pagina, campo_total: len(dados)}
+    for total, campo in somas.items():
+        resposta[total] = somar_reais(item[campo] for item in dados)
+    resposta.update(paginacao)
+    return jsonify(resposta)
+
+
+@app.route('/subscricoes/chamadas', methods=['GET'])
+def get_chamadas_capital():
+    """Projeção das chamadas de capital: por fundo no shard dono ou somada entre os shards"""
+    fundo_id = request.args.get('fundo_id')
+    if fundo_id:
+        return encaminhar_fundo(fundo_id)
+
+    with CLUSTER.em_uso():
+        respostas = list(CLUSTER.todos("GET", request.path, request.args.to_dict()).values())
+
+    por_fundo, por_mes = {}, {}
+    for resposta in respostas:
+        por_fundo.update(resposta["data"]["por_fundo"])
+        for mes, valor in resposta["data"]["por_mes"].items():
+            por_mes[mes] = por_mes.get(mes, 0) + centavos(valor)
+    resumo = {
+        "por_fundo": {fundo_id: por_fundo[fundo_id] for fundo_id in ordenar_fundos(por_fundo)},
+        "por_mes": {mes: reais(por_mes[mes]) for mes in sorted(por_mes)},
+        "total": somar_reais(r["data"]["total"] for r in respostas),
+        "quantidade": sum(r["data"]["quantidade"] for r in respostas)
+    }
+    if any("itens" in r["data"] for r in respostas):
+        resumo["itens"] = ordenar_por_fundo(chain.from_iterable(r["data"]["itens"] for r in respostas))
+
+    return jsonify({
+        "success": True,
+        "data": resumo,
+        "periodo": respostas[0]["periodo"]
+    })
+
+
+# --- ROTAS CONSOLIDADAS (scatter-gather) ---
+
+def combinar_visoes(visoes):
+    """Frescor do resultado combinado: o da versão mais antiga entre os shards"""
+    proximas = [v["proxima_atualizacao"] for v in visoes if v.get("proxima_atualizacao")]
+    return {
+        "nome": visoes[0]["nome"],
+        "atualizado_em": min(v["atualizado_em"] for v in visoes),
+        "idade_segundos": max(v["idade_segundos"] for v in visoes),
+        "desatualizada": any(v["desatualizada"] for v in visoes),
+        "duracao_ms": max(v["duracao_ms"] for v in visoes),
+        "proxima_atualizacao": min(proximas, default=None),
+        "shards": len(visoes)
+    }
+
+
+def combinar_relatorios(partes):
+    """Resumo geral somado (em centavos) e relatório por fundo na ordem do diretório"""
+    resumos = [p["resumo_geral"] for p in partes]
+
+    def soma(campo):
+        return sum(centavos(r[campo]) for r in resumos)
+
+    liquidez, compromissos, recebimentos = soma("liquidez_total"), soma("compromissos_pendentes"), soma("recebimentos_pendentes")
+    fluxos_ativos = soma("fluxos_ativos_pendentes")
+    return {
+        "resumo_geral": {
+            "total_fundos": sum(r["total_fundos"] for r in resumos),
+            "patrimonio_total": reais(soma("patrimonio_total")),
+            "liquidez_total": reais(liquidez),
+            "compromissos_pendentes": reais(compromissos),
+            "recebimentos_pendentes": reais(recebimentos),
+            "subscricoes_pendentes": reais(soma("subscricoes_pendentes")),
+            "fluxos_ativos_pendentes": reais(fluxos_ativos),
+            "saldo_liquido_projetado": reais(liquidez + recebimentos - compromissos + fluxos_ativos)
+        },
+        "relatorio_por_fundo": sorted(
+            chain.from_iterable(p["relatorio_por_fundo"] for p in partes),
+            key=lambda r, posicoes=CLUSTER.posicoes(): posicoes.get(r["fundo"]["id"], len(posicoes))
+        )
+    }
+
+
+@app.route('/relatorios', methods=['GET'])
+def get_relatorios():
+    """Relatórios consolidados: as visões de todos os shards somadas"""
+    try:
+        formato = validar_formato(request.args.get('formato'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    consulta = {"ao_vivo": request.args['ao_vivo']} if 'ao_vivo' in request.args else None
+    with CLUSTER.em_uso():
+        respostas = list(CLUSTER.todos("GET", "/relatorios", consulta).values())
+    dados = combinar_relatorios([r["data"] for r in respostas])
+    visao = combinar_visoes([r["visao"] for r in respostas])
+
+    if formato:
+        try:
+            return responder_planilha(f"relatorio_consolidado_{datetime.now().strftime('%Y%m%d_%H%M%S')}", formato,
+                                      abas_consolidado(dados, visao["atualizado_em"]))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "visao": visao
+    })
+
+
+@app.route('/outliers', methods=['GET'])
+def get_outliers():
+    """Outliers em duas etapas: estatísticas de todos os shards e, com as médias globais, os outliers de cada um"""
+    inicio = time.perf_counter()
+    with CLUSTER.em_uso():
+        parciais = list(CLUSTER.todos("GET", "/outliers", {"parcial": "true"}).values())
+        estatisticas = {}
+        for livro in parciais[0]["data"]:
+            partes = [p["data"][livro] for p in parciais if p["data"][livro]["quantidade"]]
+            estatisticas[livro] = {
+                "soma": sum(e["soma"] for e in partes),
+                "quantidade": sum(e["quantidade"] for e in partes),
+                "minimo": min((e["minimo"] for e in partes), default=None),
+                "maximo": max((e["maximo"] for e in partes), default=None)
+            }
+        # Médias em centavos, com repr: o shard lê exatamente o mesmo float
+        medias = {f"media_{livro}": repr(e["soma"] / e["quantidade"])
+                  for livro, e in estatisticas.items() if e["quantidade"]}
+        respostas = list(CLUSTER.todos("GET", "/outliers", medias).values())
+
+    dados = {}
+    for livro, e in estatisticas.items():
+        quantidade = e["quantidade"]
+        dados[livro] = {
+            "media": reais(e["soma"]) / quantidade if quantidade else 0,
+            "maximo": reais(e["maximo"]) if quantidade else 0,
+            "minimo": reais(e["minimo"]) if quantidade else 0,
+            "outliers": sorted(chain.from_iterable(r["data"][livro]["outliers"] for r in respostas),
+                               key=lambda o: o["item"]["id"])
+        }
+
+    # Calculado na hora a partir dos shards (as médias globais mudam a cada alteração)
+    agora = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "visao": {
+            "nome": "outliers",
+            "atualizado_em": agora,
+            "idade_segundos": 0,
+            "desatualizada": False,
+            "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            "proxima_atualizacao": None,
+            "shards": len(respostas)
+        }
+    })
+
+
+def combinar_relatorio_personalizado(fundo_ids, partes):
+    """Relatório personalizado a partir dos relatórios parciais de cada shard"""
+    relatorio = {**partes[0], "fundos_analisados": len(fundo_ids), "dados": {}}
+    dados = relatorio["dados"]
+    parciais = [p["dados"] for p in partes]
+
+    if "fundos" in parciais[0]:
+        fundos = ordenar_por_fundo(chain.from_iterable(p["fundos"] for p in parciais), "id")
+        dados["fundos"] = fundos
+        total_patrimonio = sum(centavos(f["patrimonio"]) for f in fundos)
+        total_liquidez = sum(centavos(f["liquidez"]) for f in fundos)
+        dados["estatisticas_fundos"] = {
+            "total_patrimonio": reais(total_patrimonio),
+            "total_liquidez": reais(total_liquidez),
+            "patrimonio_medio": reais(total_patrimonio) / len(fundos) if fundos else 0,
+            "liquidez_media": reais(total_liquidez) / len(fundos) if fundos else 0
+        }
+
+    for nome in LIVROS:
+        if nome in parciais[0]:
+            dados[nome] = sorted(chain.from_iterable(p[nome] for p in parciais), key=lambda linha: linha["id"])
+            dados[f"total_{nome}"] = somar_reais(p[f"total_{nome}"] for p in parciais)
+    if "estatisticas_por_fundo" in parciais[0]:
+        estatisticas = {}
+        for p in parciais:
+            estatisticas.update(p["estatisticas_por_fundo"])
+        dados["estatisticas_por_fundo"] = {fundo_id: estatisticas[fundo_id] for fundo_id in fundo_ids}
+
+    if "fluxos_ativos" in parciais[0]:
+        por_fundo = {}
+        for fluxo in chain.from_iterable(p["fluxos_ativos"] for p in parciais):
+            por_fundo.setdefault(fluxo["fundo_id"], []).append(fluxo)
+        fluxos = [f for fundo_id in fundo_ids for f in por_fundo.get(fundo_id, [])]
+        dados["fluxos_ativos"] = fluxos
+        dados["total_fluxos_ativos"] = somar_reais(f["valor"] for f in fluxos)
+    return relatorio
+
+
+@app.route('/relatorios/gerar', methods=['POST'])
+def gerar_relatorio_personalizado():
+    """Relatório personalizado: no shard dono quando os fundos estão em um só, senão combinado aqui"""
+    data = request.get_json(silent=True)
+    fundo_ids = data.get('fundos', CLUSTER.fundos()) if isinstance(data, dict) else None
+    if not isinstance(fundo_ids, list):
+        return encaminhar(CLUSTER.qualquer())
+    try:
+        formato = validar_formato(request.args.get('formato') or data.get('formato'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    partes = CLUSTER.particionar(fundo_ids)
+    if len(partes) <= 1:
+        return encaminhar(next(iter(partes), 0), _gerar_json({**data, "fundos": fundo_ids}), "application/json")
+
+    # A planilha é montada aqui, com o relatório já combinado
+    corpo = {chave: valor for chave, valor in data.items() if chave != 'formato'}
+    with CLUSTER.em_uso():
+        respostas = CLUSTER.espalhar({
+            shard: ("POST", "/relatorios/gerar", None, {**corpo, "fundos": ids}) for shard, ids in partes.items()
+        })
+    relatorio = combinar_relatorio_personalizado(fundo_ids, [r["data"] for r in respostas.values()])
+
+    if formato:
+        try:
+            nome = f"relatorio_{relatorio['tipo']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            return responder_planilha(nome, formato, abas_relatorio(relatorio))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+    return jsonify({
+        "success": True,
+        "data": relatorio
+    })
+
+
+@app.route('/provisoes/taxa-admin', methods=['POST'])
+def provisionar_taxa_admin():
+    """Provisão de taxa de administração em cada shard (nos fundos pedidos ou em todos)"""
+    data = request.get_json(silent=True) or {}
+    fundo_ids = data.get('fundos')
+    if fundo_ids is None:
+        chamadas = {shard: ("POST", request.path, None, data) for shard in range(len(CLUSTER.urls))}
+    elif isinstance(fundo_ids, list):
+        chamadas = {shard: ("POST", request.path, None, {**data, "fundos": ids})
+                    for shard, ids in CLUSTER.particionar(fundo_ids).items()}
+    else:
+        return encaminhar(CLUSTER.qualquer())
+    if not chamadas:
+        return encaminhar(CLUSTER.qualquer())
+
+    with CLUSTER.em_uso():
+        respostas = list(CLUSTER.espalhar(chamadas).values())
+    gerados = ordenar_por_fundo(chain.from_iterable(r["data"] for r in respostas))
+    return jsonify({
+        "success": True,
+        "message": f"{len(gerados)} compromissos de taxa de administração provisionados",
+        "data": gerados,
+        "dias_uteis": respostas[0]["dias_uteis"],
+        "total_valor": somar_reais(c["valor"] for c in gerados),
+        "tempo_ms": max(r["tempo_ms"] for r in respostas)
+    })
+
+
+@app.route('/stress', methods=['POST'])
+def stress_liquidez():
+    """Teste de estresse: só quando todos os fundos pedidos estão no mesmo shard"""
+    data = request.get_json(silent=True)
+    fundo_ids = data.get('fundos', CLUSTER.fundos()) if isinstance(data, dict) else None
+    partes = CLUSTER.particionar(fundo_ids) if isinstance(fundo_ids, list) else {}
+    if len(partes) > 1:
+        return jsonify({
+            "success": False,
+            "error": "Teste de estresse com fundos de vários shards não é suportado pelo roteador: "
+                     "informe em 'fundos' fundos de um mesmo shard (veja /shards)"
+        }), 501
+    return encaminhar(next(iter(partes), CLUSTER.qualquer()))
+
+
+# --- ROTAS SEM ESTADO DE FUNDOS (qualquer shard) ---
+
+@app.route('/calendario/dias-uteis', methods=['GET'])
+@app.route('/relatorios/templates', methods=['GET'])
+@app.route('/')
+@app.route('/assets/<nome>')
+def rota_qualquer_shard(nome=None):
+    """Rotas que não dependem dos fundos: atendidas por qualquer shard"""
+    return encaminhar(CLUSTER.qualquer())
+
+
+@app.route('/eventos', methods=['GET'])
+@app.route('/batch', methods=['POST'])
+@app.route('/busca', methods=['GET'])
+@app.route('/documentos', methods=['POST'])
+@app.route('/metrics', methods=['GET'])
+def rota_nao_suportada():
+    """Rotas sem combinação entre shards (streams, lotes, índice de busca, métricas por processo)"""
+    return jsonify({
+        "success": False,
+        "error": f"Rota '{request.path}' não é suportada pelo roteador de shards: use cada shard diretamente"
+    }), 501
+
+
+# --- SHARDS ---
+
+@app.route('/visoes', methods=['GET'])
+def get_visoes():
+    """Situação das visões materializadas de cada shard"""
+    respostas = CLUSTER.todos("GET", "/visoes")
+    dados = {str(shard): resposta["data"] for shard, resposta in respostas.items()}
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "total_itens": len(dados)
+    })
+
+
+@app.route('/shards', methods=['GET'])
+def get_shards():
+    """Shards, fundos de cada um (diretório) e carga (linhas dos livros)"""
+    cargas = CLUSTER.cargas()
+    with CLUSTER._lock:
+        diretorio = dict(CLUSTER.diretorio)
+    dados = [
+        {
+            "indice": shard,
+            "url": url,
+            "fundos": sum(1 for dono in diretorio.values() if dono == shard),
+            "carga": sum(peso for dono, peso in cargas.values() if dono == shard)
+        }
+        for shard, url in enumerate(CLUSTER.urls)
+    ]
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "total_itens": len(dados),
+        "migracoes": CLUSTER.movimentos
+    })
+
+
+@app.route('/shards/rebalancear', methods=['POST'])
+def rebalancear_shards():
+    """Move fundos dos shards mais carregados para os menos carregados ({"executar": false} só planeja)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        tolerancia = float(data.get('tolerancia', 0.1))
+        maximo = data.get('maximo_movimentos')
+        if tolerancia < 0 or (maximo is not None and int(maximo) < 0):
+            return jsonify({"success": False, "error": "'tolerancia' e 'maximo_movimentos' devem ser >= 0"}), 400
+        resultado = CLUSTER.rebalancear(tolerancia, bool(data.get('executar', True)),
+                                        int(maximo) if maximo is not None else None)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    return jsonify({
+        "success": True,
+        "data": resultado,
+        "total_itens": len(resultado["movimentos"])
+    })
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Verificação de saúde do roteador"""
+    return jsonify({
+        "status": "healthy",
+        "papel": "roteador",
+        "shards": CLUSTER.urls,
+        "fundos": len(CLUSTER.diretorio) if CLUSTER.diretorio is not None else None,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+# =========================================================
+# INICIALIZAÇÃO
+# =========================================================
+
+def aguardar_shards(urls, processos=(), tempo_limite=120):
+    """Espera o /health de cada shard responder"""
+    limite = time.monotonic() + tempo_limite
+    for url in urls:
+        while True:
+            try:
+                urllib.request.urlopen(url + "/health", timeout=2).close()
+                break
+            except OSError:
+                pass
+            if any(processo.poll() is not None for processo in processos):
+                raise RuntimeError("Um shard terminou durante a inicialização")
+            if time.monotonic() > limite:
+                raise RuntimeError(f"Shard {url} não respondeu em {tempo_limite}s")
+            time.sleep(0.2)
+
+
+def subir_shards(total, porta, aplicacao="tomate_fund_vscode:app", host="127.0.0.1"):
+    """Sobe 'total' processos da API como shards nas portas seguintes à do roteador; retorna as URLs"""
+    processos, urls = [], []
+    for indice in range(total):
+        porta_shard = porta + 1 + indice
+        processos.append(subprocess.Popen(
+            [sys.executable, "-m", "flask", "--app", aplicacao, "run", "--host", host, "--port", str(porta_shard)],
+            cwd=RAIZ, env={**os.environ, "TOMATE_SHARD": f"{indice}/{total}"}
+        ))
+        urls.append(f"http://{host}:{porta_shard}")
+    atexit.register(lambda: [processo.terminate() for processo in processos])
+    aguardar_shards(urls, processos)
+    return urls
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Roteador dos shards da API Tomate Fund")
+    parser.add_argument("--shards", type=int, help="sobe N shards locais nas portas seguintes à do roteador")
+    parser.add_argument("--urls", help="URLs dos shards já em execução, separadas por vírgula, na ordem dos índices")
+    parser.add_argument("--app", default="tomate_fund_vscode:app", help="aplicação dos shards locais (módulo:objeto)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--porta", type=int, default=int(os.environ.get("PORT", 5000)))
+    args = parser.parse_args()
+
+    if args.shards:
+        CLUSTER.configurar(subir_shards(args.shards, args.porta, args.app))
+    elif args.urls:
+        CLUSTER.configurar(args.urls.split(","))
+    app.run(host=args.host, port=args.porta, threaded=True)
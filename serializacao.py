@@ -0,0 +1,105 @@
+# SISTEMA TOMATE FUND - SERIALIZAÇÃO JSON E COMPRESSÃO DAS RESPOSTAS
+# Provider JSON do Flask que usa orjson quando instalado (com fallback para a
+# biblioteca padrão) e compressão gzip das respostas acima de um tamanho mínimo
+import gzip
+import os
+import zlib
+
+from flask.json.provider import DefaultJSONProvider
+
+from estaticos import codificacoes_aceitas
+from rastreamento import span
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, json da biblioteca padrão
+    orjson = None
+
+# Respostas menores que isso não compensam a compressão
+TAMANHO_MINIMO_GZIP = int(os.environ.get("TOMATE_GZIP_MINIMO", 1400))
+# Acima disso a resposta é comprimida e enviada em blocos (chunked)
+TAMANHO_MINIMO_STREAM = int(os.environ.get("TOMATE_GZIP_STREAM", 1024 * 1024))
+TAMANHO_BLOCO = 64 * 1024
+NIVEL_GZIP = 6
+
+TIPOS_COMPRIMIVEIS = ("application/json", "text/", "application/javascript")
+
+
+class JSONProviderRapido(DefaultJSONProvider):
+    """Serializa com orjson quando disponível, mantendo o comportamento do provider padrão"""
+
+    @staticmethod
+    def default(o):
+        # Registros compactos (registros.py): dict direto, sem dataclasses.asdict
+        para_dict = getattr(o, "para_dict", None)
+        if para_dict is not None:
+            return para_dict()
+        return DefaultJSONProvider.default(o)
+
+    def _opcoes_orjson(self, indentar=False):
+        # Dataclasses passam pelo default: os registros compactos têm para_dict(), mais
+        # rápido que a serialização genérica de dataclasses com slots do orjson
+        opcoes = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opcoes |= orjson.OPT_INDENT_2
+        return opcoes
+
+    def _bytes(self, obj, indentar=False):
+        return orjson.dumps(obj, default=self.default, option=self._opcoes_orjson(indentar))
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        return self._bytes(obj, bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        with span("serializacao.json", biblioteca="orjson" if orjson else "json"):
+            if orjson is None:
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            indentar = (self.compact is None and self._app.debug) or self.compact is False
+            return self._app.response_class(self._bytes(obj, indentar) + b"\n", mimetype=self.mimetype)
+
+
+def _blocos_gzip(dados):
+    """Comprime em blocos, liberando cada parte assim que fica pronta"""
+    compressor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    visao = memoryview(dados)
+    for inicio in range(0, len(visao), TAMANHO_BLOCO):
+        bloco = compressor.compress(visao[inicio:inicio + TAMANHO_BLOCO])
+        if bloco:
+            yield bloco
+    yield compressor.flush()
+
+
+def comprimir_resposta(resposta, requisicao):
+    """Aplica gzip à resposta quando o cliente aceita e o corpo é grande o bastante"""
+    if (resposta.direct_passthrough or resposta.is_streamed
+            or resposta.status_code < 200 or resposta.status_code in (204, 304)
+            or "Content-Encoding" in resposta.headers
+            or requisicao.method == "HEAD"
+            or not (resposta.mimetype or "").startswith(TIPOS_COMPRIMIVEIS)):
+        return resposta
+
+    resposta.vary.add("Accept-Encoding")
+    if "gzip" not in codificacoes_aceitas(requisicao.headers.get("Accept-Encoding")):
+        return resposta
+
+    dados = resposta.get_data()
+    if len(dados) < TAMANHO_MINIMO_GZIP:
+        return resposta
+
+    resposta.headers["Content-Encoding"] = "gzip"
+    if len(dados) >= TAMANHO_MINIMO_STREAM:
+        resposta.response = _blocos_gzip(dados)
+        resposta.headers.pop("Content-Length", None)
+    else:
+        resposta.set_data(gzip.compress(dados, compresslevel=NIVEL_GZIP))
+    return resposta
@@ -0,0 +1,125 @@
+# SISTEMA TOMATE FUND - TAXAS E ACCRUAL
+# Compilador de expressões de taxa ("CDI + 2,5% a.a.", "110% do CDI", "IPCA + 6%")
+# e cálculo vetorizado de juros sobre uma curva projetada de índices (base 252)
+import re
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+from busca import normalizar_texto
+from calendario import calendario_padrao
+
+DIAS_UTEIS_ANO = 252
+
+# Ordem fixa dos indexadores nas matrizes da curva (linha 0 = prefixado)
+INDEXADORES = ("CDI", "SELIC", "IPCA", "IGPM")
+
+TaxaCompilada = namedtuple("TaxaCompilada", ["expressao", "indexador", "percentual", "spread"])
+
+_NUMERO = r"(\d+(?:[.,]\d+)?)"
+_INDEXADOR = r"(" + "|".join(i.lower() for i in INDEXADORES) + r")"
+_SUFIXO = r"\s*%?\s*(?:a\.?a\.?|ao ano)?\s*$"
+
+_RE_PERCENTUAL = re.compile(r"^" + _NUMERO + r"\s*%\s*(?:do|da|de)?\s*" + _INDEXADOR + r"$")
+_RE_INDEXADOR_SPREAD = re.compile(r"^" + _INDEXADOR + r"\s*(?:([+-])\s*" + _NUMERO + _SUFIXO + r")?$")
+_RE_PREFIXADO = re.compile(r"^(?:pre(?:fixad[oa])?\s*)?" + _NUMERO + _SUFIXO)
+
+
+def _numero(texto):
+    return float(texto.replace(",", "."))
+
+
+@lru_cache(maxsize=4096)
+def compilar_taxa(expressao):
+    """Converte uma expressão de taxa em seus componentes (compilada uma única vez)"""
+    texto = normalizar_texto(expressao).strip()
+
+    m = _RE_PERCENTUAL.match(texto)
+    if m:
+        return TaxaCompilada(expressao, m.group(2).upper(), _numero(m.group(1)) / 100, 0.0)
+
+    m = _RE_INDEXADOR_SPREAD.match(texto)
+    if m:
+        spread = _numero(m.group(3)) / 100 if m.group(3) else 0.0
+        if m.group(2) == "-":
+            spread = -spread
+        return TaxaCompilada(expressao, m.group(1).upper(), 1.0, spread)
+
+    m = _RE_PREFIXADO.match(texto)
+    if m:
+        return TaxaCompilada(expressao, None, 0.0, _numero(m.group(1)) / 100)
+
+    raise ValueError(f"Expressão de taxa não reconhecida: '{expressao}'")
+
+
+def expressao_ativo(ativo):
+    """Monta a expressão de taxa de um ativo a partir de taxa_fixa e taxa_variavel"""
+    fixa = ativo.get("taxa_fixa")
+    variavel = ativo.get("taxa_variavel")
+    if variavel and fixa not in (None, ""):
+        return f"{variavel} + {fixa}% a.a."
+    if variavel:
+        return f"100% do {variavel}"
+    if fixa not in (None, ""):
+        return f"{fixa}% a.a."
+    return None
+
+
+def contar_dias_uteis(inicio, fim):
+    """Dias úteis em [inicio, fim) para arrays de datas"""
+    return calendario_padrao().dias_uteis_entre(inicio, fim)
+
+
+class CurvaIndices:
+    """Curva projetada de índices: taxas anuais por segmento de datas"""
+
+    def __init__(self, datas, taxas_por_indexador):
+        # datas: fronteiras dos segmentos (K+1 datas); taxas: K taxas anuais por indexador
+        self.datas = np.asarray(datas, dtype="datetime64[D]")
+        segmentos = len(self.datas) - 1
+        self.matriz = np.zeros((len(INDEXADORES) + 1, segmentos))
+        for indexador, taxas in taxas_por_indexador.items():
+            linha = INDEXADORES.index(indexador.upper()) + 1
+            self.matriz[linha] = np.broadcast_to(np.asarray(taxas, dtype=float), segmentos)
+
+    @classmethod
+    def plana(cls, taxas_anuais, inicio=None, meses=120):
+        """Curva com taxas constantes em segmentos mensais"""
+        inicio = np.datetime64(inicio or date.today(), "M")
+        datas = np.arange(inicio, inicio + meses + 1, dtype="datetime64[M]").astype("datetime64[D]")
+        return cls(datas, taxas_anuais)
+
+
+def _codigos(taxas):
+    return np.array([0 if t.indexador is None else INDEXADORES.index(t.indexador) + 1 for t in taxas])
+
+
+def fatores_acumulados(taxas, datas_inicio, datas_fim, curva):
+    """Fator de correção de cada ativo entre suas datas, em uma única passada vetorizada"""
+    inicio = np.asarray(datas_inicio, dtype="datetime64[D]")[:, None]
+    fim = np.asarray(datas_fim, dtype="datetime64[D]")[:, None]
+    percentual = np.array([t.percentual for t in taxas])[:, None]
+    spread = np.array([t.spread for t in taxas])[:, None]
+
+    # Dias úteis de cada ativo dentro de cada segmento da curva (ativos x segmentos)
+    de = np.maximum(inicio, curva.datas[None, :-1])
+    ate = np.minimum(fim, curva.datas[None, 1:])
+    dias_uteis = np.where(ate > de, contar_dias_uteis(de, np.maximum(ate, de)), 0)
+
+    # Taxa diária do índice em cada segmento, aplicada ao percentual e ao spread do ativo
+    indice_anual = curva.matriz[_codigos(taxas)]
+    diaria_indice = np.power(1 + indice_anual, 1 / DIAS_UTEIS_ANO) - 1
+    log_diario = np.log1p(percentual * diaria_indice) + np.log1p(spread) / DIAS_UTEIS_ANO
+
+    return np.exp((dias_uteis * log_diario).sum(axis=1))
+
+
+def projetar_juros(expressoes, principais, datas_inicio, datas_fim, curva):
+    """Juros projetados (valor final - principal) para cada ativo"""
+    taxas = [compilar_taxa(e) for e in expressoes]
+    if not taxas:
+        return np.zeros(0)
+    fatores = fatores_acumulados(taxas, datas_inicio, datas_fim, curva)
+    return np.asarray(principais, dtype=float) * (fatores - 1)
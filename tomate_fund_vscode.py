@@ -1,18 +1,88 @@
 # SISTEMA TOMATE FUND - API COMPLETA EM PYTHON (FLASK)
 # Versão 3.0 - Com CRUD de Fundos e Relatórios Personalizados
-from flask import Flask, jsonify, request, Blueprint, send_from_directory
+from flask import Flask, jsonify, request, Blueprint, send_from_directory, Response
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import os
 import json
+import math
 import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from urllib.parse import parse_qs, urlsplit
+
+from werkzeug.test import EnvironBuilder
+
+from busca import IndiceInvertido, extrair_texto_documento
+from ativos import RegistroAtivos
+from agregacao import AgregadorRelatorios
+from livros import IndiceLivros, TotaisFundos
+from alertas import MotorAlertas
+from historico import HistoricoFundos, ler_instante
+from eventos import DifusorEventos
+from estaticos import Frontend
+from serializacao import JSONProviderRapido, comprimir_resposta
+from perfil import MiddlewarePerfil, perfil_habilitado
+from planilhas import FORMATOS as FORMATOS_PLANILHA, abas_consolidado, abas_relatorio, renderizar, validar_formato
+from rastreamento import abrir_span, fechar_span, span
+from metricas import CHAVE_ROTA, ROTA_DESCONHECIDA, TIPO_CONTEUDO as TIPO_METRICAS, MiddlewareMetricas, RegistroMetricas
+from calendario import calendario_padrao
+from cronograma import agregar_chamadas, parcelas, projetar_chamadas
+from estresse import CAMINHOS_PADRAO, HORIZONTES_PADRAO, simular
+from provisao import provisionar_meses, vencimentos_competencias
+from taxas import CurvaIndices, compilar_taxa, expressao_ativo, projetar_juros
+from particionamento import MapaShards, ler_shard, proximo_id as proximo_id_livro
+from visoes import AgendadorVisoes
+from registros import Compromisso, CompromissoProvisionado, Fundo, Recebimento, Subscricao, SubscricaoCronograma, centavos, reais
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'tomate_fund_secret_key_2024'
 
+# Serialização JSON rápida (orjson, se instalado) e compressão gzip das respostas
+app.json = JSONProviderRapido(app)
+
+@app.after_request
+def aplicar_compressao(response):
+    return comprimir_resposta(response, request)
+
 # Habilitar CORS para todas as rotas
 CORS(app)
 
+# Profiling sob demanda (cabeçalho X-Tomate-Perfil ou amostragem); instalado só se configurado
+if perfil_habilitado():
+    app.wsgi_app = MiddlewarePerfil(app.wsgi_app)
+
+# Métricas por rota (latência, bytes e status) expostas em /metrics; com vários
+# workers, TOMATE_METRICAS_DIR aponta o diretório compartilhado entre os processos
+METRICAS = RegistroMetricas(os.environ.get("TOMATE_METRICAS_DIR"))
+app.wsgi_app = MiddlewareMetricas(app.wsgi_app, METRICAS)
+
+@app.before_request
+def identificar_rota():
+    request.environ[CHAVE_ROTA] = request.url_rule.rule if request.url_rule else ROTA_DESCONHECIDA
+
+# Span raiz de cada requisição; as etapas internas abrem spans filhos com span(...).
+# Guardado no environ (e não em g) porque as sub-requisições do /batch compartilham o g
+@app.before_request
+def iniciar_span_requisicao():
+    rota = request.environ[CHAVE_ROTA]
+    request.environ['tomate.span'] = abrir_span(f"{request.method} {rota}", {
+        "http.method": request.method,
+        "http.route": rota,
+        "http.target": request.full_path.rstrip('?')
+    }, raiz=True)
+
+@app.after_request
+def registrar_status_span(response):
+    if request.environ.get('tomate.span') is not None:
+        request.environ['tomate.span'].definir(**{"http.status_code": response.status_code})
+    return response
+
+@app.teardown_request
+def finalizar_span_requisicao(exc):
+    fechar_span(request.environ.pop('tomate.span', None))
+
 # =========================================================
 # 1. LÓGICA DE NEGÓCIOS (SIMULANDO BANCO DE DADOS)
 # =========================================================
@@ -164,6 +234,316 @@ SUBSCRICOES_DATA = [
     }
 ]
 
+# Registros compactos (slots, campos categóricos internados) no lugar dos dicts
+FUNDOS_DATA = {fid: Fundo.de_dict(f) for fid, f in FUNDOS_DATA.items()}
+COMPROMISSOS_DATA = [Compromisso.de_dict(c) for c in COMPROMISSOS_DATA]
+RECEBIMENTOS_DATA = [Recebimento.de_dict(r) for r in RECEBIMENTOS_DATA]
+SUBSCRICOES_DATA = [Subscricao.de_dict(s) for s in SUBSCRICOES_DATA]
+
+# Maior id usado em cada livro, contado antes da divisão em shards: as sementes de um shard
+# não são vistas pelos outros, e novos ids precisam ficar acima de todas elas (e das linhas
+# criadas aqui que depois saírem no rebalanceamento)
+ULTIMO_ID_LIVRO = {
+    "compromissos": max([c.id for c in COMPROMISSOS_DATA], default=0),
+    "recebimentos": max([r.id for r in RECEBIMENTOS_DATA], default=0),
+    "subscricoes": max([s.id for s in SUBSCRICOES_DATA], default=0)
+}
+
+# Em um shard (TOMATE_SHARD=<índice>/<total>) o processo guarda só os fundos que lhe
+# pertencem, com seus livros; o roteador (roteador.py) encaminha cada fundo ao seu shard
+SHARD = ler_shard()
+if SHARD is not None:
+    _mapa_shards = MapaShards(SHARD[1])
+    FUNDOS_DATA = {fid: f for fid, f in FUNDOS_DATA.items() if _mapa_shards.dono(fid) == SHARD[0]}
+    COMPROMISSOS_DATA = [c for c in COMPROMISSOS_DATA if c.fundo_id in FUNDOS_DATA]
+    RECEBIMENTOS_DATA = [r for r in RECEBIMENTOS_DATA if r.fundo_id in FUNDOS_DATA]
+    SUBSCRICOES_DATA = [s for s in SUBSCRICOES_DATA if s.fundo_id in FUNDOS_DATA]
+
+# Linhas dos livros de cada fundo (alertas, dashboard, consultas por fundo), sem varrer os livros
+INDICE_LIVROS = IndiceLivros(lambda: {
+    "compromissos": COMPROMISSOS_DATA,
+    "recebimentos": RECEBIMENTOS_DATA,
+    "subscricoes": SUBSCRICOES_DATA
+})
+
+# Documentos processados pelo upload
+DOCUMENTOS_DATA = {}
+
+# Ativos cadastrados e fluxos esperados de cada vencimento
+REGISTRO_ATIVOS = RegistroAtivos()
+
+# Curva projetada dos indexadores (% a.a.) usada na projeção de juros dos ativos
+CURVA_INDICES = CurvaIndices.plana({"CDI": 0.1065, "SELIC": 0.1065, "IPCA": 0.045, "IGPM": 0.04})
+
+def projetar_juros_fluxos(fluxos):
+    """Juros projetados de cada fluxo de ativo, calculados em uma única passada"""
+    selecionados, expressoes = [], []
+    for fluxo in fluxos:
+        ativo = REGISTRO_ATIVOS.ativos.get(fluxo["ativo_id"])
+        expressao = expressao_ativo(ativo) if ativo else None
+        if not expressao:
+            continue
+        try:
+            compilar_taxa(expressao)
+        except ValueError:
+            continue
+        selecionados.append((fluxo, ativo))
+        expressoes.append(expressao)
+    
+    juros = projetar_juros(
+        expressoes,
+        [f["valor"] for f, _ in selecionados],
+        [a["data_cadastro"][:10] for _, a in selecionados],
+        [f["vencimento"] for f, _ in selecionados],
+        CURVA_INDICES
+    )
+    return [
+        {"fluxo_id": f["id"], "ativo_id": a["id"], "vencimento": f["vencimento"], "taxa": e, "juros": reais(centavos(j))}
+        for (f, a), e, j in zip(selecionados, expressoes, juros)
+    ]
+
+# Compromissos de taxa de administração gerados pela provisão: (fundo_id, competência) -> compromisso
+PROVISOES_TAXA_ADMIN = {}
+
+def gerar_compromissos_taxa_admin(mes_inicio, mes_fim, fundo_ids=None):
+    """Provisiona a taxa de administração dos fundos e gera (ou atualiza) os compromissos mensais"""
+    fundos = [FUNDOS_DATA[fid] for fid in (fundo_ids or FUNDOS_DATA.keys()) if fid in FUNDOS_DATA]
+    meses, dias_uteis, mensal = provisionar_meses(
+        [f["patrimonio"] for f in fundos],
+        [f["taxa_admin"] for f in fundos],
+        mes_inicio, mes_fim
+    )
+    vencimentos = [str(v) for v in vencimentos_competencias(meses)]
+    competencias = [str(m) for m in meses]
+    proximo_id = proximo_id_livro([c.id for c in COMPROMISSOS_DATA], SHARD, ULTIMO_ID_LIVRO["compromissos"])
+    
+    gerados = []
+    for i, fundo in enumerate(fundos):
+        for j, competencia in enumerate(competencias):
+            chave = (fundo["id"], competencia)
+            compromisso = PROVISOES_TAXA_ADMIN.get(chave)
+            if compromisso is None:
+                compromisso = CompromissoProvisionado(
+                    id=proximo_id,
+                    fundo_id=fundo["id"],
+                    tipo="Taxa Administração",
+                    status="PENDENTE",
+                    competencia=competencia
+                )
+                ULTIMO_ID_LIVRO["compromissos"] = proximo_id
+                proximo_id += SHARD[1] if SHARD else 1
+                PROVISOES_TAXA_ADMIN[chave] = compromisso
+                COMPROMISSOS_DATA.append(compromisso)
+            compromisso.valor_centavos = centavos(mensal[i, j])
+            compromisso["vencimento"] = vencimentos[j]
+            compromisso["descricao"] = f"Taxa de administração {competencia[5:]}/{competencia[:4]} ({fundo['taxa_admin']}% a.a.)"
+            gerados.append(compromisso)
+    if fundos:
+        notificar_mudancas_lote("compromisso", "atualizado", [f["id"] for f in fundos], ["valor", "vencimento"])
+    return gerados, len(dias_uteis)
+
+# Índice de busca textual sobre ativos e documentos
+INDICE_BUSCA = IndiceInvertido()
+
+def indexar_ativo(ativo, texto_documento=""):
+    """Atualiza o índice de busca com os dados de um ativo"""
+    texto = " ".join(filter(None, [
+        ativo.get("tipo_ativo"), ativo.get("detalhes"), ativo.get("info_gerais"),
+        ativo.get("arquivo_nome"), texto_documento
+    ]))
+    INDICE_BUSCA.indexar(f"ativo:{ativo['id']}", texto, {
+        "origem": "ativo",
+        "titulo": ativo.get("tipo_ativo") or "Ativo",
+        "referencia": ativo["id"]
+    })
+
+def indexar_documento(documento, texto_documento=""):
+    """Atualiza o índice de busca com os dados de um documento"""
+    texto = " ".join(filter(None, [
+        documento.get("tipo"), documento.get("emissor"), documento.get("taxa"),
+        documento.get("garantias"), documento.get("descricao"), texto_documento
+    ]))
+    INDICE_BUSCA.indexar(f"documento:{documento['id']}", texto, {
+        "origem": "documento",
+        "titulo": f"{documento.get('tipo')} - {documento.get('emissor')}",
+        "referencia": documento["id"]
+    })
+
+def contexto_alertas(fundo_id):
+    """Dados de um fundo usados pelas regras de alerta"""
+    fundo = FUNDOS_DATA.get(fundo_id)
+    if fundo is None:
+        return None
+    hoje = datetime.now().date()
+    fim = (hoje + timedelta(days=365)).isoformat()
+    
+    def data(vencimento):
+        return datetime.fromisoformat(vencimento).date()
+    
+    entradas = [(data(r.vencimento), reais(r.valor_centavos)) for r in INDICE_LIVROS.linhas("recebimentos", fundo_id)
+                if r.status == "PENDENTE"]
+    entradas += [(data(f["vencimento"]), f["valor"]) for f in REGISTRO_ATIVOS.fluxos_fundo(fundo_id, None, fim)]
+    entradas += [(data(c["vencimento"]), c["valor"])
+                 for c in projetar_chamadas(INDICE_LIVROS.linhas("subscricoes", fundo_id), None, fim)]
+    saidas = [(data(c.vencimento), reais(c.valor_centavos)) for c in INDICE_LIVROS.linhas("compromissos", fundo_id)
+              if c.status == "PENDENTE"]
+    return {"fundo": fundo, "hoje": hoje, "entradas": entradas, "saidas": saidas}
+
+# Alertas de liquidez, reavaliados apenas para o fundo afetado por cada alteração
+MOTOR_ALERTAS = MotorAlertas(contexto_alertas)
+# Série temporal de patrimônio e liquidez de cada fundo, com agregados diário/semanal/mensal
+HISTORICO_FUNDOS = HistoricoFundos()
+for _fundo_id, _fundo in FUNDOS_DATA.items():
+    MOTOR_ALERTAS.avaliar_fundo(_fundo_id)
+    HISTORICO_FUNDOS.registrar(_fundo_id, _fundo.patrimonio_centavos, _fundo.liquidez_centavos)
+
+def calcular_resumo_geral():
+    """Totais consolidados de todos os fundos (somas exatas em centavos)"""
+    return formatar_resumo(
+        len(FUNDOS_DATA),
+        sum([f.patrimonio_centavos for f in FUNDOS_DATA.values()]),
+        sum([f.liquidez_centavos for f in FUNDOS_DATA.values()]),
+        sum([c.valor_centavos for c in COMPROMISSOS_DATA]),
+        sum([r.valor_centavos for r in RECEBIMENTOS_DATA]),
+        sum([s.valor_parcela_centavos for s in SUBSCRICOES_DATA])
+    )
+
+def formatar_resumo(total_fundos, patrimonio, liquidez, compromissos, recebimentos, subscricoes):
+    """Resumo consolidado a partir das somas em centavos"""
+    total_fluxos_ativos = REGISTRO_ATIVOS.total_geral()
+    return {
+        "total_fundos": total_fundos,
+        "patrimonio_total": reais(patrimonio),
+        "liquidez_total": reais(liquidez),
+        "compromissos_pendentes": reais(compromissos),
+        "recebimentos_pendentes": reais(recebimentos),
+        "subscricoes_pendentes": reais(subscricoes),
+        "fluxos_ativos_pendentes": reais(total_fluxos_ativos),
+        "saldo_liquido_projetado": reais(liquidez + recebimentos - compromissos + total_fluxos_ativos)
+    }
+
+# Totais do evento de alteração mantidos por delta (sem varrer os livros a cada mudança)
+TOTAIS_FUNDOS = TotaisFundos(lambda: FUNDOS_DATA, INDICE_LIVROS, {
+    "compromissos": "valor_centavos",
+    "recebimentos": "valor_centavos",
+    "subscricoes": "valor_parcela_centavos"
+})
+
+# Tamanho dos dados em memória e caches acompanhados em /metrics
+METRICAS.registrar_medidor("tomate_registros", "Registros em memória por coleção", ("colecao",), lambda: {
+    ("fundos",): len(FUNDOS_DATA),
+    ("compromissos",): len(COMPROMISSOS_DATA),
+    ("recebimentos",): len(RECEBIMENTOS_DATA),
+    ("subscricoes",): len(SUBSCRICOES_DATA),
+    ("ativos",): len(REGISTRO_ATIVOS.ativos),
+    ("documentos",): len(DOCUMENTOS_DATA),
+    ("indice_busca",): len(INDICE_BUSCA),
+    ("historico_pontos",): len(HISTORICO_FUNDOS)
+})
+METRICAS.registrar_cache("compilar_taxa", lambda: compilar_taxa.cache_info()[:2])
+
+# Difusor de alterações para a interface web (/eventos)
+DIFUSOR_EVENTOS = DifusorEventos()
+
+# Agregação dos livros por fundo em um pool de processos (relatório personalizado)
+AGREGADOR_RELATORIOS = AgregadorRelatorios()
+
+# Visões materializadas (relatórios, dashboards, outliers), registradas junto das rotas
+VISOES = AgendadorVisoes()
+
+def livros_relatorio():
+    """Livros agregados no relatório: nome -> (linhas, atributo do valor em centavos)"""
+    return {
+        "compromissos": (COMPROMISSOS_DATA, "valor_centavos"),
+        "recebimentos": (RECEBIMENTOS_DATA, "valor_centavos"),
+        "subscricoes": (SUBSCRICOES_DATA, "valor_parcela_centavos")
+    }
+
+def notificar_mudanca(entidade, acao, registro_id, fundo_id, campos=None, registro=None, historico=True):
+    """Propaga uma alteração de dados para os componentes derivados
+
+    historico=False não registra o ponto atual do fundo (série já recebida na importação).
+    """
+    if entidade == "fundo":
+        if acao == "excluido":
+            HISTORICO_FUNDOS.remover(fundo_id)
+        elif historico:
+            HISTORICO_FUNDOS.registrar(fundo_id, registro.patrimonio_centavos, registro.liquidez_centavos)
+    propagar_mudanca(entidade, acao, [fundo_id], {
+        "entidade": entidade,
+        "acao": acao,
+        "id": registro_id,
+        "fundo_id": fundo_id,
+        "campos": campos or [],
+        "registro": registro
+    })
+
+def notificar_mudancas_lote(entidade, acao, fundo_ids, campos=None):
+    """Uma única propagação para alterações em vários fundos de uma vez (ex.: provisão da taxa)"""
+    propagar_mudanca(entidade, acao, fundo_ids, {
+        "entidade": entidade,
+        "acao": acao,
+        "id": None,
+        "fundo_id": None,
+        "fundo_ids": list(fundo_ids),
+        "campos": campos or [],
+        "registro": None
+    })
+
+def propagar_mudanca(entidade, acao, fundo_ids, evento):
+    """Alertas e visões dos fundos alterados, instantâneo dos relatórios e evento para a interface"""
+    if entidade in ("compromisso", "recebimento", "subscricao"):
+        AGREGADOR_RELATORIOS.invalidar()
+    for fundo_id in fundo_ids:
+        MOTOR_ALERTAS.avaliar_fundo(fundo_id)
+    # Visões afetadas: atualizadas em segundo plano logo depois (depois dos alertas, que o dashboard lê)
+    VISOES.marcar("relatorios")
+    # A exclusão de um fundo remove também os compromissos e recebimentos dele dos livros
+    if entidade in ("compromisso", "recebimento") or (entidade == "fundo" and acao == "excluido"):
+        VISOES.marcar("outliers")
+    for fundo_id in fundo_ids:
+        if entidade == "fundo" and acao == "excluido":
+            VISOES.descartar("dashboard", fundo_id)
+        else:
+            VISOES.marcar("dashboard", fundo_id)
+    DIFUSOR_EVENTOS.publicar("mudanca", {**evento, "totais": formatar_resumo(*TOTAIS_FUNDOS.atualizar(fundo_ids))})
+
+def formato_planilha(data=None):
+    """Formato pedido em ?formato= (ou no corpo): None para JSON, 'xlsx' ou 'csv'"""
+    return validar_formato(request.args.get('formato') or (data or {}).get('formato'))
+
+def responder_planilha(nome, formato, abas):
+    """Resposta em streaming: xlsx com todas as abas ou csv com uma delas (?aba=, padrão a primeira)
+
+    abas: [(nome, colunas, gerador de linhas)]; as linhas só são lidas durante o envio.
+    """
+    corpo, tipo, arquivo = renderizar(nome, formato, abas, request.args.get('aba'))
+    return Response(corpo, mimetype=tipo, headers={
+        "Content-Disposition": f'attachment; filename="{arquivo}"',
+        "Cache-Control": "no-cache"
+    })
+
+def pedido_ao_vivo():
+    """?ao_vivo=true: recalcula a visão na hora em vez de servir a última versão"""
+    return request.args.get('ao_vivo', 'false').lower() == 'true'
+
+# Paginação das listagens (?offset=&limite=); sem os parâmetros, retorna tudo
+LIMITE_MAXIMO_PAGINA = 1000
+
+def paginar(dados):
+    """Recorta a página pedida e retorna (página, metadados da paginação)"""
+    if 'offset' not in request.args and 'limite' not in request.args:
+        return dados, {}
+    try:
+        offset = int(request.args.get('offset', 0))
+        limite = int(request.args.get('limite', LIMITE_MAXIMO_PAGINA))
+    except ValueError:
+        raise ValueError("Parâmetros 'offset' e 'limite' devem ser inteiros")
+    if offset < 0 or limite < 1:
+        raise ValueError("'offset' deve ser >= 0 e 'limite' >= 1")
+    limite = min(limite, LIMITE_MAXIMO_PAGINA)
+    return dados[offset:offset + limite], {"offset": offset, "limite": limite}
+
 # =========================================================
 # 2. ROTAS DA API
 # =========================================================
@@ -173,10 +553,16 @@ SUBSCRICOES_DATA = [
 @app.route('/fundos', methods=['GET'])
 def get_fundos():
     """Listar todos os fundos"""
+    try:
+        pagina, paginacao = paginar(list(FUNDOS_DATA.values()))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
     return jsonify({
         "success": True,
-        "data": list(FUNDOS_DATA.values()),
-        "total": len(FUNDOS_DATA)
+        "data": pagina,
+        "total": len(FUNDOS_DATA),
+        **paginacao
     })
 
 @app.route('/fundos/<fundo_id>', methods=['GET'])
@@ -190,6 +576,31 @@ def get_fundo(fundo_id):
         "data": FUNDOS_DATA[fundo_id]
     })
 
+@app.route('/fundos/<fundo_id>/historico', methods=['GET'])
+def get_historico_fundo(fundo_id):
+    """Série de patrimônio e liquidez do fundo (?inicio=&fim=&resolucao=auto|bruto|diario|semanal|mensal)"""
+    if fundo_id not in FUNDOS_DATA:
+        return jsonify({"success": False, "error": "Fundo não encontrado"}), 404
+    
+    try:
+        inicio = request.args.get('inicio')
+        fim = request.args.get('fim')
+        resolucao, pontos = HISTORICO_FUNDOS.consultar(
+            fundo_id,
+            ler_instante(inicio) if inicio else None,
+            ler_instante(fim, fim=True) if fim else None,
+            request.args.get('resolucao', 'auto')
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return jsonify({
+        "success": True,
+        "data": pontos,
+        "resolucao": resolucao,
+        "total_itens": len(pontos)
+    })
+
 @app.route('/fundos', methods=['POST'])
 def criar_fundo():
     """Criar um novo fundo"""
@@ -202,13 +613,18 @@ def criar_fundo():
             if campo not in data:
                 return jsonify({"success": False, "error": f"Campo '{campo}' é obrigatório"}), 400
         
-        # Gerar ID único
-        novo_id = str(len(FUNDOS_DATA) + 1)
-        while novo_id in FUNDOS_DATA:
-            novo_id = str(int(novo_id) + 1)
+        # Gerar ID único (com shards, o roteador escolhe o id entre todos e o informa)
+        if data.get('id') is not None:
+            novo_id = str(data['id'])
+            if novo_id in FUNDOS_DATA:
+                return jsonify({"success": False, "error": f"Fundo '{novo_id}' já existe"}), 400
+        else:
+            novo_id = str(len(FUNDOS_DATA) + 1)
+            while novo_id in FUNDOS_DATA:
+                novo_id = str(int(novo_id) + 1)
         
         # Criar novo fundo
-        novo_fundo = {
+        novo_fundo = Fundo.de_dict({
             "id": novo_id,
             "nome": data['nome'],
             "cnpj": data['cnpj'],
@@ -220,10 +636,11 @@ def criar_fundo():
             "taxa_admin": float(data['taxa_admin']),
             "data_criacao": datetime.now().strftime("%Y-%m-%d"),
             "status": "ATIVO"
-        }
+        })
         
         # Adicionar ao "banco de dados"
         FUNDOS_DATA[novo_id] = novo_fundo
+        notificar_mudanca("fundo", "criado", novo_id, novo_id, list(novo_fundo.keys()), novo_fundo)
         
         return jsonify({
             "success": True,
@@ -254,6 +671,7 @@ def atualizar_fundo(fundo_id):
                     fundo[campo] = int(data[campo])
                 else:
                     fundo[campo] = data[campo]
+        notificar_mudanca("fundo", "atualizado", fundo_id, fundo_id, [c for c in campos_atualizaveis if c in data], fundo)
         
         return jsonify({
             "success": True,
@@ -275,9 +693,14 @@ def deletar_fundo(fundo_id):
         
         # Remover dados relacionados ao fundo (simulação)
         global COMPROMISSOS_DATA, RECEBIMENTOS_DATA, SUBSCRICOES_DATA
-        COMPROMISSOS_DATA = [c for c in COMPROMISSOS_DATA if c["fundo_id"] != fundo_id]
-        RECEBIMENTOS_DATA = [r for r in RECEBIMENTOS_DATA if r["fundo_id"] != fundo_id]
-        SUBSCRICOES_DATA = [s for s in SUBSCRICOES_DATA if s["fundo_id"] != fundo_id]
+        COMPROMISSOS_DATA = [c for c in COMPROMISSOS_DATA if c.fundo_id != fundo_id]
+        RECEBIMENTOS_DATA = [r for r in RECEBIMENTOS_DATA if r.fundo_id != fundo_id]
+        SUBSCRICOES_DATA = [s for s in SUBSCRICOES_DATA if s.fundo_id != fundo_id]
+        for chave in [k for k in PROVISOES_TAXA_ADMIN if k[0] == fundo_id]:
+            del PROVISOES_TAXA_ADMIN[chave]
+        for ativo_id in REGISTRO_ATIVOS.remover_fundo(fundo_id):
+            INDICE_BUSCA.remover(f"ativo:{ativo_id}")
+        notificar_mudanca("fundo", "excluido", fundo_id, fundo_id)
         
         return jsonify({
             "success": True,
@@ -294,8 +717,10 @@ def gerar_relatorio_personalizado():
     """Gerar relatório personalizado"""
     try:
         data = request.get_json()
+        formato = formato_planilha(data)
         tipo_relatorio = data.get('tipo', 'completo')
         fundo_ids = data.get('fundos', list(FUNDOS_DATA.keys()))
+        selecionados = set(fundo_ids)
         data_inicio = data.get('data_inicio')
         data_fim = data.get('data_fim')
         
@@ -312,40 +737,93 @@ def gerar_relatorio_personalizado():
         
         if tipo_relatorio in ['completo', 'fundos']:
             # Dados dos fundos
-            fundos_selecionados = {k: v for k, v in FUNDOS_DATA.items() if k in fundo_ids}
-            relatorio["dados"]["fundos"] = list(fundos_selecionados.values())
+            with span("fundos.filtro"):
+                fundos_selecionados = {k: v for k, v in FUNDOS_DATA.items() if k in selecionados}
+                relatorio["dados"]["fundos"] = list(fundos_selecionados.values())
             
             # Estatísticas dos fundos
-            total_patrimonio = sum([f["patrimonio"] for f in fundos_selecionados.values()])
-            total_liquidez = sum([f["liquidez"] for f in fundos_selecionados.values()])
+            with span("fundos.estatisticas"):
+                total_patrimonio = sum([f.patrimonio_centavos for f in fundos_selecionados.values()])
+                total_liquidez = sum([f.liquidez_centavos for f in fundos_selecionados.values()])
             
             relatorio["dados"]["estatisticas_fundos"] = {
-                "total_patrimonio": total_patrimonio,
-                "total_liquidez": total_liquidez,
-                "patrimonio_medio": total_patrimonio / len(fundos_selecionados) if fundos_selecionados else 0,
-                "liquidez_media": total_liquidez / len(fundos_selecionados) if fundos_selecionados else 0
+                "total_patrimonio": reais(total_patrimonio),
+                "total_liquidez": reais(total_liquidez),
+                "patrimonio_medio": reais(total_patrimonio) / len(fundos_selecionados) if fundos_selecionados else 0,
+                "liquidez_media": reais(total_liquidez) / len(fundos_selecionados) if fundos_selecionados else 0
             }
             
-        if tipo_relatorio in ['completo', 'compromissos']:
-            comp_selecionados = [c for c in COMPROMISSOS_DATA if c["fundo_id"] in fundo_ids]
-            relatorio["dados"]["compromissos"] = comp_selecionados
-            relatorio["dados"]["total_compromissos"] = sum([c["valor"] for c in comp_selecionados])
+        # Filtro, totais e estatísticas por fundo dos livros, em paralelo por fatias de fundos
+        livros = livros_relatorio()
+        secoes = [nome for nome in livros if tipo_relatorio in ['completo', nome]]
+        if secoes:
+            with span("livros.agregacao", livros=len(secoes), fundos=len(selecionados)):
+                agregados = AGREGADOR_RELATORIOS.agregar(livros, selecionados, secoes, data.get('workers'))
+            for nome, agregado in agregados.items():
+                relatorio["dados"][nome] = agregado["linhas"]
+                relatorio["dados"][f"total_{nome}"] = reais(agregado["total"])
+            relatorio["dados"]["estatisticas_por_fundo"] = {
+                fundo_id: {
+                    nome: {
+                        "total": reais(e["total"]),
+                        "quantidade": e["quantidade"],
+                        "media": reais(e["total"]) / e["quantidade"],
+                        "minimo": reais(e["minimo"]),
+                        "maximo": reais(e["maximo"])
+                    }
+                    for nome, agregado in agregados.items()
+                    for e in [agregado["por_fundo"].get(fundo_id)] if e
+                }
+                for fundo_id in fundo_ids
+            }
             
         if tipo_relatorio in ['completo', 'recebimentos']:
-            rec_selecionados = [r for r in RECEBIMENTOS_DATA if r["fundo_id"] in fundo_ids]
-            relatorio["dados"]["recebimentos"] = rec_selecionados
-            relatorio["dados"]["total_recebimentos"] = sum([r["valor"] for r in rec_selecionados])
+            with span("fluxos_ativos.filtro"):
+                fluxos_selecionados = [f for fid in fundo_ids for f in REGISTRO_ATIVOS.fluxos_fundo(fid, data_inicio or None, data_fim or None)]
+            relatorio["dados"]["fluxos_ativos"] = fluxos_selecionados
+            with span("fluxos_ativos.soma", linhas=len(fluxos_selecionados)):
+                relatorio["dados"]["total_fluxos_ativos"] = reais(sum([f.valor_centavos for f in fluxos_selecionados]))
             
-        if tipo_relatorio in ['completo', 'subscricoes']:
-            sub_selecionadas = [s for s in SUBSCRICOES_DATA if s["fundo_id"] in fundo_ids]
-            relatorio["dados"]["subscricoes"] = sub_selecionadas
-            relatorio["dados"]["total_subscricoes"] = sum([s["valor_parcela"] for s in sub_selecionadas])
+        if formato:
+            nome = f"relatorio_{tipo_relatorio}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            return responder_planilha(nome, formato, abas_relatorio(relatorio))
             
         return jsonify({
             "success": True,
             "data": relatorio
         })
         
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# --- ROTAS DE PROVISÕES ---
+
+@app.route('/provisoes/taxa-admin', methods=['POST'])
+def provisionar_taxa_admin():
+    """Gerar compromissos de taxa de administração por competência (idempotente)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        mes_atual = datetime.now().strftime("%Y-%m")
+        mes_inicio = data.get('inicio', mes_atual)
+        mes_fim = data.get('fim', mes_inicio)
+        fundo_ids = data.get('fundos')
+        
+        inicio = time.perf_counter()
+        gerados, dias_uteis = gerar_compromissos_taxa_admin(mes_inicio, mes_fim, fundo_ids)
+        
+        return jsonify({
+            "success": True,
+            "message": f"{len(gerados)} compromissos de taxa de administração provisionados",
+            "data": gerados,
+            "dias_uteis": dias_uteis,
+            "total_valor": reais(sum([c.valor_centavos for c in gerados])),
+            "tempo_ms": round((time.perf_counter() - inicio) * 1000, 3)
+        })
+        
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -371,15 +849,20 @@ def get_compromissos():
     """Listar compromissos (opcionalmente por fundo)"""
     fundo_id = request.args.get('fundo_id')
     if fundo_id:
-        dados = [c for c in COMPROMISSOS_DATA if c["fundo_id"] == fundo_id]
+        dados = INDICE_LIVROS.linhas("compromissos", fundo_id)
     else:
         dados = COMPROMISSOS_DATA
+    try:
+        pagina, paginacao = paginar(dados)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
         
     return jsonify({
         "success": True,
-        "data": dados,
+        "data": pagina,
         "total_itens": len(dados),
-        "total_valor": sum([c["valor"] for c in dados])
+        "total_valor": reais(sum([c.valor_centavos for c in dados])),
+        **paginacao
     })
 
 @app.route('/recebimentos', methods=['GET'])
@@ -387,15 +870,20 @@ def get_recebimentos():
     """Listar recebimentos (opcionalmente por fundo)"""
     fundo_id = request.args.get('fundo_id')
     if fundo_id:
-        dados = [r for r in RECEBIMENTOS_DATA if r["fundo_id"] == fundo_id]
+        dados = INDICE_LIVROS.linhas("recebimentos", fundo_id)
     else:
         dados = RECEBIMENTOS_DATA
+    try:
+        pagina, paginacao = paginar(dados)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
         
     return jsonify({
         "success": True,
-        "data": dados,
+        "data": pagina,
         "total_itens": len(dados),
-        "total_valor": sum([r["valor"] for r in dados])
+        "total_valor": reais(sum([r.valor_centavos for r in dados])),
+        **paginacao
     })
 
 @app.route('/subscricoes', methods=['GET'])
@@ -403,147 +891,425 @@ def get_subscricoes():
     """Listar subscrições (opcionalmente por fundo)"""
     fundo_id = request.args.get('fundo_id')
     if fundo_id:
-        dados = [s for s in SUBSCRICOES_DATA if s["fundo_id"] == fundo_id]
+        dados = INDICE_LIVROS.linhas("subscricoes", fundo_id)
     else:
         dados = SUBSCRICOES_DATA
+    try:
+        pagina, paginacao = paginar(dados)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
         
     return jsonify({
         "success": True,
-        "data": dados,
+        "data": pagina,
         "total_itens": len(dados),
-        "total_valor": sum([s["valor_parcela"] for s in dados])
+        "total_valor": reais(sum([s.valor_parcela_centavos for s in dados])),
+        **paginacao
     })
 
+@app.route('/subscricoes', methods=['POST'])
+def criar_subscricao():
+    """Cadastrar uma subscrição com cronograma de integralização"""
+    try:
+        data = request.get_json()
+        
+        campos_obrigatorios = ['fundo_id', 'cotista', 'cpf_cnpj', 'cotas', 'compromisso_total', 'parcelas', 'primeiro_vencimento']
+        for campo in campos_obrigatorios:
+            if campo not in data:
+                return jsonify({"success": False, "error": f"Campo '{campo}' é obrigatório"}), 400
+        if data['fundo_id'] not in FUNDOS_DATA:
+            return jsonify({"success": False, "error": "Fundo não encontrado"}), 404
+        
+        total_parcelas = int(data['parcelas'])
+        if total_parcelas < 1:
+            return jsonify({"success": False, "error": "Campo 'parcelas' deve ser maior que zero"}), 400
+        periodo_meses = int(data.get('periodo_meses', 1))
+        if periodo_meses < 1:
+            return jsonify({"success": False, "error": "Campo 'periodo_meses' deve ser maior que zero"}), 400
+        
+        nova_subscricao = SubscricaoCronograma.de_dict({
+            "id": proximo_id_livro([s.id for s in SUBSCRICOES_DATA], SHARD, ULTIMO_ID_LIVRO["subscricoes"]),
+            "fundo_id": data['fundo_id'],
+            "cotista": data['cotista'],
+            "cpf_cnpj": data['cpf_cnpj'],
+            "cotas": int(data['cotas']),
+            "compromisso_total": float(data['compromisso_total']),
+            "periodo_meses": periodo_meses,
+            "vencimento": data['primeiro_vencimento'],
+            "status": "PENDENTE",
+            "parcela": f"1/{total_parcelas}"
+        })
+        # A parcela atual é a primeira do cronograma
+        primeira = next(parcelas(nova_subscricao))
+        nova_subscricao["valor_parcela"] = primeira["valor"]
+        
+        SUBSCRICOES_DATA.append(nova_subscricao)
+        ULTIMO_ID_LIVRO["subscricoes"] = max(ULTIMO_ID_LIVRO["subscricoes"], nova_subscricao.id)
+        notificar_mudanca("subscricao", "criado", nova_subscricao["id"], nova_subscricao["fundo_id"], list(nova_subscricao.keys()), nova_subscricao)
+        
+        return jsonify({
+            "success": True,
+            "message": "Subscrição cadastrada com sucesso!",
+            "data": nova_subscricao
+        }), 201
+        
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/subscricoes/chamadas', methods=['GET'])
+def get_chamadas_capital():
+    """Projeção das chamadas de capital (parcelas futuras) em uma janela"""
+    fundo_id = request.args.get('fundo_id')
+    inicio = request.args.get('inicio', datetime.now().strftime("%Y-%m-%d"))
+    fim = request.args.get('fim', (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%d"))
+    detalhar = request.args.get('detalhar', 'false').lower() == 'true'
+    
+    try:
+        subscricoes = INDICE_LIVROS.linhas("subscricoes", fundo_id) if fundo_id else SUBSCRICOES_DATA
+        chamadas = projetar_chamadas(subscricoes, inicio, fim)
+        if detalhar:
+            chamadas = list(chamadas)
+            resumo = agregar_chamadas(chamadas)
+            resumo["itens"] = chamadas
+        else:
+            resumo = agregar_chamadas(chamadas)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return jsonify({
+        "success": True,
+        "data": resumo,
+        "periodo": {"inicio": inicio, "fim": fim}
+    })
+
+def montar_dashboard(fundo_id):
+    """Dados consolidados do dashboard de um fundo (visão 'dashboard'); None se o fundo não existe"""
+    fundo = FUNDOS_DATA.get(fundo_id)
+    if fundo is None:
+        return None
+    with span("filtro", fundo_id=fundo_id):
+        comp_fundo = INDICE_LIVROS.linhas("compromissos", fundo_id)
+        rec_fundo = INDICE_LIVROS.linhas("recebimentos", fundo_id)
+        sub_fundo = INDICE_LIVROS.linhas("subscricoes", fundo_id)
+    
+    # Fluxos dos ativos cadastrados que vencem nos próximos 30 dias
+    hoje = datetime.now().strftime("%Y-%m-%d")
+    em_30_dias = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+    with span("fluxos_ativos"):
+        fluxos_ativos = REGISTRO_ATIVOS.fluxos_fundo(fundo_id, hoje, em_30_dias)
+        entradas_ativos = sum([f.valor_centavos for f in fluxos_ativos])
+    with span("projecao.juros", fluxos=len(fluxos_ativos)):
+        juros_ativos = projetar_juros_fluxos(fluxos_ativos)
+    
+    # Chamadas de capital dos cronogramas de subscrição nos próximos 90 dias
+    em_90_dias = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
+    with span("projecao.chamadas_capital", subscricoes=len(sub_fundo)):
+        chamadas_capital = list(projetar_chamadas(sub_fundo, hoje, em_90_dias))
+    
+    # Liquidação de um resgate solicitado hoje (prazo_resgate em dias úteis)
+    data_resgate = calendario_padrao().somar_dias_uteis(hoje, fundo["prazo_resgate"])
+    
+    # Projeção simplificada (D+0, D+30, D+60)
+    with span("projecao.saldos"):
+        entradas_livros = sum([r.valor_centavos for r in rec_fundo]) + sum([s.valor_parcela_centavos for s in sub_fundo])
+        saidas_livros = sum([c.valor_centavos for c in comp_fundo])
+        projecoes = [
+            {
+                "periodo": "Imediato (D+0)",
+                "entradas": reais(REGISTRO_ATIVOS.total_periodo(fundo_id, hoje, hoje)),
+                "saidas": reais(sum([c.valor_centavos for c in comp_fundo if c.vencimento <= hoje])),
+                "saldo_projetado": fundo["liquidez"]
+            },
+            {
+                "periodo": "Próximos 30 dias",
+                "entradas": reais(entradas_livros + entradas_ativos),
+                "saidas": reais(saidas_livros),
+                "saldo_projetado": reais(fundo.liquidez_centavos + entradas_livros + entradas_ativos - saidas_livros)
+            }
+        ]
+    
+    with span("alertas"):
+        alertas = [a["mensagem"] for a in MOTOR_ALERTAS.alertas_fundo(fundo_id)]
+    
+    return {
+        "fundo": fundo.para_dict(),
+        "projecoes": projecoes,
+        "fluxos_ativos": fluxos_ativos,
+        "chamadas_capital": {
+            "horizonte_dias": 90,
+            "itens": chamadas_capital,
+            "total": reais(sum([centavos(c["valor"]) for c in chamadas_capital]))
+        },
+        "data_liquidacao_resgate": data_resgate.strftime("%Y-%m-%d"),
+        "juros_projetados": {
+            "itens": juros_ativos,
+            "total": reais(sum([centavos(j["juros"]) for j in juros_ativos]))
+        },
+        "alertas": alertas,
+        "data_atualizacao": datetime.now().strftime("%d/%m/%Y %H:%M")
+    }
+
 @app.route('/dashboard/<fundo_id>', methods=['GET'])
 def get_dashboard_fundo(fundo_id):
-    """Dados consolidados para o dashboard de um fundo"""
+    """Dados consolidados para o dashboard de um fundo (servidos da visão materializada)"""
     if fundo_id not in FUNDOS_DATA:
         return jsonify({"success": False, "error": "Fundo não encontrado"}), 404
-        
-    fundo = FUNDOS_DATA[fundo_id]
-    comp_fundo = [c for c in COMPROMISSOS_DATA if c["fundo_id"] == fundo_id]
-    rec_fundo = [r for r in RECEBIMENTOS_DATA if r["fundo_id"] == fundo_id]
-    sub_fundo = [s for s in SUBSCRICOES_DATA if s["fundo_id"] == fundo_id]
     
-    # Projeção simplificada (D+0, D+30, D+60)
-    projecoes = [
-        {
-            "periodo": "Imediato (D+0)",
-            "entradas": 0,
-            "saidas": sum([c["valor"] for c in comp_fundo if c["vencimento"] <= datetime.now().strftime("%Y-%m-%d")]),
-            "saldo_projetado": fundo["liquidez"]
-        },
-        {
-            "periodo": "Próximos 30 dias",
-            "entradas": sum([r["valor"] for r in rec_fundo]) + sum([s["valor_parcela"] for s in sub_fundo]),
-            "saidas": sum([c["valor"] for c in comp_fundo]),
-            "saldo_projetado": fundo["liquidez"] + sum([r["valor"] for r in rec_fundo]) + sum([s["valor_parcela"] for s in sub_fundo]) - sum([c["valor"] for c in comp_fundo])
-        }
-    ]
+    dados, visao = VISOES.obter("dashboard", fundo_id, ao_vivo=pedido_ao_vivo())
+    if dados is None:
+        return jsonify({"success": False, "error": "Fundo não encontrado"}), 404
     
     return jsonify({
         "success": True,
-        "data": {
-            "fundo": fundo,
-            "projecoes": projecoes,
-            "alertas": ["Necessidade de liquidez para compromissos em D+15"] if projecoes[1]["saldo_projetado"] < 0 else [],
-            "data_atualizacao": datetime.now().strftime("%d/%m/%Y %H:%M")
-        }
+        "data": dados,
+        "visao": visao
     })
 
-@app.route('/relatorios', methods=['GET'])
-def get_relatorios():
-    """Relatórios consolidados (resumo)"""
-    # Estatísticas gerais
-    total_patrimonio = sum([f["patrimonio"] for f in FUNDOS_DATA.values()])
-    total_liquidez = sum([f["liquidez"] for f in FUNDOS_DATA.values()])
-    total_compromissos = sum([c["valor"] for c in COMPROMISSOS_DATA])
-    total_recebimentos = sum([r["valor"] for r in RECEBIMENTOS_DATA])
-    total_subscricoes = sum([s["valor_parcela"] for s in SUBSCRICOES_DATA])
+@app.route('/alertas', methods=['GET'])
+def get_alertas():
+    """Alertas de liquidez ativos (opcionalmente por fundo)"""
+    fundo_id = request.args.get('fundo_id')
+    dados = MOTOR_ALERTAS.alertas_fundo(fundo_id) if fundo_id else MOTOR_ALERTAS.alertas()
     
-    # Relatório por fundo
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "total_itens": len(dados),
+        "regras": MOTOR_ALERTAS.regras
+    })
+
+def montar_relatorios():
+    """Resumo consolidado e totais por fundo (visão 'relatorios')"""
+    # Relatório por fundo: totais dos livros de todos os fundos em uma única agregação
+    fundos = list(FUNDOS_DATA.items())
     relatorio_fundos = []
-    for fundo_id, fundo in FUNDOS_DATA.items():
-        comp_fundo = sum([c["valor"] for c in COMPROMISSOS_DATA if c["fundo_id"] == fundo_id])
-        rec_fundo = sum([r["valor"] for r in RECEBIMENTOS_DATA if r["fundo_id"] == fundo_id])
-        sub_fundo = sum([s["valor_parcela"] for s in SUBSCRICOES_DATA if s["fundo_id"] == fundo_id])
+    with span("relatorio_por_fundo", fundos=len(fundos)):
+        agregados = AGREGADOR_RELATORIOS.agregar(livros_relatorio(), [fid for fid, _ in fundos], com_linhas=False)
+        for fundo_id, fundo in fundos:
+            comp_fundo, rec_fundo, sub_fundo = (
+                agregados[nome]["por_fundo"].get(fundo_id, {}).get("total", 0)
+                for nome in ("compromissos", "recebimentos", "subscricoes")
+            )
+            ativos_fundo = REGISTRO_ATIVOS.total_fundo(fundo_id)
         
-        relatorio_fundos.append({
-            "fundo": fundo,
-            "compromissos": comp_fundo,
-            "recebimentos": rec_fundo,
-            "subscricoes": sub_fundo,
-            "saldo_projetado": fundo["liquidez"] + rec_fundo - comp_fundo
-        })
+            relatorio_fundos.append({
+                "fundo": fundo.para_dict(),
+                "compromissos": reais(comp_fundo),
+                "recebimentos": reais(rec_fundo),
+                "subscricoes": reais(sub_fundo),
+                "fluxos_ativos": reais(ativos_fundo),
+                "saldo_projetado": reais(fundo.liquidez_centavos + rec_fundo - comp_fundo + ativos_fundo)
+            })
+    
+    with span("resumo_geral"):
+        resumo_geral = calcular_resumo_geral()
+    
+    return {
+        "resumo_geral": resumo_geral,
+        "relatorio_por_fundo": relatorio_fundos
+    }
+
+@app.route('/relatorios', methods=['GET'])
+def get_relatorios():
+    """Relatórios consolidados (resumo), servidos da visão materializada"""
+    try:
+        formato = formato_planilha()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    dados, visao = VISOES.obter("relatorios", ao_vivo=pedido_ao_vivo())
+    
+    if formato:
+        try:
+            return responder_planilha(f"relatorio_consolidado_{datetime.now().strftime('%Y%m%d_%H%M%S')}", formato,
+                                      abas_consolidado(dados, visao["atualizado_em"]))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
     
     return jsonify({
         "success": True,
-        "data": {
-            "resumo_geral": {
-                "total_fundos": len(FUNDOS_DATA),
-                "patrimonio_total": total_patrimonio,
-                "liquidez_total": total_liquidez,
-                "compromissos_pendentes": total_compromissos,
-                "recebimentos_pendentes": total_recebimentos,
-                "subscricoes_pendentes": total_subscricoes,
-                "saldo_liquido_projetado": total_liquidez + total_recebimentos - total_compromissos
-            },
-            "relatorio_por_fundo": relatorio_fundos
-        }
+        "data": dados,
+        "visao": visao
     })
 
-@app.route('/outliers', methods=['GET'])
-def get_outliers():
-    """Análise de outliers"""
-    # Análise de compromissos
-    valores_compromissos = [c["valor"] for c in COMPROMISSOS_DATA]
+def montar_outliers(media_compromissos=None, media_recebimentos=None):
+    """Análise de outliers (visão 'outliers')
+
+    As médias (centavos) podem vir de fora: no roteador de shards são as médias globais.
+    """
+    # Análise de compromissos (valores em centavos; média e extremos voltam a reais na resposta)
+    valores_compromissos = [c.valor_centavos for c in COMPROMISSOS_DATA]
     outliers_comp = []
     
     if valores_compromissos:
-        media_compromissos = sum(valores_compromissos) / len(valores_compromissos)
-        outliers_comp_data = [c for c in COMPROMISSOS_DATA if c["valor"] > media_compromissos * 1.5]
+        if media_compromissos is None:
+            media_compromissos = sum(valores_compromissos) / len(valores_compromissos)
+        outliers_comp_data = [c for c in COMPROMISSOS_DATA if c.valor_centavos > media_compromissos * 1.5]
         
         for comp in outliers_comp_data:
-            desvio = ((comp["valor"] / media_compromissos) - 1) * 100
+            desvio = ((comp.valor_centavos / media_compromissos) - 1) * 100
             outliers_comp.append({
                 "item": comp,
                 "desvio_percentual": round(desvio, 1)
             })
     
     # Análise de recebimentos
-    valores_recebimentos = [r["valor"] for r in RECEBIMENTOS_DATA]
+    valores_recebimentos = [r.valor_centavos for r in RECEBIMENTOS_DATA]
     outliers_rec = []
     
     if valores_recebimentos:
-        media_recebimentos = sum(valores_recebimentos) / len(valores_recebimentos)
-        outliers_rec_data = [r for r in RECEBIMENTOS_DATA if r["valor"] > media_recebimentos * 1.5]
+        if media_recebimentos is None:
+            media_recebimentos = sum(valores_recebimentos) / len(valores_recebimentos)
+        outliers_rec_data = [r for r in RECEBIMENTOS_DATA if r.valor_centavos > media_recebimentos * 1.5]
         
         for rec in outliers_rec_data:
-            desvio = ((rec["valor"] / media_recebimentos) - 1) * 100
+            desvio = ((rec.valor_centavos / media_recebimentos) - 1) * 100
             outliers_rec.append({
                 "item": rec,
                 "desvio_percentual": round(desvio, 1)
             })
     
+    return {
+        "compromissos": {
+            "media": reais(sum(valores_compromissos)) / len(valores_compromissos) if valores_compromissos else 0,
+            "maximo": reais(max(valores_compromissos)) if valores_compromissos else 0,
+            "minimo": reais(min(valores_compromissos)) if valores_compromissos else 0,
+            "outliers": outliers_comp
+        },
+        "recebimentos": {
+            "media": reais(sum(valores_recebimentos)) / len(valores_recebimentos) if valores_recebimentos else 0,
+            "maximo": reais(max(valores_recebimentos)) if valores_recebimentos else 0,
+            "minimo": reais(min(valores_recebimentos)) if valores_recebimentos else 0,
+            "outliers": outliers_rec
+        }
+    }
+
+def estatisticas_outliers():
+    """Soma, quantidade e extremos (centavos) dos livros analisados nos outliers"""
+    estatisticas = {}
+    for nome, linhas in (("compromissos", COMPROMISSOS_DATA), ("recebimentos", RECEBIMENTOS_DATA)):
+        valores = [linha.valor_centavos for linha in linhas]
+        estatisticas[nome] = {
+            "soma": sum(valores),
+            "quantidade": len(valores),
+            "minimo": min(valores, default=None),
+            "maximo": max(valores, default=None)
+        }
+    return estatisticas
+
+@app.route('/outliers', methods=['GET'])
+def get_outliers():
+    """Análise de outliers, servida da visão materializada
+
+    As duas etapas do scatter-gather do roteador de shards: ?parcial=true devolve só as
+    estatísticas em centavos; ?media_compromissos=&media_recebimentos= (centavos) calcula
+    os outliers em relação às médias globais.
+    """
+    if request.args.get('parcial', 'false').lower() == 'true':
+        return jsonify({"success": True, "data": estatisticas_outliers()})
+    if 'media_compromissos' in request.args or 'media_recebimentos' in request.args:
+        try:
+            medias = [float(request.args[m]) if m in request.args else None
+                      for m in ('media_compromissos', 'media_recebimentos')]
+        except ValueError:
+            return jsonify({"success": False, "error": "Médias devem ser numéricas (centavos)"}), 400
+        return jsonify({"success": True, "data": montar_outliers(*medias)})
+    
+    dados, visao = VISOES.obter("outliers", ao_vivo=pedido_ao_vivo())
     return jsonify({
         "success": True,
-        "data": {
-            "compromissos": {
-                "media": sum(valores_compromissos) / len(valores_compromissos) if valores_compromissos else 0,
-                "maximo": max(valores_compromissos) if valores_compromissos else 0,
-                "minimo": min(valores_compromissos) if valores_compromissos else 0,
-                "outliers": outliers_comp
-            },
-            "recebimentos": {
-                "media": sum(valores_recebimentos) / len(valores_recebimentos) if valores_recebimentos else 0,
-                "maximo": max(valores_recebimentos) if valores_recebimentos else 0,
-                "minimo": min(valores_recebimentos) if valores_recebimentos else 0,
-                "outliers": outliers_rec
-            }
-        }
+        "data": dados,
+        "visao": visao
+    })
+
+# Visões materializadas das rotas mais consultadas: recalculadas em segundo plano pela
+# agenda e após alterações de dados (notificar_mudanca); ?ao_vivo=true recalcula na hora
+VISOES.registrar("relatorios", montar_relatorios, "*/5 * * * *")
+VISOES.registrar("outliers", montar_outliers, "*/15 * * * *")
+# As projeções do dashboard dependem da data de hoje: versões de outro dia não são servidas
+VISOES.registrar("dashboard", montar_dashboard, "*/10 * * * *", por_chave=True,
+                 validade=lambda: datetime.now().strftime("%Y-%m-%d"))
+METRICAS.registrar_medidor("tomate_visao_idade_segundos", "Idade da versão mais antiga de cada visão materializada",
+                           ("visao",), lambda: {(nome,): idade for nome, idade in VISOES.idades().items()})
+
+@app.route('/visoes', methods=['GET'])
+def get_visoes():
+    """Situação das visões materializadas (agenda, idade, atualizações pendentes)"""
+    dados = VISOES.estado()
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "total_itens": len(dados)
     })
 
 
+@app.route('/stress', methods=['POST'])
+def stress_liquidez():
+    """Teste de estresse de liquidez por simulação de Monte Carlo"""
+    try:
+        data = request.get_json(silent=True) or {}
+        fundo_ids = [fid for fid in data.get('fundos', list(FUNDOS_DATA.keys())) if fid in FUNDOS_DATA]
+        horizontes = data.get('horizontes', HORIZONTES_PADRAO)
+        caminhos = int(data.get('caminhos', CAMINHOS_PADRAO))
+        seed = int(data.get('seed', 0))
+        parametros = data.get('parametros', {})
+        
+        if not isinstance(horizontes, (list, tuple)) or not horizontes:
+            return jsonify({"success": False, "error": "Campo 'horizontes' deve ser uma lista não vazia de dias"}), 400
+        try:
+            horizontes = sorted(int(h) for h in horizontes)
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "Campo 'horizontes' deve conter apenas dias inteiros"}), 400
+        if horizontes[0] < 1:
+            return jsonify({"success": False, "error": "Campo 'horizontes' deve conter apenas dias maiores que zero"}), 400
+        if not 1 <= caminhos <= 1_000_000:
+            return jsonify({"success": False, "error": "Campo 'caminhos' deve estar entre 1 e 1.000.000"}), 400
+        if not isinstance(parametros, dict) or not all(isinstance(c, dict) for c in parametros.values()):
+            return jsonify({"success": False, "error": "Campo 'parametros' deve ser um objeto {categoria: {premissa: valor}}"}), 400
+        for categoria in parametros.values():
+            for chave in ['prob_default', 'prob_atraso']:
+                if chave in categoria and not 0 <= float(categoria[chave]) <= 1:
+                    return jsonify({"success": False, "error": f"Campo '{chave}' deve estar entre 0 e 1"}), 400
+        
+        # Entradas e saídas pendentes de cada fundo, em dias a partir de hoje
+        hoje = datetime.now().date()
+        fim = (hoje + timedelta(days=horizontes[-1])).isoformat()
+        
+        def dias_ate(vencimento):
+            return max((datetime.strptime(vencimento, "%Y-%m-%d").date() - hoje).days, 0)
+        
+        fundos = []
+        for fid in fundo_ids:
+            entradas = [(dias_ate(r.vencimento), reais(r.valor_centavos), "recebimentos")
+                        for r in INDICE_LIVROS.linhas("recebimentos", fid) if r.status == "PENDENTE"]
+            entradas += [(dias_ate(f["vencimento"]), f["valor"], "recebimentos")
+                         for f in REGISTRO_ATIVOS.fluxos_fundo(fid, None, fim)]
+            entradas += [(dias_ate(c["vencimento"]), c["valor"], "subscricoes")
+                         for c in projetar_chamadas(INDICE_LIVROS.linhas("subscricoes", fid), None, fim)]
+            saidas = [(dias_ate(c.vencimento), reais(c.valor_centavos))
+                      for c in INDICE_LIVROS.linhas("compromissos", fid) if c.status == "PENDENTE"]
+            fundos.append({
+                "fundo_id": fid,
+                "liquidez": FUNDOS_DATA[fid]["liquidez"],
+                "entradas": entradas,
+                "saidas": saidas
+            })
+        
+        inicio = time.perf_counter()
+        resultados = simular(fundos, parametros, horizontes, caminhos, seed, data.get('workers'))
+        
+        return jsonify({
+            "success": True,
+            "data": resultados,
+            "parametros": {"caminhos": caminhos, "seed": seed, "horizontes": horizontes},
+            "tempo_ms": round((time.perf_counter() - inicio) * 1000, 3)
+        })
+        
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/ativos', methods=['POST'])
 def cadastrar_ativo():
     """Cadastrar um novo ativo"""
@@ -552,37 +1318,112 @@ def cadastrar_ativo():
         data = request.form
         arquivo = request.files.get('documento')
         
+        fundo_id = data.get('fundo_id')
+        if not fundo_id:
+            return jsonify({"success": False, "error": "Campo 'fundo_id' é obrigatório"}), 400
+        if fundo_id not in FUNDOS_DATA:
+            return jsonify({"success": False, "error": "Fundo não encontrado"}), 404
+        
+        # Datas e valor validados antes de qualquer escrita (registro, busca e alertas os leem depois)
+        vencimentos = []
+        for vencimento in data.getlist('vencimentos[]'):
+            if not vencimento:
+                continue
+            try:
+                vencimentos.append(date.fromisoformat(vencimento).isoformat())
+            except ValueError:
+                return jsonify({"success": False, "error": f"Vencimento inválido: '{vencimento}' (use AAAA-MM-DD)"}), 400
+        try:
+            valor_vencimento = float(data.get('valor_vencimento') or 0)
+        except ValueError:
+            return jsonify({"success": False, "error": "Campo 'valor_vencimento' deve ser numérico"}), 400
+        if not math.isfinite(valor_vencimento):
+            return jsonify({"success": False, "error": "Campo 'valor_vencimento' deve ser numérico"}), 400
+        
+        texto_documento = extrair_texto_documento(arquivo.filename, arquivo.read()) if arquivo else ""
+        
         novo_ativo = {
             "id": str(uuid.uuid4())[:8],
+            "fundo_id": fundo_id,
             "tipo_ativo": data.get('tipo_ativo'),
             "detalhes": data.get('detalhes'),
             "taxa_fixa": data.get('taxa_fixa'),
             "taxa_variavel": data.get('taxa_variavel'),
-            "vencimentos": data.getlist('vencimentos[]'),
+            "vencimentos": vencimentos,
+            "valor_vencimento": valor_vencimento,
             "info_gerais": data.get('info_gerais'),
             "arquivo_nome": arquivo.filename if arquivo else "Nenhum arquivo",
             "data_cadastro": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
-        # Aqui você poderia salvar no banco de dados
-        print(f"Ativo cadastrado: {novo_ativo}")
+        # Salvar no registro e expandir os vencimentos em fluxos esperados
+        fluxos = REGISTRO_ATIVOS.registrar(novo_ativo, centavos(novo_ativo["valor_vencimento"]))
+        indexar_ativo(novo_ativo, texto_documento)
+        notificar_mudanca("ativo", "criado", novo_ativo["id"], fundo_id, list(novo_ativo.keys()), novo_ativo)
         
         return jsonify({
             "success": True,
             "message": "Ativo cadastrado com sucesso!",
-            "data": novo_ativo
+            "data": {**novo_ativo, "fluxos": fluxos}
         })
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/ativos', methods=['GET'])
+def get_ativos():
+    """Listar ativos cadastrados (opcionalmente por fundo)"""
+    fundo_id = request.args.get('fundo_id')
+    dados = REGISTRO_ATIVOS.listar(fundo_id)
+    
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "total_itens": len(dados)
+    })
+
+@app.route('/ativos/fluxos', methods=['GET'])
+def get_fluxos_ativos():
+    """Listar fluxos esperados dos ativos por fundo e período"""
+    fundo_id = request.args.get('fundo_id')
+    inicio = request.args.get('inicio')
+    fim = request.args.get('fim')
+    if fundo_id:
+        dados = REGISTRO_ATIVOS.fluxos_fundo(fundo_id, inicio, fim)
+    else:
+        dados = [f for fid in FUNDOS_DATA for f in REGISTRO_ATIVOS.fluxos_fundo(fid, inicio, fim)]
+    
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "total_itens": len(dados),
+        "total_valor": reais(sum([f.valor_centavos for f in dados]))
+    })
+
+@app.route('/ativos/juros', methods=['GET'])
+def get_juros_ativos():
+    """Juros projetados dos fluxos de ativos pela curva de índices"""
+    fundo_id = request.args.get('fundo_id')
+    inicio = request.args.get('inicio')
+    fim = request.args.get('fim')
+    fundos = [fundo_id] if fundo_id else list(FUNDOS_DATA.keys())
+    fluxos = [f for fid in fundos for f in REGISTRO_ATIVOS.fluxos_fundo(fid, inicio, fim)]
+    dados = projetar_juros_fluxos(fluxos)
+    
+    return jsonify({
+        "success": True,
+        "data": dados,
+        "total_itens": len(dados),
+        "total_juros": reais(sum([centavos(j["juros"]) for j in dados]))
+    })
+
 @app.route('/documentos', methods=['POST'])
 def cadastrar_documento():
     """Simular cadastro de documento"""
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     
     # Simulação de processamento
     documento_processado = {
-        "id": 999,
+        "id": str(uuid.uuid4())[:8],
         "tipo": "Debênture",
         "emissor": "Empresa XYZ S.A.",
         "valor": 1000000.00,
@@ -593,12 +1434,191 @@ def cadastrar_documento():
         "data_upload": datetime.now().strftime("%d/%m/%Y %H:%M")
     }
     
+    # Campos informados no upload prevalecem sobre a simulação
+    for campo in ['tipo', 'emissor', 'valor', 'vencimento', 'taxa', 'garantias', 'descricao']:
+        if campo in data:
+            documento_processado[campo] = data[campo]
+    
+    DOCUMENTOS_DATA[documento_processado["id"]] = documento_processado
+    indexar_documento(documento_processado, data.get('conteudo', ''))
+    
     return jsonify({
         "success": True,
         "message": "Documento processado com sucesso!",
         "data": documento_processado
     })
 
+@app.route('/busca', methods=['GET'])
+def buscar():
+    """Busca textual em ativos e documentos cadastrados"""
+    consulta = request.args.get('q', '').strip()
+    if not consulta:
+        return jsonify({"success": False, "error": "Parâmetro 'q' é obrigatório"}), 400
+    
+    limite = request.args.get('limite', 20, type=int)
+    inicio = time.perf_counter()
+    resultados = INDICE_BUSCA.buscar(consulta, limite)
+    
+    return jsonify({
+        "success": True,
+        "data": resultados,
+        "total_itens": len(resultados),
+        "documentos_indexados": len(INDICE_BUSCA),
+        "tempo_ms": round((time.perf_counter() - inicio) * 1000, 3)
+    })
+
+@app.route('/calendario/dias-uteis', methods=['GET'])
+def get_dias_uteis():
+    """Aritmética de dias úteis: D+N, dias úteis entre datas e próximo dia útil"""
+    calendario = calendario_padrao()
+    data = request.args.get('data', datetime.now().strftime("%Y-%m-%d"))
+    try:
+        resultado = {
+            "data": data,
+            "dia_util": bool(calendario.eh_dia_util(data)),
+            "proximo_dia_util": calendario.proximo_dia_util(data).strftime("%Y-%m-%d")
+        }
+        if 'dias' in request.args:
+            try:
+                dias = int(request.args['dias'])
+            except ValueError:
+                raise ValueError("Parâmetro 'dias' deve ser inteiro")
+            resultado["dias"] = dias
+            resultado["data_resultante"] = calendario.somar_dias_uteis(data, dias).strftime("%Y-%m-%d")
+        if 'fim' in request.args:
+            resultado["fim"] = request.args['fim']
+            resultado["dias_uteis_entre"] = int(calendario.dias_uteis_entre(data, request.args['fim']))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return jsonify({
+        "success": True,
+        "data": resultado
+    })
+
+@app.route('/eventos', methods=['GET'])
+def stream_eventos():
+    """Stream (SSE) das alterações de dados para a interface web"""
+    ultimo = request.headers.get('Last-Event-ID', type=int)
+    return Response(
+        DIFUSOR_EVENTOS.stream(ultimo),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- REQUISIÇÕES EM LOTE ---
+
+LIMITE_REQUISICOES_BATCH = 100
+WORKERS_BATCH = 8
+
+# Rotas que não podem ser chamadas dentro de um lote
+ROTAS_FORA_DO_BATCH = {'/batch', '/eventos'}
+
+# POSTs sem efeito colateral, que podem ser deduplicados como os GETs
+POSTS_SOMENTE_LEITURA = {'/relatorios/gerar', '/stress'}
+
+def executar_subrequisicao(sub):
+    """Executa uma sub-requisição do lote dentro do próprio processo, sem HTTP"""
+    # Sem Accept-Encoding: a resposta do lote é que será comprimida, não cada parte
+    headers = {k: v for k, v in (sub.get('headers') or {}).items() if k.lower() != 'accept-encoding'}
+    builder = EnvironBuilder(
+        path=sub['path'],
+        method=sub.get('method', 'GET').upper(),
+        json=sub.get('body'),
+        headers=headers
+    )
+    try:
+        with app.request_context(builder.get_environ()):
+            try:
+                resposta = app.full_dispatch_request()
+            except Exception as e:
+                # Erro não tratado: 500 só desta sub-requisição, as demais do lote seguem
+                try:
+                    resposta = app.make_response(app.handle_exception(e))
+                except Exception:
+                    # Com PROPAGATE_EXCEPTIONS (debug/testes) o Flask relança o erro
+                    app.logger.exception("Erro na sub-requisição %s", sub['path'])
+                    resposta = None
+                if resposta is None or resposta.get_json(silent=True) is None:
+                    return {"status": 500, "body": {"success": False, "error": str(e)}}
+            corpo = resposta.get_json(silent=True)
+            if corpo is None:
+                corpo = resposta.get_data(as_text=True)
+            return {"status": resposta.status_code, "body": corpo}
+    finally:
+        builder.close()
+
+def pede_planilha(sub):
+    """Sub-requisição que pede o relatório em planilha (binário em streaming, fora do lote)"""
+    corpo = sub.get('body') if isinstance(sub.get('body'), dict) else {}
+    formatos = parse_qs(urlsplit(sub['path']).query).get('formato', []) + [corpo.get('formato')]
+    return any(f in FORMATOS_PLANILHA for f in formatos)
+
+def chave_subrequisicao(sub):
+    """Chave de deduplicação (None se a sub-requisição tiver efeito colateral)"""
+    metodo = sub.get('method', 'GET').upper()
+    caminho = sub['path'].split('?')[0]
+    if metodo != 'GET' and not (metodo == 'POST' and caminho in POSTS_SOMENTE_LEITURA):
+        return None
+    return (metodo, sub['path'], json.dumps(sub.get('body'), sort_keys=True))
+
+@app.route('/batch', methods=['POST'])
+def executar_batch():
+    """Executar várias chamadas da API em uma única requisição"""
+    try:
+        data = request.get_json(silent=True) or {}
+        requisicoes = data.get('requisicoes')
+        if not isinstance(requisicoes, list) or not requisicoes:
+            return jsonify({"success": False, "error": "Campo 'requisicoes' é obrigatório"}), 400
+        if len(requisicoes) > LIMITE_REQUISICOES_BATCH:
+            return jsonify({"success": False, "error": f"Máximo de {LIMITE_REQUISICOES_BATCH} requisições por lote"}), 400
+        for sub in requisicoes:
+            if not isinstance(sub, dict) or not str(sub.get('path', '')).startswith('/'):
+                return jsonify({"success": False, "error": "Cada requisição precisa de um 'path' iniciado por '/'"}), 400
+            if sub['path'].split('?')[0] in ROTAS_FORA_DO_BATCH:
+                return jsonify({"success": False, "error": f"Rota '{sub['path']}' não permitida em lote"}), 400
+            if pede_planilha(sub):
+                return jsonify({"success": False, "error": "Relatórios em planilha (formato xlsx/csv) não são permitidos em lote"}), 400
+        
+        # Sub-requisições idênticas sem efeito colateral são executadas uma única vez
+        unicas, indice_unica = [], []
+        por_chave = {}
+        for sub in requisicoes:
+            chave = chave_subrequisicao(sub)
+            if chave is None or chave not in por_chave:
+                if chave is not None:
+                    por_chave[chave] = len(unicas)
+                indice_unica.append(len(unicas))
+                unicas.append(sub)
+            else:
+                indice_unica.append(por_chave[chave])
+        
+        if data.get('paralelo') and len(unicas) > 1:
+            with ThreadPoolExecutor(max_workers=min(WORKERS_BATCH, len(unicas))) as pool:
+                resultados_unicos = list(pool.map(executar_subrequisicao, unicas))
+        else:
+            resultados_unicos = [executar_subrequisicao(sub) for sub in unicas]
+        
+        resultados = [
+            {"id": sub.get('id', i), **resultados_unicos[indice_unica[i]]}
+            for i, sub in enumerate(requisicoes)
+        ]
+        
+        return jsonify({
+            "success": True,
+            "data": resultados,
+            "total_itens": len(resultados),
+            "executadas": len(unicas)
+        })
+        
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas da API no formato texto do Prometheus"""
+    return Response(METRICAS.exportar(), content_type=TIPO_METRICAS)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Verificação de saúde da API"""
@@ -607,1353 +1627,129 @@ def health_check():
         "message": "API Tomate Fund funcionando!",
         "timestamp": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
         "version": "3.0.0",
-        "features": ["CRUD Fundos", "Relatórios Personalizados", "Dashboard", "Análise de Outliers"]
+        "shard": f"{SHARD[0]}/{SHARD[1]}" if SHARD else None,
+        "features": ["CRUD Fundos", "Relatórios Personalizados", "Dashboard", "Análise de Outliers", "Busca Textual", "Métricas", "Histórico de Fundos", "Relatórios em Planilha", "Visões Materializadas", "Shards por Fundo"]
     })
 
-# =========================================================
-# 3. APLICAÇÃO FLASK PRINCIPAL
-# =========================================================
-
-# HTML/CSS/JS da Interface Web (Front-end)
-HTML_CONTENT = """
-<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>🍅 Sistema Tomate Fund - API v3.0</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            color: #333;
-        }
-
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-
-        .header {
-            text-align: center;
-            color: white;
-            margin-bottom: 40px;
-        }
-
-        .header h1 {
-            font-size: 3rem;
-            margin-bottom: 10px;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        }
-
-        .header p {
-            font-size: 1.2rem;
-            opacity: 0.9;
-        }
-
-        .dashboard {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-            gap: 20px;
-            margin-bottom: 40px;
-        }
-
-        .card {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }
-
-        .card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 15px 40px rgba(0,0,0,0.15);
-        }
-
-        .card-header {
-            display: flex;
-            align-items: center;
-            margin-bottom: 20px;
-        }
-
-        .card-icon {
-            font-size: 2rem;
-            margin-right: 15px;
-        }
-
-        .card-title {
-            font-size: 1.4rem;
-            font-weight: 600;
-            color: #2d3748;
-        }
-
-        .card-value {
-            font-size: 2rem;
-            font-weight: bold;
-            color: #4a5568;
-            margin-bottom: 10px;
-        }
-
-        .card-description {
-            color: #718096;
-            font-size: 0.9rem;
-        }
-
-        .controls {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            margin-bottom: 30px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }
-
-        .controls h3 {
-            margin-bottom: 20px;
-            color: #2d3748;
-        }
-
-        .tab-buttons {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 10px;
-            margin-bottom: 20px;
-            border-bottom: 2px solid #e2e8f0;
-            padding-bottom: 15px;
-        }
-
-        .tab-btn {
-            background: #f7fafc;
-            color: #4a5568;
-            border: none;
-            padding: 10px 20px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            font-weight: 500;
-            transition: all 0.3s ease;
-        }
-
-        .tab-btn.active {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-        }
-
-        .tab-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 3px 10px rgba(0,0,0,0.1);
-        }
-
-        .tab-content {
-            display: none;
-        }
-
-        .tab-content.active {
-            display: block;
-        }
-
-        .button-group {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 15px;
-            margin-bottom: 20px;
-        }
-
-        .btn {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 12px 24px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 1rem;
-            font-weight: 500;
-            transition: all 0.3s ease;
-            text-decoration: none;
-            display: inline-block;
-        }
-
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(0,0,0,0.2);
-        }
-
-        .btn-secondary {
-            background: linear-gradient(135deg, #48bb78 0%, #38a169 100%);
-        }
-
-        .btn-danger {
-            background: linear-gradient(135deg, #f56565 0%, #e53e3e 100%);
-        }
-
-        .select-group, .form-group {
-            margin-bottom: 20px;
-        }
-
-        .select-group label, .form-group label {
-            display: block;
-            margin-bottom: 8px;
-            font-weight: 500;
-            color: #2d3748;
-        }
-
-        .select-group select, .form-group input, .form-group select, .form-group textarea {
-            width: 100%;
-            padding: 12px;
-            border: 2px solid #e2e8f0;
-            border-radius: 8px;
-            font-size: 1rem;
-            background: white;
-            transition: border-color 0.3s ease;
-        }
-
-        .select-group select:focus, .form-group input:focus {
-            border-color: #667eea;
-            outline: none;
-        }
-
-        .form-row {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 20px;
-        }
-
-        .data-section {
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-            overflow-x: auto;
-        }
-
-        .data-section h3 {
-            margin-bottom: 25px;
-            color: #2d3748;
-            border-bottom: 2px solid #f7fafc;
-            padding-bottom: 10px;
-        }
-
-        .table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 10px;
-        }
-
-        .table th, .table td {
-            padding: 15px;
-            text-align: left;
-            border-bottom: 1px solid #edf2f7;
-        }
-
-        .table th {
-            background-color: #f8fafc;
-            color: #4a5568;
-            font-weight: 600;
-            text-transform: uppercase;
-            font-size: 0.85rem;
-            letter-spacing: 0.05em;
-        }
-
-        .table tr:hover {
-            background-color: #f7fafc;
-        }
-
-        .status-pendente {
-            background: #fff3cd;
-            color: #856404;
-            padding: 5px 10px;
-            border-radius: 20px;
-            font-size: 0.8rem;
-            font-weight: 600;
-        }
-
-        .alert {
-            padding: 15px;
-            border-radius: 8px;
-            margin-bottom: 20px;
-            background: #fed7d7;
-            color: #c53030;
-            border-left: 5px solid #f56565;
-        }
-
-        .alert.success {
-            background: #c6f6d5;
-            color: #2f855a;
-            border-left: 5px solid #48bb78;
-        }
-
-        .loading {
-            text-align: center;
-            padding: 40px;
-            color: #718096;
-        }
-
-        /* Modal Styles */
-        .modal {
-            display: none;
-            position: fixed;
-            z-index: 1000;
-            left: 0;
-            top: 0;
-            width: 100%;
-            height: 100%;
-            background-color: rgba(0,0,0,0.5);
-        }
-
-        .modal-content {
-            background-color: white;
-            margin: 5% auto;
-            padding: 30px;
-            border-radius: 15px;
-            width: 80%;
-            max-width: 800px;
-            box-shadow: 0 20px 50px rgba(0,0,0,0.3);
-        }
-
-        .close {
-            color: #aaa;
-            float: right;
-            font-size: 28px;
-            font-weight: bold;
-            cursor: pointer;
-        }
-
-        .close:hover {
-            color: #333;
-        }
-
-        @media (max-width: 768px) {
-            .form-row {
-                grid-template-columns: 1fr;
-            }
-            .header h1 {
-                font-size: 2rem;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🍅 Tomate Fund</h1>
-            <p>Gerenciador de Tesouraria de Fundos - API v3.0</p>
-        </div>
-
-        <!-- Dashboard Summary -->
-        <div class="dashboard">
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">📊</div>
-                    <div class="card-title">Patrimônio Total</div>
-                </div>
-                <div class="card-value" id="patrimonio-total">R$ 0,00</div>
-                <div class="card-description">Soma de todos os fundos</div>
-            </div>
-
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">💧</div>
-                    <div class="card-title">Liquidez Total</div>
-                </div>
-                <div class="card-value" id="liquidez-total">R$ 0,00</div>
-                <div class="card-description">Disponível para investimento</div>
-            </div>
-
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">💸</div>
-                    <div class="card-title">Compromissos</div>
-                </div>
-                <div class="card-value" id="compromissos-total">R$ 0,00</div>
-                <div class="card-description">Pagamentos pendentes</div>
-            </div>
-
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">📈</div>
-                    <div class="card-title">Recebimentos</div>
-                </div>
-                <div class="card-value" id="recebimentos-total">R$ 0,00</div>
-                <div class="card-description">Valores a receber</div>
-            </div>
-        </div>
-
-        <!-- Controls with Tabs -->
-        <div class="controls">
-            <h3>🎛️ Controles do Sistema</h3>
-            
-            <!-- Tab Buttons -->
-            <div class="tab-buttons">
-                <button class="tab-btn active" onclick="mostrarTab('consulta', this)">📊 Consulta</button>
-                <button class="tab-btn" onclick="mostrarTab('cadastro', this)">📝 Cadastro</button>
-                <button class="tab-btn" onclick="mostrarTab('relatorios', this)">📈 Relatórios</button>
-            </div>
-
-            <!-- Tab: Consulta -->
-            <div id="tab-consulta" class="tab-content active">
-                <div class="select-group">
-                    <label for="fundo-select">Selecionar Fundo:</label>
-                    <select id="fundo-select">
-                        <option value="">Carregando fundos...</option>
-                    </select>
-                </div>
-
-                <div class="button-group">
-                    <button class="btn" onclick="carregarDashboard()">📊 Dashboard</button>
-                    <button class="btn" onclick="carregarCompromissos()">💸 Compromissos</button>
-                    <button class="btn" onclick="carregarRecebimentos()">💰 Recebimentos</button>
-                    <button class="btn" onclick="carregarSubscricoes()">📋 Subscrições</button>
-                    <button class="btn btn-secondary" onclick="carregarRelatorios()">📈 Relatórios (Resumo)</button>
-                    <button class="btn btn-secondary" onclick="carregarOutliers()">📊 Outliers</button>
-                </div>
-            </div>
-
-            <!-- Tab: Cadastro -->
-            <div id="tab-cadastro" class="tab-content">
-                <h4>📝 Gerenciar Fundos</h4>
-                
-                <div class="button-group">
-                    <button class="btn btn-secondary" onclick="mostrarFormularioFundo()">➕ Novo Fundo</button>
-                    <button class="btn" onclick="listarFundos()">📋 Listar Fundos</button>
-                    <button class="btn btn-secondary" onclick="mostrarFormularioAtivo()">✅ Cadastro Ativo</button>
-                </div>
-
-                <div id="formulario-fundo" style="display: none;">
-                    <h5>Cadastrar Novo Fundo</h5>
-                    <form id="form-fundo">
-                        <div class="form-row">
-                            <div class="form-group">
-                                <label for="nome">Nome do Fundo *</label>
-                                <input type="text" id="nome" name="nome" required>
-                            </div>
-                            <div class="form-group">
-                                <label for="cnpj">CNPJ *</label>
-                                <input type="text" id="cnpj" name="cnpj" required placeholder="00.000.000/0000-00">
-                            </div>
-                        </div>
-                        
-                        <div class="form-row">
-                            <div class="form-group">
-                                <label for="patrimonio">Patrimônio (R$) *</label>
-                                <input type="number" id="patrimonio" name="patrimonio" step="0.01" required>
-                            </div>
-                            <div class="form-group">
-                                <label for="liquidez">Liquidez (R$) *</label>
-                                <input type="number" id="liquidez" name="liquidez" step="0.01" required>
-                            </div>
-                        </div>
-                        
-                        <div class="form-row">
-                            <div class="form-group">
-                                <label for="politica_liquidez">Política de Liquidez *</label>
-                                <select id="politica_liquidez" name="politica_liquidez" required>
-                                    <option value="">Selecione...</option>
-                                    <option value="Ativos de Risco">Ativos de Risco</option>
-                                    <option value="Livre de Risco">Livre de Risco</option>
-                                    <option value="Misto">Misto</option>
-                                    <option value="Específico">Específico</option>
-                                </select>
-                            </div>
-                            <div class="form-group">
-                                <label for="prazo_resgate">Prazo de Resgate (dias)</label>
-                                <input type="number" id="prazo_resgate" name="prazo_resgate" value="30">
-                            </div>
-                        </div>
-                        
-                        <div class="form-row">
-                            <div class="form-group">
-                                <label for="gestor">Gestor *</label>
-                                <input type="text" id="gestor" name="gestor" required>
-                            </div>
-                            <div class="form-group">
-                                <label for="taxa_admin">Taxa de Administração (% a.a.) *</label>
-                                <input type="number" id="taxa_admin" name="taxa_admin" step="0.01" required>
-                            </div>
-                        </div>
-                        
-                        <div class="button-group">
-                            <button type="submit" class="btn btn-secondary">💾 Salvar Fundo</button>
-                            <button type="button" class="btn" onclick="cancelarFormulario()">❌ Cancelar</button>
-                        </div>
-                    </form>
-                </div>
-
-                <div id="formulario-ativo" style="display: none; margin-top: 20px; border-top: 2px solid #e2e8f0; padding-top: 20px;">
-                    <h5>Cadastrar Novo Ativo</h5>
-                    <form id="form-ativo" enctype="multipart/form-data">
-                        <div class="form-group">
-                            <label for="tipo_ativo">Tipo do Ativo *</label>
-                            <select id="tipo_ativo" name="tipo_ativo" required>
-                                <option value="">Selecione o tipo de ativo...</option>
-                                <option value="Ações de companhias fechadas">Ações de companhias fechadas</option>
-                                <option value="Quotas de sociedades limitadas">Quotas de sociedades limitadas</option>
-                                <option value="Debêntures (inclusive conversíveis)">Debêntures (inclusive conversíveis)</option>
-                                <option value="Notas comerciais">Notas comerciais</option>
-                                <option value="Cédulas de Crédito Bancário (CCB)">Cédulas de Crédito Bancário (CCB)</option>
-                                <option value="Cédulas de Crédito Imobiliário (CCI)">Cédulas de Crédito Imobiliário (CCI)</option>
-                                <option value="Certificados de Recebíveis Imobiliários (CRI)">Certificados de Recebíveis Imobiliários (CRI)</option>
-                                <option value="Certificados de Recebíveis do Agronegócio (CRA)">Certificados de Recebíveis do Agronegócio (CRA)</option>
-                                <option value="Direitos creditórios Recebíveis comerciais">Direitos creditórios Recebíveis comerciais</option>
-                                <option value="Recebíveis financeiros">Recebíveis financeiros</option>
-                                <option value="Créditos inadimplentes (NPL)">Créditos inadimplentes (NPL)</option>
-                                <option value="Créditos judiciais">Créditos judiciais</option>
-                                <option value="Precatórios">Precatórios</option>
-                                <option value="Imóveis">Imóveis</option>
-                                <option value="Terrenos">Terrenos</option>
-                                <option value="Direitos reais sobre imóveis">Direitos reais sobre imóveis</option>
-                                <option value="Participações em SPE">Participações em SPE</option>
-                                <option value="Projetos de infraestrutura">Projetos de infraestrutura</option>
-                                <option value="Concessões">Concessões</option>
-                                <option value="Parcerias Público-Privadas (PPP)">Parcerias Público-Privadas (PPP)</option>
-                                <option value="Royalties">Royalties</option>
-                                <option value="Direitos econômicos">Direitos econômicos</option>
-                                <option value="Créditos de carbono">Créditos de carbono</option>
-                                <option value="Quotas de FIP">Quotas de FIP</option>
-                                <option value="Quotas de FII">Quotas de FII</option>
-                                <option value="Quotas de FIDC">Quotas de FIDC</option>
-                                <option value="Green Bonds">Green Bonds</option>
-                                <option value="Floating Rate Notes (FRN)">Floating Rate Notes (FRN)</option>
-                                <option value="Fixed Rate Bonds">Fixed Rate Bonds</option>
-                                <option value="Portuguese Government Bonds (Portugal)">Portuguese Government Bonds (Portugal)</option>
-                                <option value="Gilts (Reino Unido)">Gilts (Reino Unido)</option>
-                                <option value="OATs (França)">OATs (França)</option>
-                                <option value="Corporate Bonds Fixed rate">Corporate Bonds Fixed rate</option>
-                                <option value="Corporate Bonds Floating rates">Corporate Bonds Floating rates</option>
-                                <option value="TIPS – Treasury Inflation-Protected Securities">TIPS – Treasury Inflation-Protected Securities</option>
-                            </select>
-                        </div>
-
-                        <div class="form-group">
-                            <label for="detalhes">Detalhes do Ativo</label>
-                            <textarea id="detalhes" name="detalhes" rows="3" placeholder="Descreva os detalhes do ativo..."></textarea>
-                        </div>
-
-                        <div class="form-row">
-                            <div class="form-group">
-                                <label for="taxa_fixa">Remuneração - Taxa Fixa (%)</label>
-                                <input type="number" id="taxa_fixa" name="taxa_fixa" step="0.0001" placeholder="Ex: 12.5">
-                            </div>
-                            <div class="form-group">
-                                <label for="taxa_variavel">Remuneração - Taxa Variável</label>
-                                <select id="taxa_variavel" name="taxa_variavel">
-                                    <option value="">Nenhuma</option>
-                                    <option value="CDI">CDI</option>
-                                    <option value="Selic">Selic</option>
-                                    <option value="Cambial">Cambial</option>
-                                    <option value="IPCA">IPCA</option>
-                                    <option value="IGPM">IGPM</option>
-                                </select>
-                            </div>
-                        </div>
-
-                        <div class="form-group">
-                            <label>Vencimentos</label>
-                            <div id="vencimentos-container">
-                                <div class="form-row" style="margin-bottom: 10px;">
-                                    <input type="date" name="vencimentos[]" class="vencimento-input">
-                                    <button type="button" class="btn btn-secondary" onclick="adicionarDataVencimento()" style="padding: 5px 15px;">+</button>
-                                </div>
-                            </div>
-                        </div>
-
-                        <div class="form-group">
-                            <label for="info_gerais">Informações Gerais (máx. 1000 caracteres)</label>
-                            <textarea id="info_gerais" name="info_gerais" rows="5" maxlength="1000" placeholder="Informações adicionais..."></textarea>
-                        </div>
-
-                        <div class="form-group">
-                            <label for="documento">Upload do Documento</label>
-                            <input type="file" id="documento" name="documento" class="btn" style="background: #f7fafc; color: #4a5568; border: 2px dashed #e2e8f0; width: 100%;">
-                        </div>
-
-                        <div class="button-group">
-                            <button type="submit" class="btn btn-secondary">💾 Salvar Ativo</button>
-                            <button type="button" class="btn" onclick="cancelarFormularioAtivo()">❌ Cancelar</button>
-                        </div>
-                    </form>
-                </div>
-
-            </div>
-
-            <!-- Tab: Relatórios -->
-            <div id="tab-relatorios" class="tab-content">
-                <h4>📈 Gerador de Relatórios Personalizados</h4>
-                
-                <div class="form-row">
-                    <div class="form-group">
-                        <label for="tipo-relatorio">Tipo de Relatório</label>
-                        <select id="tipo-relatorio">
-                            <option value="completo">Relatório Completo</option>
-                            <option value="fundos">Apenas Fundos</option>
-                            <option value="compromissos">Apenas Compromissos</option>
-                            <option value="recebimentos">Apenas Recebimentos</option>
-                            <option value="subscricoes">Apenas Subscrições</option>
-                        </select>
-                    </div>
-                    <div class="form-group">
-                        <label for="fundos-relatorio">Fundos (deixe vazio para todos)</label>
-                        <select id="fundos-relatorio" multiple>
-                            <!-- Preenchido dinamicamente -->
-                        </select>
-                    </div>
-                </div>
-                
-                <div class="form-row">
-                    <div class="form-group">
-                        <label for="data-inicio">Data Início</label>
-                        <input type="date" id="data-inicio">
-                    </div>
-                    <div class="form-group">
-                        <label for="data-fim">Data Fim</label>
-                        <input type="date" id="data-fim">
-                    </div>
-                </div>
-                
-                <div class="button-group">
-                    <button class="btn btn-secondary" onclick="gerarRelatorioPersonalizado()">📊 Gerar Relatório</button>
-                </div>
-            </div>
-        </div>
-
-        <!-- Data Display -->
-        <div class="data-section">
-            <h3 id="data-title">📋 Dados do Sistema</h3>
-            <div id="data-content">
-                <div class="loading">
-                    <p>Selecione uma opção acima para visualizar os dados</p>
-                </div>
-            </div>
-        </div>
-
-        <!-- Modal para Edição de Fundos -->
-        <div id="modal-editar-fundo" class="modal">
-            <div class="modal-content">
-                <span class="close" onclick="fecharModal()">&times;</span>
-                <h3>✏️ Editar Fundo</h3>
-                <form id="form-editar-fundo">
-                    <input type="hidden" id="edit-fundo-id">
-                    
-                    <div class="form-row">
-                        <div class="form-group">
-                            <label for="edit-nome">Nome do Fundo</label>
-                            <input type="text" id="edit-nome" name="nome" required>
-                        </div>
-                        <div class="form-group">
-                            <label for="edit-cnpj">CNPJ</label>
-                            <input type="text" id="edit-cnpj" name="cnpj" required>
-                        </div>
-                    </div>
-                    
-                    <div class="form-row">
-                        <div class="form-group">
-                            <label for="edit-patrimonio">Patrimônio (R$)</label>
-                            <input type="number" id="edit-patrimonio" name="patrimonio" step="0.01" required>
-                        </div>
-                        <div class="form-group">
-                            <label for="edit-liquidez">Liquidez (R$)</label>
-                            <input type="number" id="edit-liquidez" name="liquidez" step="0.01" required>
-                        </div>
-                    </div>
-                    
-                    <div class="form-row">
-                        <div class="form-group">
-                            <label for="edit-politica_liquidez">Política de Liquidez</label>
-                            <select id="edit-politica_liquidez" name="politica_liquidez" required>
-                                <option value="Ativos de Risco">Ativos de Risco</option>
-                                <option value="Livre de Risco">Livre de Risco</option>
-                                <option value="Misto">Misto</option>
-                                <option value="Específico">Específico</option>
-                            </select>
-                        </div>
-                        <div class="form-group">
-                            <label for="edit-prazo_resgate">Prazo de Resgate (dias)</label>
-                            <input type="number" id="edit-prazo_resgate" name="prazo_resgate" required>
-                        </div>
-                    </div>
-
-                    <div class="form-row">
-                        <div class="form-group">
-                            <label for="edit-gestor">Gestor</label>
-                            <input type="text" id="edit-gestor" name="gestor" required>
-                        </div>
-                        <div class="form-group">
-                            <label for="edit-taxa_admin">Taxa de Administração (% a.a.)</label>
-                            <input type="number" id="edit-taxa_admin" name="taxa_admin" step="0.01" required>
-                        </div>
-                    </div>
-
-                    <div class="form-group">
-                        <label for="edit-status">Status</label>
-                        <select id="edit-status" name="status">
-                            <option value="ATIVO">ATIVO</option>
-                            <option value="INATIVO">INATIVO</option>
-                            <option value="SUSPENSO">SUSPENSO</option>
-                        </select>
-                    </div>
-                    
-                    <div class="button-group">
-                        <button type="submit" class="btn btn-secondary">💾 Atualizar Fundo</button>
-                        <button type="button" class="btn" onclick="fecharModal()">❌ Cancelar</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        // Configuração da API
-        const API_URL = window.location.origin;
-        let fundoAtual = '';
-
-        // Funções de Utilidade
-        function formatarMoeda(valor) {
-            return new Intl.NumberFormat('pt-BR', {
-                style: 'currency',
-                currency: 'BRL'
-            }).format(valor);
-        }
-
-        async function fazerRequisicao(endpoint, options = {}) {
-            try {
-                const response = await fetch(`${API_URL}${endpoint}`, {
-                    ...options,
-                    headers: {
-                        'Content-Type': 'application/json',
-                        ...options.headers
-                    }
-                });
-                return await response.json();
-            } catch (error) {
-                console.error('Erro na requisição:', error);
-                return { success: false, error: 'Erro de conexão com o servidor' };
-            }
-        }
-
-        // Navegação por Tabs
-        function mostrarTab(tabId, btn) {
-            document.querySelectorAll('.tab-content').forEach(tab => tab.classList.remove('active'));
-            document.querySelectorAll('.tab-btn').forEach(b => b.classList.remove('active'));
-            
-            document.getElementById(`tab-${tabId}`).classList.add('active');
-            btn.classList.add('active');
-        }
-
-        // Gerenciamento de Fundos
-        async function carregarFundos() {
-            const result = await fazerRequisicao('/fundos');
-            if (result.success) {
-                const select = document.getElementById('fundo-select');
-                const selectRel = document.getElementById('fundos-relatorio');
-                
-                let options = '<option value="">Todos os Fundos</option>';
-                let optionsRel = '';
-                
-                result.data.forEach(fundo => {
-                    options += `<option value="${fundo.id}">${fundo.nome}</option>`;
-                    optionsRel += `<option value="${fundo.id}">${fundo.nome}</option>`;
-                });
-                
-                select.innerHTML = options;
-                selectRel.innerHTML = optionsRel;
-                
-                select.onchange = (e) => {
-                    fundoAtual = e.target.value;
-                };
-            }
-        }
-
-        async function carregarResumoGeral() {
-            const result = await fazerRequisicao('/relatorios');
-            if (result.success) {
-                const resumo = result.data.resumo_geral;
-                document.getElementById('patrimonio-total').textContent = formatarMoeda(resumo.patrimonio_total);
-                document.getElementById('liquidez-total').textContent = formatarMoeda(resumo.liquidez_total);
-                document.getElementById('compromissos-total').textContent = formatarMoeda(resumo.compromissos_pendentes);
-                document.getElementById('recebimentos-total').textContent = formatarMoeda(resumo.recebimentos_pendentes);
-            }
-        }
-
-        function mostrarFormularioFundo() {
-            document.getElementById('formulario-fundo').style.display = 'block';
-        }
-
-        function cancelarFormulario() {
-            document.getElementById('formulario-fundo').style.display = 'none';
-            document.getElementById('form-fundo').reset();
-        }
-
-        async function listarFundos() {
-            const result = await fazerRequisicao('/fundos');
-            if (result.success) {
-                let html = '<table class="table"><thead><tr><th>Nome</th><th>CNPJ</th><th>Patrimônio</th><th>Status</th><th>Ações</th></tr></thead><tbody>';
-                result.data.forEach(fundo => {
-                    html += `
-                        <tr>
-                            <td>${fundo.nome}</td>
-                            <td>${fundo.cnpj}</td>
-                            <td>${formatarMoeda(fundo.patrimonio)}</td>
-                            <td>${fundo.status}</td>
-                            <td>
-                                <button class="btn" style="padding: 5px 10px; font-size: 0.8rem;" onclick="abrirEditarFundo('${fundo.id}')">✏️</button>
-                                <button class="btn btn-danger" style="padding: 5px 10px; font-size: 0.8rem;" onclick="deletarFundo('${fundo.id}')">🗑️</button>
-                            </td>
-                        </tr>
-                    `;
-                });
-                html += '</tbody></table>';
-                mostrarDados('📋 Lista de Fundos', html);
-            }
-        }
-
-        async function abrirEditarFundo(id) {
-            const result = await fazerRequisicao(`/fundos/${id}`);
-            if (result.success) {
-                const fundo = result.data;
-                document.getElementById('edit-fundo-id').value = fundo.id;
-                document.getElementById('edit-nome').value = fundo.nome;
-                document.getElementById('edit-cnpj').value = fundo.cnpj;
-                document.getElementById('edit-patrimonio').value = fundo.patrimonio;
-                document.getElementById('edit-liquidez').value = fundo.liquidez;
-                document.getElementById('edit-politica_liquidez').value = fundo.politica_liquidez;
-                document.getElementById('edit-prazo_resgate').value = fundo.prazo_resgate;
-                document.getElementById('edit-gestor').value = fundo.gestor;
-                document.getElementById('edit-taxa_admin').value = fundo.taxa_admin;
-                document.getElementById('edit-status').value = fundo.status;
-                
-                document.getElementById('modal-editar-fundo').style.display = 'block';
-            }
-        }
-
-        function fecharModal() {
-            document.getElementById('modal-editar-fundo').style.display = 'none';
-        }
-
-        async function deletarFundo(id) {
-            if (confirm('Tem certeza que deseja deletar este fundo? Todos os dados relacionados serão removidos.')) {
-                const result = await fazerRequisicao(`/fundos/${id}`, { method: 'DELETE' });
-                if (result.success) {
-                    mostrarSucesso(result.message);
-                    listarFundos();
-                    carregarFundos();
-                    carregarResumoGeral();
-                } else {
-                    mostrarErro(result.error);
-                }
-            }
-        }
-
-        // Relatórios
-        async function carregarRelatorios() {
-            const result = await fazerRequisicao('/relatorios');
-            if (result.success) {
-                const data = result.data;
-                let html = '<h4>Resumo por Fundo</h4><table class="table"><thead><tr><th>Fundo</th><th>Liquidez</th><th>Compromissos</th><th>Recebimentos</th><th>Saldo Projetado</th></tr></thead><tbody>';
-                
-                data.relatorio_por_fundo.forEach(item => {
-                    html += `
-                        <tr>
-                            <td>${item.fundo.nome}</td>
-                            <td>${formatarMoeda(item.fundo.liquidez)}</td>
-                            <td>${formatarMoeda(item.compromissos)}</td>
-                            <td>${formatarMoeda(item.recebimentos)}</td>
-                            <td style="font-weight: bold; color: ${item.saldo_projetado >= 0 ? '#2f855a' : '#c53030'}">
-                                ${formatarMoeda(item.saldo_projetado)}
-                            </td>
-                        </tr>
-                    `;
-                });
-                
-                html += '</tbody></table>';
-                mostrarDados('📈 Relatório Consolidado', html);
-            }
-        }
-
-        async function gerarRelatorioPersonalizado() {
-            const tipo = document.getElementById('tipo-relatorio').value;
-            const selectFundos = document.getElementById('fundos-relatorio');
-            const fundos = Array.from(selectFundos.selectedOptions).map(opt => opt.value);
-            const data_inicio = document.getElementById('data-inicio').value;
-            const data_fim = document.getElementById('data-fim').value;
-
-            const result = await fazerRequisicao('/relatorios/gerar', {
-                method: 'POST',
-                body: JSON.stringify({ tipo, fundos, data_inicio, data_fim })
-            });
-
-            if (result.success) {
-                const relatorio = result.data;
-                let html = `
-                    <div class="alert success">
-                        <strong>Relatório Gerado:</strong> ${relatorio.tipo.toUpperCase()}<br>
-                        <strong>Data:</strong> ${relatorio.data_geracao}
-                    </div>
-                `;
-
-                if (relatorio.dados.fundos) {
-                    html += '<h4>Fundos Analisados</h4>';
-                    html += '<table class="table"><thead><tr><th>Nome</th><th>CNPJ</th><th>Patrimônio</th></tr></thead><tbody>';
-                    relatorio.dados.fundos.forEach(f => {
-                        html += `<tr><td>${f.nome}</td><td>${f.cnpj}</td><td>${formatarMoeda(f.patrimonio)}</td></tr>`;
-                    });
-                    html += '</tbody></table>';
-
-                    if (relatorio.dados.estatisticas_fundos) {
-                        const stats = relatorio.dados.estatisticas_fundos;
-                        html += `
-                            <h5>📈 Estatísticas</h5>
-                            <p><strong>Patrimônio Total:</strong> ${formatarMoeda(stats.total_patrimonio)}</p>
-                            <p><strong>Liquidez Total:</strong> ${formatarMoeda(stats.total_liquidez)}</p>
-                            <p><strong>Patrimônio Médio:</strong> ${formatarMoeda(stats.patrimonio_medio)}</p>
-                            <p><strong>Liquidez Média:</strong> ${formatarMoeda(stats.liquidez_media)}</p>
-                        `;
-                    }
-                }
-
-                if (relatorio.dados.compromissos) {
-                    html += `<h4>💸 Compromissos (Total: ${formatarMoeda(relatorio.dados.total_compromissos)})</h4>`;
-                    html += '<table class="table"><thead><tr><th>Tipo</th><th>Valor</th><th>Vencimento</th></tr></thead><tbody>';
-                    relatorio.dados.compromissos.forEach(comp => {
-                        html += `<tr><td>${comp.tipo}</td><td>${formatarMoeda(comp.valor)}</td><td>${comp.vencimento}</td></tr>`;
-                    });
-                    html += '</tbody></table>';
-                }
-
-                if (relatorio.dados.recebimentos) {
-                    html += `<h4>💰 Recebimentos (Total: ${formatarMoeda(relatorio.dados.total_recebimentos)})</h4>`;
-                    html += '<table class="table"><thead><tr><th>Tipo</th><th>Valor</th><th>Vencimento</th></tr></thead><tbody>';
-                    relatorio.dados.recebimentos.forEach(rec => {
-                        html += `<tr><td>${rec.tipo}</td><td>${formatarMoeda(rec.valor)}</td><td>${rec.vencimento}</td></tr>`;
-                    });
-                    html += '</tbody></table>';
-                }
-
-                if (relatorio.dados.subscricoes) {
-                    html += `<h4>📋 Subscrições (Total: ${formatarMoeda(relatorio.dados.total_subscricoes)})</h4>`;
-                    html += '<table class="table"><thead><tr><th>Cotista</th><th>Valor</th><th>Vencimento</th></tr></thead><tbody>';
-                    relatorio.dados.subscricoes.forEach(sub => {
-                        html += `<tr><td>${sub.cotista}</td><td>${formatarMoeda(sub.valor_parcela)}</td><td>${sub.vencimento}</td></tr>`;
-                    });
-                    html += '</tbody></table>';
-                }
-
-                mostrarDados('📊 Relatório Personalizado', html);
-            } else {
-                mostrarErro(result.error);
-            }
-        }
-
-        // Carregar templates de relatório
-        async function carregarTemplatesRelatorio() {
-            const result = await fazerRequisicao('/relatorios/templates');
-            if (result.success) {
-                let html = '<h4>📋 Templates de Relatórios Disponíveis</h4>';
-                result.data.forEach(template => {
-                    html += `
-                        <div style="margin-bottom: 15px; padding: 15px; border: 1px solid #e2e8f0; border-radius: 8px;">
-                            <h5>${template.nome}</h5>
-                            <p>${template.descricao}</p>
-                            <button class="btn" onclick="selecionarTemplate('${template.id}')" style="margin-top: 10px;">Usar Template</button>
-                        </div>
-                    `;
-                });
-                mostrarDados('📋 Templates de Relatórios', html);
-            }
-        }
-
-        // Selecionar template
-        function selecionarTemplate(templateId) {
-            document.getElementById('tipo-relatorio').value = templateId;
-            mostrarTab('relatorios', document.querySelector('.tab-btn:nth-child(3)'));
-        }
-
-        // Event Listeners para formulários
-        document.getElementById('form-fundo').addEventListener('submit', async function(e) {
-            e.preventDefault();
-            
-            const formData = new FormData(e.target);
-            const dados = Object.fromEntries(formData.entries());
-            
-            const result = await fazerRequisicao('/fundos', {
-                method: 'POST',
-                body: JSON.stringify(dados)
-            });
-            
-            if (result.success) {
-                mostrarSucesso(result.message);
-                cancelarFormulario();
-                carregarFundos();
-                carregarResumoGeral();
-                listarFundos();
-            } else {
-                mostrarErro(result.error);
-            }
-        });
-
-        document.getElementById('form-editar-fundo').addEventListener('submit', async function(e) {
-            e.preventDefault();
-            
-            const fundoId = document.getElementById('edit-fundo-id').value;
-            const formData = new FormData(e.target);
-            const dados = Object.fromEntries(formData.entries());
-            delete dados.id; // Remover ID dos dados
-            
-            const result = await fazerRequisicao(`/fundos/${fundoId}`, {
-                method: 'PUT',
-                body: JSON.stringify(dados)
-            });
-            
-            if (result.success) {
-                mostrarSucesso(result.message);
-                fecharModal();
-                listarFundos();
-                carregarFundos();
-                carregarResumoGeral();
-            } else {
-                mostrarErro(result.error);
-            }
-        });
-
-        // Funções existentes (mantidas)
-        async function carregarDashboard() {
-            if (!fundoAtual) {
-                mostrarErro('Selecione um fundo específico para ver o dashboard');
-                return;
-            }
-
-            const result = await fazerRequisicao(`/dashboard/${fundoAtual}`);
-            if (result.success) {
-                const data = result.data;
-                let html = `
-                    <div class="alert success">
-                        <strong>Dashboard do ${data.fundo.nome}</strong><br>
-                        Atualizado em: ${data.data_atualizacao}
-                    </div>
-                    
-                    <h4>📊 Informações do Fundo</h4>
-                    <table class="table">
-                        <tr><td><strong>CNPJ:</strong></td><td>${data.fundo.cnpj}</td></tr>
-                        <tr><td><strong>Gestor:</strong></td><td>${data.fundo.gestor}</td></tr>
-                        <tr><td><strong>Patrimônio:</strong></td><td>${formatarMoeda(data.fundo.patrimonio)}</td></tr>
-                        <tr><td><strong>Liquidez:</strong></td><td>${formatarMoeda(data.fundo.liquidez)}</td></tr>
-                        <tr><td><strong>Política:</strong></td><td>${data.fundo.politica_liquidez}</td></tr>
-                        <tr><td><strong>Taxa Admin:</strong></td><td>${data.fundo.taxa_admin}% a.a.</td></tr>
-                    </table>
-
-                    <h4>💰 Projeções de Fluxo de Caixa</h4>
-                    <table class="table">
-                        <thead>
-                            <tr>
-                                <th>Período</th>
-                                <th>Entradas</th>
-                                <th>Saídas</th>
-                                <th>Saldo Projetado</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                `;
-
-                data.projecoes.forEach(proj => {
-                    html += `
-                        <tr>
-                            <td>${proj.periodo}</td>
-                            <td>${formatarMoeda(proj.entradas)}</td>
-                            <td>${formatarMoeda(proj.saidas)}</td>
-                            <td>${formatarMoeda(proj.saldo_projetado)}</td>
-                        </tr>
-                    `;
-                });
-
-                html += '</tbody></table>';
-
-                if (data.alertas.length > 0) {
-                    html += '<h4>🚨 Alertas Importantes</h4><div class="alert">';
-                    data.alertas.forEach(alerta => {
-                        html += `<p>• ${alerta}</p>`;
-                    });
-                    html += '</div>';
-                }
-
-                mostrarDados('📊 Dashboard de Tesouraria', html);
-            }
-        }
-
-        async function carregarCompromissos() {
-            const endpoint = fundoAtual ? `/compromissos?fundo_id=${fundoAtual}` : '/compromissos';
-            const result = await fazerRequisicao(endpoint);
-            
-            if (result.success) {
-                let html = `
-                    <div class="alert success">
-                        <strong>Total de Compromissos:</strong> ${formatarMoeda(result.total_valor)} 
-                        (${result.total_itens} itens)
-                    </div>
-                    <table class="table">
-                        <thead>
-                            <tr>
-                                <th>ID</th>
-                                <th>Tipo</th>
-                                <th>Valor</th>
-                                <th>Vencimento</th>
-                                <th>Status</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                `;
-
-                result.data.forEach(comp => {
-                    html += `
-                        <tr>
-                            <td>${comp.id}</td>
-                            <td>${comp.tipo}</td>
-                            <td>${formatarMoeda(comp.valor)}</td>
-                            <td>${comp.vencimento}</td>
-                            <td><span class="status-pendente">${comp.status}</span></td>
-                        </tr>
-                    `;
-                });
-
-                html += '</tbody></table>';
-                mostrarDados('💸 Compromissos de Pagamento', html);
-            }
-        }
-
-        async function carregarRecebimentos() {
-            const endpoint = fundoAtual ? `/recebimentos?fundo_id=${fundoAtual}` : '/recebimentos';
-            const result = await fazerRequisicao(endpoint);
-            
-            if (result.success) {
-                let html = `
-                    <div class="alert success">
-                        <strong>Total de Recebimentos:</strong> ${formatarMoeda(result.total_valor)} 
-                        (${result.total_itens} itens)
-                    </div>
-                    <table class="table">
-                        <thead>
-                            <tr>
-                                <th>ID</th>
-                                <th>Tipo</th>
-                                <th>Valor</th>
-                                <th>Vencimento</th>
-                                <th>Status</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                `;
-
-                result.data.forEach(rec => {
-                    html += `
-                        <tr>
-                            <td>${rec.id}</td>
-                            <td>${rec.tipo}</td>
-                            <td>${formatarMoeda(rec.valor)}</td>
-                            <td>${rec.vencimento}</td>
-                            <td><span class="status-pendente">${rec.status}</span></td>
-                        </tr>
-                    `;
-                });
-
-                html += '</tbody></table>';
-                mostrarDados('💰 Recebimentos Esperados', html);
-            }
-        }
-
-        async function carregarSubscricoes() {
-            const endpoint = fundoAtual ? `/subscricoes?fundo_id=${fundoAtual}` : '/subscricoes';
-            const result = await fazerRequisicao(endpoint);
-            
-            if (result.success) {
-                let html = `
-                    <div class="alert success">
-                        <strong>Total de Subscrições:</strong> ${formatarMoeda(result.total_valor)} 
-                        (${result.total_itens} itens)
-                    </div>
-                    <table class="table">
-                        <thead>
-                            <tr>
-                                <th>ID</th>
-                                <th>Cotista</th>
-                                <th>CPF/CNPJ</th>
-                                <th>Cotas</th>
-                                <th>Valor</th>
-                                <th>Vencimento</th>
-                                <th>Parcela</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                `;
-
-                result.data.forEach(sub => {
-                    html += `
-                        <tr>
-                            <td>${sub.id}</td>
-                            <td>${sub.cotista}</td>
-                            <td>${sub.cpf_cnpj}</td>
-                            <td>${sub.cotas}</td>
-                            <td>${formatarMoeda(sub.valor_parcela)}</td>
-                            <td>${sub.vencimento}</td>
-                            <td>${sub.parcela}</td>
-                        </tr>
-                    `;
-                });
-
-                html += '</tbody></table>';
-                mostrarDados('📋 Subscrições Pendentes', html);
-            }
-        }
-
-        async function carregarOutliers() {
-            const result = await fazerRequisicao('/outliers');
-            
-            if (result.success) {
-                const data = result.data;
-                let html = `
-                    <h4>💸 Análise de Compromissos</h4>
-                    <table class="table">
-                        <tr><td><strong>Média:</strong></td><td>${formatarMoeda(data.compromissos.media)}</td></tr>
-                        <tr><td><strong>Máximo:</strong></td><td>${formatarMoeda(data.compromissos.maximo)}</td></tr>
-                        <tr><td><strong>Mínimo:</strong></td><td>${formatarMoeda(data.compromissos.minimo)}</td></tr>
-                    </table>
-                `;
-
-                if (data.compromissos.outliers.length > 0) {
-                    html += '<h5>🔴 Outliers de Compromissos</h5>';
-                    data.compromissos.outliers.forEach(outlier => {
-                        html += `<p>• ${outlier.item.tipo}: ${formatarMoeda(outlier.item.valor)} (+${outlier.desvio_percentual}% da média)</p>`;
-                    });
-                } else {
-                    html += '<p>✅ Nenhum outlier encontrado em compromissos</p>';
-                }
-
-                html += `
-                    <h4>💰 Análise de Recebimentos</h4>
-                    <table class="table">
-                        <tr><td><strong>Média:</strong></td><td>${formatarMoeda(data.recebimentos.media)}</td></tr>
-                        <tr><td><strong>Máximo:</strong></td><td>${formatarMoeda(data.recebimentos.maximo)}</td></tr>
-                        <tr><td><strong>Mínimo:</strong></td><td>${formatarMoeda(data.recebimentos.minimo)}</td></tr>
-                    </table>
-                `;
-
-                if (data.recebimentos.outliers.length > 0) {
-                    html += '<h5>🟡 Outliers de Recebimentos</h5>';
-                    data.recebimentos.outliers.forEach(outlier => {
-                        html += `<p>• ${outlier.item.tipo}: ${formatarMoeda(outlier.item.valor)} (+${outlier.desvio_percentual}% da média)</p>`;
-                    });
-                } else {
-                    html += '<p>✅ Nenhum outlier encontrado em recebimentos</p>';
-                }
+# --- ROTAS INTERNAS DOS SHARDS (usadas pelo roteador.py) ---
 
-                mostrarDados('📊 Análise de Outliers', html);
-            }
-        }
-
-        // Mostrar dados na tela
-        function mostrarDados(titulo, html) {
-            document.getElementById('data-title').textContent = titulo;
-            document.getElementById('data-content').innerHTML = html;
-        }
-
-        // Mostrar erro
-        function mostrarErro(mensagem) {
-            const html = `<div class="alert">${mensagem}</div>`;
-            mostrarDados('❌ Erro', html);
-        }
-
-        // Mostrar sucesso
-        function mostrarSucesso(mensagem) {
-            const html = `<div class="alert success">${mensagem}</div>`;
-            mostrarDados('✅ Sucesso', html);
-        }
-
-        // Fechar modal ao clicar fora
-        window.onclick = function(event) {
-            const modal = document.getElementById('modal-editar-fundo');
-            if (event.target == modal) {
-                modal.style.display = 'none';
-            }
-        }
+@app.route('/interno/carga', methods=['GET'])
+def get_carga_shard():
+    """Linhas dos livros de cada fundo deste processo (peso usado no rebalanceamento)"""
+    carga = dict.fromkeys(FUNDOS_DATA, 0)
+    for linhas in (COMPROMISSOS_DATA, RECEBIMENTOS_DATA, SUBSCRICOES_DATA):
+        for fundo_id in map(attrgetter("fundo_id"), linhas):
+            if fundo_id in carga:
+                carga[fundo_id] += 1
+    return jsonify({
+        "success": True,
+        "data": carga,
+        "total_itens": len(carga)
+    })
 
-        // Inicializar aplicação
-        document.addEventListener('DOMContentLoaded', function() {
-            carregarFundos();
-            carregarResumoGeral();
-        });
+@app.route('/interno/fundos/<fundo_id>/exportar', methods=['GET'])
+def exportar_fundo(fundo_id):
+    """Fundo com livros, ativos e histórico, para movê-lo para outro shard"""
+    if fundo_id not in FUNDOS_DATA:
+        return jsonify({"success": False, "error": "Fundo não encontrado"}), 404
     
-        function mostrarFormularioAtivo() {
-            document.getElementById('formulario-fundo').style.display = 'none';
-            document.getElementById('formulario-ativo').style.display = 'block';
-        }
-
-        function cancelarFormularioAtivo() {
-            document.getElementById('formulario-ativo').style.display = 'none';
-            document.getElementById('form-ativo').reset();
-            // Limpar datas extras de vencimento
-            const container = document.getElementById('vencimentos-container');
-            container.innerHTML = `
-                <div class="form-row" style="margin-bottom: 10px;">
-                    <input type="date" name="vencimentos[]" class="vencimento-input">
-                    <button type="button" class="btn btn-secondary" onclick="adicionarDataVencimento()" style="padding: 5px 15px;">+</button>
-                </div>
-            `;
-        }
-
-        function adicionarDataVencimento() {
-            const container = document.getElementById('vencimentos-container');
-            const div = document.createElement('div');
-            div.className = 'form-row';
-            div.style.marginBottom = '10px';
-            div.innerHTML = `
-                <input type="date" name="vencimentos[]" class="vencimento-input">
-                <button type="button" class="btn btn-danger" onclick="this.parentElement.remove()" style="padding: 5px 15px;">-</button>
-            `;
-            container.appendChild(div);
+    return jsonify({
+        "success": True,
+        "data": {
+            "fundo": FUNDOS_DATA[fundo_id],
+            "compromissos": INDICE_LIVROS.linhas("compromissos", fundo_id),
+            "recebimentos": INDICE_LIVROS.linhas("recebimentos", fundo_id),
+            "subscricoes": INDICE_LIVROS.linhas("subscricoes", fundo_id),
+            "ativos": REGISTRO_ATIVOS.listar(fundo_id),
+            "historico": HISTORICO_FUNDOS.exportar(fundo_id)
         }
+    })
 
-        // Listener para o formulário de ativos
-        document.addEventListener('DOMContentLoaded', function() {
-            const formAtivo = document.getElementById('form-ativo');
-            if (formAtivo) {
-                formAtivo.addEventListener('submit', async function(e) {
-                    e.preventDefault();
-                    
-                    const formData = new FormData(this);
-                    
-                    try {
-                        const response = await fetch('/ativos', {
-                            method: 'POST',
-                            body: formData
-                        });
-                        const result = await response.json();
-                        
-                        if (result.success) {
-                            mostrarSucesso(result.message);
-                            cancelarFormularioAtivo();
-                        } else {
-                            mostrarErro(result.error);
-                        }
-                    } catch (error) {
-                        mostrarErro('Erro ao conectar com o servidor');
-                    }
-                });
+@app.route('/interno/fundos/importar', methods=['POST'])
+def importar_fundo():
+    """Recebe um fundo exportado por outro shard (rebalanceamento)"""
+    try:
+        data = request.get_json()
+        fundo = Fundo.de_dict(data['fundo'])
+        if fundo.id in FUNDOS_DATA:
+            return jsonify({"success": False, "error": f"Fundo '{fundo.id}' já existe"}), 400
+        
+        # Subclasses identificadas pelos campos que só elas têm
+        compromissos = [(CompromissoProvisionado if "competencia" in c else Compromisso).de_dict(c)
+                        for c in data.get('compromissos', [])]
+        recebimentos = [Recebimento.de_dict(r) for r in data.get('recebimentos', [])]
+        subscricoes = [(SubscricaoCronograma if "compromisso_total" in s else Subscricao).de_dict(s)
+                       for s in data.get('subscricoes', [])]
+        
+        # Ids das linhas recebidas não podem coincidir com linhas deste shard
+        for nome, livro, linhas in (("compromissos", COMPROMISSOS_DATA, compromissos),
+                                    ("recebimentos", RECEBIMENTOS_DATA, recebimentos),
+                                    ("subscricoes", SUBSCRICOES_DATA, subscricoes)):
+            vistos = {linha.id for linha in livro}
+            repetidos = set()
+            for linha in linhas:
+                if linha.id in vistos:
+                    repetidos.add(linha.id)
+                vistos.add(linha.id)
+            if repetidos:
+                return jsonify({"success": False, "error": f"Ids de {nome} já existentes neste shard: {sorted(repetidos)}"}), 400
+        
+        for instante, patrimonio, liquidez in data.get('historico', []):
+            HISTORICO_FUNDOS.registrar(fundo.id, patrimonio, liquidez, instante)
+        FUNDOS_DATA[fundo.id] = fundo
+        COMPROMISSOS_DATA.extend(compromissos)
+        RECEBIMENTOS_DATA.extend(recebimentos)
+        SUBSCRICOES_DATA.extend(subscricoes)
+        for nome, linhas in (("compromissos", compromissos), ("recebimentos", recebimentos), ("subscricoes", subscricoes)):
+            ULTIMO_ID_LIVRO[nome] = max([ULTIMO_ID_LIVRO[nome]] + [linha.id for linha in linhas])
+        for compromisso in compromissos:
+            if isinstance(compromisso, CompromissoProvisionado):
+                PROVISOES_TAXA_ADMIN[(fundo.id, compromisso.competencia)] = compromisso
+        for ativo in data.get('ativos', []):
+            # O texto do documento não vem junto: o ativo volta ao índice de busca só pelos campos
+            REGISTRO_ATIVOS.registrar(ativo, centavos(ativo["valor_vencimento"]))
+            indexar_ativo(ativo)
+            notificar_mudanca("ativo", "criado", ativo["id"], fundo.id, list(ativo.keys()), ativo)
+        
+        # Com a série importada, o fundo chega com o mesmo histórico da origem, sem ponto extra
+        notificar_mudanca("fundo", "criado", fundo.id, fundo.id, list(fundo.keys()), fundo,
+                          historico=not data.get('historico'))
+        for entidade, linhas in (("compromisso", compromissos), ("recebimento", recebimentos), ("subscricao", subscricoes)):
+            if linhas:
+                notificar_mudanca(entidade, "criado", None, fundo.id)
+        
+        return jsonify({
+            "success": True,
+            "message": f"Fundo '{fundo.nome}' importado com sucesso!",
+            "data": {
+                "fundo_id": fundo.id,
+                "linhas": len(compromissos) + len(recebimentos) + len(subscricoes),
+                "ativos": len(data.get('ativos', []))
             }
-        });
+        }), 201
+        
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# =========================================================
+# 3. APLICAÇÃO FLASK PRINCIPAL
+# =========================================================
 
-    </script>
-</body>
-</html>
-"""
+# HTML/CSS/JS da Interface Web (Front-end), servidos a partir da pasta frontend/
+FRONTEND = Frontend()
 
 @app.route('/')
 def serve_index():
     """Serve a página HTML principal"""
-    return HTML_CONTENT
+    return FRONTEND.index.responder(request)
+
+@app.route('/assets/<nome>')
+def serve_asset(nome):
+    """Serve os arquivos CSS/JS versionados da interface"""
+    arquivo = FRONTEND.assets.get(nome)
+    if arquivo is None:
+        return jsonify({"success": False, "error": "Arquivo não encontrado"}), 404
+    return arquivo.responder(request)
 
 if __name__ == '__main__':
     # Ajuste para deploy no Render: usa a porta da variável de ambiente ou 5000 como padrão
@@ -0,0 +1,339 @@
+# SISTEMA TOMATE FUND - VISÕES MATERIALIZADAS AGENDADAS
+# Resultados de rotas muito repetidas (resumo de /relatorios, dashboards por fundo,
+# outliers) calculados em segundo plano e servidos prontos, com a data da última
+# atualização. Cada visão é recalculada:
+#   - pela agenda cron (minuto hora dia mês dia-da-semana, hora local), com um
+#     deslocamento fixo de alguns segundos por visão para que não disparem juntas
+#     (a agenda pode ser trocada em TOMATE_AGENDA_<NOME>, ex.: TOMATE_AGENDA_RELATORIOS)
+#   - logo após uma alteração de dados (notificar_mudanca), com um pequeno atraso que
+#     junta rajadas de alterações em uma única atualização
+# Uma única thread por processo executa as atualizações, uma de cada vez e com uma pausa
+# entre elas: o tráfego ao vivo nunca espera por uma atualização, só lê a última versão.
+# Sob o worker gevent (gunicorn.conf.py) essa "thread" é um greenlet: o cálculo em si vai
+# para o pool de threads nativas do hub, e o laço de eventos continua atendendo as
+# requisições e o stream de eventos enquanto a visão é calculada.
+# Visões por chave (ex.: dashboard de cada fundo) só guardam as chaves já consultadas e
+# descartam as que ficam sem leitura por TOMATE_VISOES_OCIOSIDADE segundos.
+# TOMATE_VISOES=0 desliga as visões: as rotas voltam a calcular a cada requisição.
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+HABILITADO = os.environ.get("TOMATE_VISOES", "1") != "0"
+AGENDA_PADRAO = "*/5 * * * *"
+# Espera após uma alteração antes de atualizar (alterações nesse intervalo viram uma atualização)
+ATRASO_MUDANCA = float(os.environ.get("TOMATE_VISOES_ATRASO", 2.0))
+# Pausa entre duas atualizações seguidas, para intercalar com as requisições ao vivo
+PAUSA_ENTRE_ATUALIZACOES = float(os.environ.get("TOMATE_VISOES_PAUSA", 0.05))
+MAXIMO_OCIOSO = float(os.environ.get("TOMATE_VISOES_OCIOSIDADE", 24 * 3600))
+
+try:
+    from gevent import get_hub
+    from gevent.monkey import is_module_patched
+except ImportError:
+    get_hub = None
+
+# Campos da agenda cron: (mínimo, máximo); dia da semana 0-7 (0 e 7 = domingo)
+_LIMITES_CRON = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _campo_cron(texto, minimo, maximo):
+    """'*', '*/15', '1-5', '0,30', '8-18/2' -> conjunto de valores"""
+    valores = set()
+    for parte in texto.split(","):
+        faixa, barra, passo = parte.partition("/")
+        passo = int(passo) if barra else 1
+        if faixa == "*":
+            a, b = minimo, maximo
+        elif "-" in faixa:
+            a, b = map(int, faixa.split("-"))
+        else:
+            a = int(faixa)
+            b = maximo if barra else a
+        if not minimo <= a <= b <= maximo or passo < 1:
+            raise ValueError(texto)
+        valores.update(range(a, b + 1, passo))
+    return frozenset(valores)
+
+
+def _formatar(instante):
+    return datetime.fromtimestamp(instante).strftime("%Y-%m-%dT%H:%M:%S") if instante else None
+
+
+class AgendaCron:
+    """Expressão cron de 5 campos (minuto hora dia mês dia-da-semana), em hora local"""
+
+    def __init__(self, expressao):
+        campos = expressao.split()
+        try:
+            if len(campos) != 5:
+                raise ValueError(expressao)
+            self.minutos, self.horas, self.dias, self.meses, dias_semana = (
+                _campo_cron(campo, *limites) for campo, limites in zip(campos, _LIMITES_CRON)
+            )
+        except ValueError:
+            raise ValueError(f"Agenda cron inválida: '{expressao}' (use 'minuto hora dia mês dia-da-semana')")
+        self.expressao = expressao
+        self.dias_semana = frozenset(d % 7 for d in dias_semana)
+        # Como no cron: com dia do mês e dia da semana restritos, basta um dos dois
+        self._qualquer_dia = campos[2] != "*" and campos[4] != "*"
+
+    def _dia_valido(self, data):
+        dia_semana = (data.weekday() + 1) % 7
+        if self._qualquer_dia:
+            return data.day in self.dias or dia_semana in self.dias_semana
+        return data.day in self.dias and dia_semana in self.dias_semana
+
+    def proxima(self, depois):
+        """Próximo horário (datetime) da agenda estritamente depois de 'depois'"""
+        data = depois.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 29/02 em um dia da semana específico pode levar anos para se repetir
+        limite = data + timedelta(days=366 * 8)
+        while data < limite:
+            if data.month not in self.meses:
+                data = (data.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._dia_valido(data):
+                data = data.replace(hour=0, minute=0) + timedelta(days=1)
+            elif data.hour not in self.horas:
+                data = data.replace(minute=0) + timedelta(hours=1)
+            elif data.minute not in self.minutos:
+                data += timedelta(minutes=1)
+            else:
+                return data
+        raise ValueError(f"Agenda cron sem ocorrências: '{self.expressao}'")
+
+
+class Entrada:
+    """Versão calculada de uma visão (ou de uma chave da visão)"""
+
+    __slots__ = ("dados", "atualizado_em", "duracao_ms", "validade", "geracao", "lida_em")
+
+    def __init__(self, dados, atualizado_em, duracao_ms, validade, geracao):
+        self.dados = dados
+        self.atualizado_em = atualizado_em
+        self.duracao_ms = duracao_ms
+        self.validade = validade
+        self.geracao = geracao
+        self.lida_em = atualizado_em
+
+
+class Visao:
+    """Visão materializada: função de cálculo, agenda e versões já calculadas"""
+
+    def __init__(self, nome, calcular, agenda, por_chave, validade):
+        self.nome = nome
+        self.calcular = calcular
+        self.agenda = AgendaCron(agenda)
+        self.por_chave = por_chave
+        self.validade = validade
+        # Segundos somados ao horário da agenda: visões com a mesma agenda não disparam juntas
+        self.deslocamento = zlib.crc32(nome.encode()) % 60
+        self.entradas = {}
+        self.geracoes = {}      # chave -> alterações de dados registradas
+        self.proxima = None
+        self.atualizacoes = 0
+        self.erros = 0
+        self.ultimo_erro = None
+
+    def validade_atual(self):
+        return self.validade() if self.validade else None
+
+
+def _em_thread_nativa(funcao, *args):
+    """Executa funcao(*args) fora do laço de eventos do gevent, se o threading foi trocado por greenlets"""
+    if get_hub is not None and is_module_patched("threading"):
+        return get_hub().threadpool.apply(funcao, args)
+    return funcao(*args)
+
+
+class AgendadorVisoes:
+    """Registro das visões e thread que as atualiza pela agenda e após alterações"""
+
+    def __init__(self, habilitado=HABILITADO, atraso_mudanca=ATRASO_MUDANCA,
+                 pausa=PAUSA_ENTRE_ATUALIZACOES, ociosidade=MAXIMO_OCIOSO, relogio=time.time):
+        self.habilitado = habilitado
+        self.atraso_mudanca = atraso_mudanca
+        self.pausa = pausa
+        self.ociosidade = ociosidade
+        self.relogio = relogio
+        self.visoes = {}
+        self._pendentes = {}    # (nome, chave) -> instante a partir do qual deve ser atualizada
+        self._cond = threading.Condition()
+        self._pid = None
+
+    def registrar(self, nome, calcular, agenda=AGENDA_PADRAO, por_chave=False, validade=None):
+        """Registra uma visão
+
+        calcular() (ou calcular(chave), se por_chave) -> dados; None indica chave inexistente.
+        validade() -> valor do qual os dados dependem além dos livros (ex.: a data de hoje);
+        versões calculadas com outro valor não são servidas.
+        """
+        agenda = os.environ.get(f"TOMATE_AGENDA_{nome.upper()}", agenda)
+        self.visoes[nome] = Visao(nome, calcular, agenda, por_chave, validade)
+
+    def _garantir_thread(self):
+        if self._pid != os.getpid():
+            with self._cond:
+                if self._pid == os.getpid():
+                    return
+                # Uma thread por processo (workers do gunicorn são criados por fork)
+                self._pid = os.getpid()
+                threading.Thread(target=self._executar, name="visoes", daemon=True).start()
+
+    def obter(self, nome, chave=None, ao_vivo=False):
+        """(dados, frescor) da visão; calcula na hora se não há versão válida ou se ao_vivo
+
+        Uma versão desatualizada por alteração recente continua sendo servida (com
+        "desatualizada": true no frescor) até a atualização em segundo plano terminar.
+        """
+        visao = self.visoes[nome]
+        if self.habilitado:
+            self._garantir_thread()
+            if not ao_vivo:
+                validade = visao.validade_atual()
+                with self._cond:
+                    entrada = visao.entradas.get(chave)
+                    if entrada is not None and entrada.validade == validade:
+                        entrada.lida_em = self.relogio()
+                        return entrada.dados, self._frescor(visao, chave, entrada)
+        entrada = self._atualizar(visao, chave)
+        if entrada is None:
+            return None, None
+        with self._cond:
+            return entrada.dados, self._frescor(visao, chave, entrada)
+
+    def _atualizar(self, visao, chave):
+        """Calcula a visão e guarda a versão (se for mais recente que a atual)"""
+        validade = visao.validade_atual()
+        with self._cond:
+            geracao = visao.geracoes.get(chave, 0)
+        inicio = self.relogio()
+        cronometro = time.perf_counter()
+        dados = _em_thread_nativa(visao.calcular, *((chave,) if visao.por_chave else ()))
+        if dados is None:
+            self.descartar(visao.nome, chave)
+            return None
+        entrada = Entrada(dados, inicio, round((time.perf_counter() - cronometro) * 1000, 3), validade, geracao)
+        if not self.habilitado:
+            return entrada
+        with self._cond:
+            atual = visao.entradas.get(chave)
+            if atual is None or atual.atualizado_em <= inicio:
+                if atual is not None:
+                    entrada.lida_em = atual.lida_em
+                visao.entradas[chave] = entrada
+            visao.atualizacoes += 1
+        return entrada
+
+    def _frescor(self, visao, chave, entrada):
+        agora = self.relogio()
+        horarios = [h for h in (self._pendentes.get((visao.nome, chave)), visao.proxima) if h]
+        return {
+            "nome": visao.nome,
+            "atualizado_em": _formatar(entrada.atualizado_em),
+            "idade_segundos": round(max(agora - entrada.atualizado_em, 0), 3),
+            "desatualizada": entrada.geracao != visao.geracoes.get(chave, 0),
+            "duracao_ms": entrada.duracao_ms,
+            "proxima_atualizacao": _formatar(min(horarios, default=None))
+        }
+
+    def marcar(self, nome, chave=None):
+        """Registra uma alteração que afeta a visão (chave=None: todas as chaves) e agenda a atualização"""
+        if not self.habilitado:
+            return
+        visao = self.visoes[nome]
+        self._garantir_thread()
+        with self._cond:
+            chaves = list(visao.entradas) if visao.por_chave and chave is None else [chave]
+            devido = self.relogio() + self.atraso_mudanca
+            for c in chaves:
+                visao.geracoes[c] = visao.geracoes.get(c, 0) + 1
+                if c in visao.entradas:
+                    # Alterações seguidas não adiam a atualização já agendada
+                    self._pendentes.setdefault((nome, c), devido)
+            self._cond.notify()
+
+    def descartar(self, nome, chave=None):
+        """Remove a versão guardada (ex.: fundo excluído)"""
+        visao = self.visoes[nome]
+        with self._cond:
+            visao.entradas.pop(chave, None)
+            visao.geracoes.pop(chave, None)
+            self._pendentes.pop((nome, chave), None)
+
+    def invalidar(self):
+        """Descarta todas as versões guardadas (ex.: dados substituídos por completo)"""
+        with self._cond:
+            for visao in self.visoes.values():
+                visao.entradas.clear()
+                visao.geracoes.clear()
+            self._pendentes.clear()
+
+    def _agendar_cron(self, agora):
+        """Põe na fila as visões cujo horário da agenda chegou e calcula o próximo"""
+        for visao in self.visoes.values():
+            if visao.proxima is not None and visao.proxima <= agora:
+                for chave, entrada in list(visao.entradas.items()):
+                    if visao.por_chave and agora - entrada.lida_em > self.ociosidade:
+                        del visao.entradas[chave]
+                        visao.geracoes.pop(chave, None)
+                        self._pendentes.pop((visao.nome, chave), None)
+                    else:
+                        self._pendentes.setdefault((visao.nome, chave), agora)
+            if visao.proxima is None or visao.proxima <= agora:
+                visao.proxima = visao.agenda.proxima(datetime.fromtimestamp(agora)).timestamp() + visao.deslocamento
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                agora = self.relogio()
+                self._agendar_cron(agora)
+                pendente = min(self._pendentes, key=self._pendentes.get, default=None)
+                if pendente is None or self._pendentes[pendente] > agora:
+                    horarios = [v.proxima for v in self.visoes.values()]
+                    if pendente is not None:
+                        horarios.append(self._pendentes[pendente])
+                    self._cond.wait(timeout=max(min(horarios, default=agora + 60) - agora, 0.01))
+                    continue
+                del self._pendentes[pendente]
+            nome, chave = pendente
+            visao = self.visoes[nome]
+            try:
+                self._atualizar(visao, chave)
+            except Exception as e:
+                # A versão anterior continua sendo servida; o erro aparece em /visoes
+                with self._cond:
+                    visao.erros += 1
+                    visao.ultimo_erro = f"{type(e).__name__}: {e}"
+            time.sleep(self.pausa)
+
+    def idades(self):
+        """Idade (s) da versão mais antiga de cada visão"""
+        agora = self.relogio()
+        with self._cond:
+            return {
+                nome: max((agora - e.atualizado_em for e in visao.entradas.values()), default=0)
+                for nome, visao in self.visoes.items()
+            }
+
+    def estado(self):
+        """Situação de cada visão, para inspeção"""
+        idades = self.idades()
+        with self._cond:
+            return [
+                {
+                    "nome": nome,
+                    "agenda": visao.agenda.expressao,
+                    "deslocamento_segundos": visao.deslocamento,
+                    "chaves": len(visao.entradas),
+                    "pendentes": sum(1 for n, _ in self._pendentes if n == nome),
+                    "atualizacoes": visao.atualizacoes,
+                    "erros": visao.erros,
+                    "ultimo_erro": visao.ultimo_erro,
+                    "idade_maxima_segundos": round(idades[nome], 3),
+                    "proxima_atualizacao": _formatar(visao.proxima)
+                }
+                for nome, visao in self.visoes.items()
+            ]